@@ -0,0 +1,213 @@
+"""
+Admission control: bounded queues per request class ("lane") and load shedding.
+
+  audio    speech-to-text of uploaded and streamed audio (Google STT or a local model)
+  network  intents answered by a remote service (ADMISSION_NETWORK_INTENTS, e.g. weather_query)
+  local    every other intent: time, date, greetings and jobs, answered on this machine
+
+Each lane runs at most ADMISSION_LIMITS requests at once. Up to ADMISSION_QUEUES more wait in
+FIFO order, each for at most its ADMISSION_DEADLINES_MS. A request that finds the queue full, or
+is still waiting at its deadline, is shed: the servers answer 503 with a Retry-After estimated
+from the queue length and the lane's recent service time, instead of letting it pile up behind
+work it would time out on anyway. Lanes never share slots, so local intents keep a fast lane
+while a burst of uploads waits on STT. A freed slot is handed straight to the next waiter,
+whether a thread (backend.app) or a coroutine (backend.asgi).
+"""
+import math
+import time
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import AsyncContextManager, AsyncIterator, ContextManager, Deque, Dict, Iterator, Optional
+
+from backend import config, metrics
+from backend.jobs import parse_intent_values
+from backend.utils import StageTimer, lazy_import
+
+asyncio = lazy_import("asyncio")
+
+LANES = ("audio", "network", "local")
+
+NETWORK_INTENTS = frozenset(s.strip() for s in config.ADMISSION_NETWORK_INTENTS.split(",") if s.strip())
+
+
+class Overloaded(Exception):
+	"""A request was shed; retry_after is in whole seconds."""
+
+	def __init__(self, lane: str, reason: str, retry_after: int):
+		super().__init__(f"The server is busy ({lane}), please retry in {retry_after} s")
+		self.lane = lane
+		self.reason = reason
+		self.retry_after = retry_after
+
+
+class _Waiter:
+	"""A queued request; wake() runs once the lane has handed it a slot."""
+
+	def __init__(self, loop: Optional["asyncio.AbstractEventLoop"] = None):
+		self.granted = False
+		self.loop = loop
+		self.event = threading.Event() if loop is None else None
+		self.future = loop.create_future() if loop is not None else None
+
+	def wake(self) -> None:
+		if self.loop is None:
+			self.event.set()
+		else:
+			self.loop.call_soon_threadsafe(self._resolve)
+
+	def _resolve(self) -> None:
+		if not self.future.done():
+			self.future.set_result(None)
+
+
+class Lane:
+	def __init__(self, name: str, limit: int, queue: int, deadline: float):
+		self.name = name
+		self.limit = max(limit, 1)
+		self.queue = max(queue, 0)
+		self.deadline = deadline
+		self._lock = threading.Lock()
+		self._active = 0
+		self._waiters: Deque[_Waiter] = deque()
+		# Moving average of how long a request holds a slot, for Retry-After.
+		self._service = 0.1
+
+	@property
+	def active(self) -> int:
+		return self._active
+
+	@property
+	def queued(self) -> int:
+		return len(self._waiters)
+
+	def check(self) -> None:
+		"""Raise Overloaded if a request arriving now would be shed because the queue is full."""
+		with self._lock:
+			if self._active >= self.limit and len(self._waiters) >= self.queue:
+				raise self._shed("queue_full")
+
+	def _enter(self, loop: Optional["asyncio.AbstractEventLoop"] = None) -> Optional[_Waiter]:
+		"""Take a free slot (None) or join the queue (the waiter); raises Overloaded if it is full."""
+		with self._lock:
+			if self._active < self.limit and not self._waiters:
+				self._active += 1
+				return None
+			if len(self._waiters) >= self.queue:
+				raise self._shed("queue_full")
+			waiter = _Waiter(loop)
+			self._waiters.append(waiter)
+			return waiter
+
+	def _leave(self, waiter: _Waiter) -> bool:
+		"""Leave the queue; False if the slot was handed over in the meantime (the caller holds it)."""
+		with self._lock:
+			if waiter.granted:
+				return False
+			self._waiters.remove(waiter)
+			return True
+
+	def _release(self, held: float) -> None:
+		with self._lock:
+			self._service += 0.2 * (held - self._service)
+			waiter = self._waiters.popleft() if self._waiters else None
+			if waiter is None:
+				self._active -= 1
+			else:
+				waiter.granted = True
+		if waiter is not None:
+			waiter.wake()
+
+	def _shed(self, reason: str) -> Overloaded:
+		# Time for the queue ahead to drain at the recent service rate.
+		retry_after = max(1, math.ceil((len(self._waiters) + 1) * self._service / self.limit))
+		if config.METRICS_ENABLED:
+			shed_total.inc(self.name, reason)
+		return Overloaded(self.name, reason, retry_after)
+
+	@contextmanager
+	def slot(self, timer: Optional[StageTimer] = None) -> Iterator[None]:
+		start = time.perf_counter()
+		waiter = self._enter()
+		if waiter is not None:
+			if not waiter.event.wait(self.deadline) and self._leave(waiter):
+				raise self._shed("deadline")
+			if timer is not None:
+				timer.mark(f"queue_{self.name}", start)
+		held = time.perf_counter()
+		try:
+			yield
+		finally:
+			self._release(time.perf_counter() - held)
+
+	@asynccontextmanager
+	async def slot_async(self, timer: Optional[StageTimer] = None) -> AsyncIterator[None]:
+		start = time.perf_counter()
+		waiter = self._enter(asyncio.get_running_loop())
+		if waiter is not None:
+			try:
+				await asyncio.wait_for(asyncio.shield(waiter.future), self.deadline)
+			except asyncio.TimeoutError:
+				if self._leave(waiter):
+					raise self._shed("deadline") from None
+			except asyncio.CancelledError:
+				# Client gone: give the slot back if it was already ours.
+				if not self._leave(waiter):
+					self._release(0.0)
+				raise
+			if timer is not None:
+				timer.mark(f"queue_{self.name}", start)
+		held = time.perf_counter()
+		try:
+			yield
+		finally:
+			self._release(time.perf_counter() - held)
+
+
+_limits = parse_intent_values(config.ADMISSION_LIMITS, int)
+_queues = parse_intent_values(config.ADMISSION_QUEUES, int)
+_deadlines = parse_intent_values(config.ADMISSION_DEADLINES_MS, float)
+
+lanes: Dict[str, Lane] = {
+	name: Lane(name, _limits.get(name, 16), _queues.get(name, 64), _deadlines.get(name, 1000) / 1000)
+	for name in LANES
+}
+
+shed_total = metrics.register(metrics.Counter(
+	"nova_admission_shed_total", "Requests shed with 503 by lane and reason (queue_full, deadline).", ("lane", "reason"),
+))
+metrics.register(metrics.Gauge(
+	"nova_admission_in_flight", "Requests holding an admission slot, by lane.", ("lane",),
+	lambda: {(name,): lane.active for name, lane in lanes.items()},
+))
+metrics.register(metrics.Gauge(
+	"nova_admission_queued", "Requests waiting for an admission slot, by lane.", ("lane",),
+	lambda: {(name,): lane.queued for name, lane in lanes.items()},
+))
+
+
+def lane_for(intent: Optional[str]) -> str:
+	return "network" if intent in NETWORK_INTENTS else "local"
+
+
+def check(lane: str) -> None:
+	"""
+	Shed early, without taking a slot: call before receiving or decoding a request body that
+	would only be thrown away if the lane turned the request away afterwards.
+	"""
+	if config.ADMISSION_ENABLED:
+		lanes[lane].check()
+
+
+def admit(lane: str, timer: Optional[StageTimer] = None) -> ContextManager[None]:
+	"""Hold a slot in lane for the with block; raises Overloaded when the request is shed."""
+	if not config.ADMISSION_ENABLED:
+		return nullcontext()
+	return lanes[lane].slot(timer)
+
+
+def admit_async(lane: str, timer: Optional[StageTimer] = None) -> AsyncContextManager[None]:
+	"""admit() for coroutines: waiting for a slot does not block the event loop."""
+	if not config.ADMISSION_ENABLED:
+		return nullcontext()
+	return lanes[lane].slot_async(timer)
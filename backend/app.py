@@ -1,25 +1,48 @@
 import os
+import re
+import json
+import math
+import time
+import queue
 import logging
-from flask import Flask, request, jsonify, send_from_directory, session
+import threading
+from contextlib import nullcontext
+from io import BytesIO
+from typing import ContextManager
+from flask import Flask, Request, Response, g, request, jsonify, send_file, session, stream_with_context
 
-from backend import config
-from backend.nlu.rule_based import interpret
-from backend.executor import execute_intent
-from backend.services.speech import transcribe_wav
+from backend import admission, batch, config, jobs, metrics, static, storage
+from backend.nlu.rule_based import app_resolver, interpret
+from backend.executor import predict_response, start_process_index, STATIC_RESPONSES
+from backend.services.speech import read_audio, transcribe_audio, transcribe_pcm
+from backend.services.stt_engines import get_engine as get_stt_engine
+from backend.services.tts_engines import get_engine as get_tts_engine
+from backend.services import tts, weather
 from backend.services.tts import synthesize_speech, to_base64_audio_mp3
-from backend.storage import list_reminders
+from backend.storage import iter_reminders, query_reminders
+from backend.scheduler import hub as reminder_hub, start_reminder_scheduler
+from backend.utils import StageTimer, import_modules, lazy_import, preload, spooled_upload_stream
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
-BASE_DIR = os.path.dirname(__file__)
-FRONTEND_DIR = os.path.join(os.path.dirname(BASE_DIR), 'frontend')
+# numpy-backed; only the streaming route needs it.
+vad = lazy_import("backend.services.vad")
+
+FRONTEND_DIR = config.FRONTEND_DIR
+
+
+class SpooledRequest(Request):
+	def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+		return spooled_upload_stream(total_content_length, content_type, filename, content_length)
+
 
 app = Flask(
 	__name__,
 	static_folder=os.path.join(FRONTEND_DIR, 'assets'),
 	static_url_path='/assets'
 )
+app.request_class = SpooledRequest
 app.secret_key = 'nova-dev'  # for session
 
 
@@ -29,34 +52,98 @@ def get_langs():
 	return stt_lang, tts_lang
 
 
-def process_text_command(text: str):
-	intent_res = interpret(text)
+AUDIO_ID_RE = re.compile(r"[0-9a-f]{64}")
+AUDIO_MAX_AGE = 24 * 3600
+
+
+def get_audio_mode(requested=None) -> str:
+	mode = requested or config.AUDIO_RESPONSE_MODE
+	return "url" if mode == "url" else "data_url"
+
+
+def process_text_command(text: str, audio_mode: str = "data_url"):
+	"""Interpret, execute and voice one command; raises admission.Overloaded if its lane sheds it."""
+	timer = g.get('stage_timer') or StageTimer()
+	g.stage_timer = timer
+	with timer.stage('interpret'):
+		intent_res = interpret(text)
+	g.intent = intent_res.get('intent')
+	return respond(text, intent_res, audio_mode, timer, admission.admit(admission.lane_for(g.intent), timer))
+
+
+def respond(text: str, intent_res, audio_mode: str, timer: StageTimer, lane: ContextManager = nullcontext()):
+	"""Execute under lane (an admission slot), then voice the reply after releasing it."""
 	intent = intent_res.get('intent')
 	entities = intent_res.get('entities', {})
-	response_text = execute_intent(intent, entities)
 	_, tts_lang = get_langs()
-	mp3 = synthesize_speech(response_text, lang=tts_lang)
-	audio_url = to_base64_audio_mp3(mp3)
-	return {
+	# Overlap TTS with execution when the answer is predictable (e.g. "Reminder saved.").
+	predicted = predict_response(intent, entities) if config.TTS_SPECULATIVE else None
+	with lane:
+		tts_start = timer.now()
+		spec_id = tts.start_synthesis(predicted, lang=tts_lang) if predicted else None
+		with timer.stage('execute'):
+			response_text, job = jobs.run_intent(intent, entities, tts_lang)
+	hit = spec_id is not None and response_text == predicted
+	if not hit:
+		tts_start = timer.now()
+	res = {
 		"transcription": text,
 		"intent": intent,
 		"entities": entities,
 		"response_text": response_text,
-		"audio_data_url": audio_url,
 	}
+	if job is not None:
+		# Still running: response_text is the acknowledgement; the result follows via /api/jobs or push.
+		res["job"] = job.ref()
+	if audio_mode == "url":
+		# Return right away; the client fetches (and starts playing) the audio while it is synthesized.
+		audio_id = spec_id if hit else tts.start_synthesis(response_text, lang=tts_lang)
+		res["audio_id"] = audio_id
+		res["audio_url"] = f"/api/audio/{audio_id}"
+	else:
+		mp3 = tts.get_audio(spec_id) if hit else synthesize_speech(response_text, lang=tts_lang)
+		timer.mark('tts_speculative' if hit else 'tts', tts_start)
+		with timer.stage('encode'):
+			res["audio_data_url"] = to_base64_audio_mp3(mp3)
+	return res
 
 
-@app.route('/')
-def index():
-	return send_from_directory(FRONTEND_DIR, 'index.html')
+def shed(exc: admission.Overloaded):
+	"""503 for a request admission control turned away."""
+	return jsonify({"error": str(exc), "retry_after": exc.retry_after}), 503, {'Retry-After': str(exc.retry_after)}
+
 
+@app.after_request
+def add_server_timing(resp):
+	timer = g.get('stage_timer')
+	if timer is not None and timer.stages:
+		resp.headers['Server-Timing'] = timer.server_timing()
+	return resp
 
+
+def start_request_clock():
+	g.request_start = time.perf_counter()
+
+
+def record_metrics(resp):
+	rule = request.url_rule
+	metrics.record_request(
+		rule.rule if rule else 'unmatched', resp.status_code, time.perf_counter() - g.request_start,
+		g.get('stage_timer'), g.get('intent'),
+	)
+	return resp
+
+
+if config.METRICS_ENABLED:
+	app.before_request(start_request_clock)
+	app.after_request(record_metrics)
+
+
+@app.route('/')
 @app.route('/<path:path>')
-def send_frontend(path):
-	full_path = os.path.join(FRONTEND_DIR, path)
-	if os.path.exists(full_path):
-		return send_from_directory(FRONTEND_DIR, path)
-	return send_from_directory(FRONTEND_DIR, 'index.html')
+def send_frontend(path='index.html'):
+	status, body, headers = static.respond(path, request.args.get('v'), request.accept_encodings, request.if_none_match)
+	return Response(body, status=status, headers=headers)
 
 
 @app.post('/api/command')
@@ -69,38 +156,167 @@ def api_command():
 	if lang_override:
 		session['tts_lang'] = lang_override
 	try:
-		res = process_text_command(text)
+		res = process_text_command(text, get_audio_mode(data.get('audio_mode')))
 		return jsonify(res)
+	except admission.Overloaded as exc:
+		return shed(exc)
 	except Exception as exc:
 		logger.exception("/api/command error")
 		return jsonify({"error": str(exc)}), 500
 
 
+@app.post('/api/commands')
+def api_commands():
+	"""Many text commands in one request; NDJSON results in input order (see backend.batch)."""
+	data = request.get_json(force=True, silent=True)
+	try:
+		commands = batch.parse_commands(data, get_langs()[1])
+	except ValueError as exc:
+		return jsonify({"error": str(exc)}), 400
+	mode = batch.audio_mode(data.get('audio_mode'))
+	return Response(to_ndjson(batch.run_batch(commands, mode)), mimetype='application/x-ndjson')
+
+
 @app.post('/api/upload-audio')
 def upload_audio():
-	if 'file' not in request.files:
-		return jsonify({"error": "file is required (WAV)"}), 400
-	file = request.files['file']
+	timer = g.stage_timer = StageTimer()
+	try:
+		admission.check('audio')
+	except admission.Overloaded as exc:
+		return shed(exc)
+	with timer.stage('receive'):
+		files = request.files
+	if 'file' not in files:
+		return jsonify({"error": "file is required (WAV or FLAC)"}), 400
+	file = files['file']
 	if not file.filename:
 		return jsonify({"error": "empty filename"}), 400
-	# Save to tmp and transcribe
-	tmp_path = os.path.join(config.TMP_DIR, file.filename)
-	file.save(tmp_path)
 	try:
 		stt_lang, _ = get_langs()
-		text = transcribe_wav(tmp_path, language=stt_lang)
+		with admission.admit('audio', timer):
+			with timer.stage('decode'):
+				try:
+					audio = read_audio(file.stream)
+				except ValueError as exc:
+					return jsonify({"error": str(exc)}), 400
+			with timer.stage('stt'):
+				text = transcribe_audio(audio, language=stt_lang)
 		if not text:
 			return jsonify({"error": "Could not transcribe audio", "transcription": ""}), 400
-		res = process_text_command(text)
+		res = process_text_command(text, get_audio_mode(request.form.get('audio_mode')))
 		return jsonify(res)
+	except admission.Overloaded as exc:
+		return shed(exc)
 	except Exception as exc:
 		logger.exception("/api/upload-audio error")
 		return jsonify({"error": str(exc)}), 500
 	finally:
-		try:
-			os.remove(tmp_path)
-		except OSError:
-			pass
+		file.close()
+
+
+STREAM_READ_BYTES = 8192
+
+
+def stream_max_bytes() -> int:
+	"""PCM bytes in STREAM_LISTEN_SECONDS of audio: the most a streamed request may send."""
+	return int(config.STREAM_LISTEN_SECONDS * config.STREAM_SAMPLE_RATE) * 2
+
+
+@app.post('/api/stream-audio')
+def stream_audio():
+	"""
+	Raw 16-bit mono PCM at STREAM_SAMPLE_RATE in the request body, typically sent with chunked
+	transfer encoding while the user speaks. Answers as soon as the VAD closes the first utterance,
+	or 408/413 if none closes within STREAM_LISTEN_SECONDS of wall time or of audio.
+	"""
+	try:
+		admission.check('audio')
+	except admission.Overloaded as exc:
+		return shed(exc)
+	segmenter = vad.SpeechSegmenter.from_config()
+	g.stage_timer = StageTimer()
+	segment = None
+	deadline = time.monotonic() + config.STREAM_LISTEN_SECONDS
+	remaining = stream_max_bytes()
+	with g.stage_timer.stage('listen'):
+		while segment is None:
+			chunk = request.stream.read(STREAM_READ_BYTES)
+			if not chunk:
+				segment = segmenter.flush()
+				break
+			remaining -= len(chunk)
+			if remaining < 0:
+				return jsonify({"error": "Too much audio without an utterance", "transcription": ""}), 413
+			if time.monotonic() > deadline:
+				return jsonify({"error": "No utterance before the listen deadline", "transcription": ""}), 408
+			closed = segmenter.feed(chunk)
+			if closed:
+				segment = closed[0]
+	if not segment:
+		return jsonify({"error": "No speech detected", "transcription": ""}), 400
+	try:
+		stt_lang, _ = get_langs()
+		with admission.admit('audio', g.stage_timer), g.stage_timer.stage('stt'):
+			text = transcribe_pcm(segment, config.STREAM_SAMPLE_RATE, language=stt_lang)
+		if not text:
+			return jsonify({"error": "Could not transcribe audio", "transcription": ""}), 400
+		res = process_text_command(text, get_audio_mode(request.args.get('audio_mode')))
+		return jsonify(res)
+	except admission.Overloaded as exc:
+		return shed(exc)
+	except Exception as exc:
+		logger.exception("/api/stream-audio error")
+		return jsonify({"error": str(exc)}), 500
+
+
+@app.get('/api/audio/<audio_id>')
+def get_audio(audio_id):
+	if not AUDIO_ID_RE.fullmatch(audio_id):
+		return jsonify({"error": "unknown audio id"}), 404
+	if request.if_none_match.contains(audio_id):
+		resp = Response(status=304)
+		resp.set_etag(audio_id)
+		return resp
+	if not request.range:
+		# Still synthesizing: stream parts with chunked transfer as they arrive.
+		chunks = tts.stream_audio(audio_id)
+		if chunks is not None:
+			resp = Response(stream_with_context(chunks), mimetype='audio/mpeg')
+			resp.set_etag(audio_id)
+			resp.cache_control.max_age = AUDIO_MAX_AGE
+			resp.headers['Accept-Ranges'] = 'bytes'
+			return resp
+	try:
+		mp3 = tts.get_audio(audio_id)
+	except Exception as exc:
+		logger.exception("/api/audio error")
+		return jsonify({"error": str(exc)}), 500
+	if mp3 is None:
+		return jsonify({"error": "unknown audio id"}), 404
+	# conditional=True handles Range and If-None-Match against the content-addressed ETag.
+	return send_file(BytesIO(mp3), mimetype='audio/mpeg', conditional=True, etag=audio_id, max_age=AUDIO_MAX_AGE)
+
+
+JOB_MAX_WAIT = 30.0
+
+
+def job_wait_seconds(args) -> float:
+	return max(0.0, min(float(args.get('wait') or 0), JOB_MAX_WAIT))
+
+
+@app.get('/api/jobs/<job_id>')
+def get_job(job_id):
+	"""Status of a background job; ?wait=<s> holds the request until it finishes (long poll)."""
+	job = jobs.get_job(job_id)
+	if job is None:
+		return jsonify({"error": "unknown job id"}), 404
+	try:
+		wait = job_wait_seconds(request.args)
+	except ValueError:
+		return jsonify({"error": "invalid wait"}), 400
+	if wait:
+		job.wait(wait)
+	return jsonify(job.to_dict())
 
 
 @app.post('/api/language')
@@ -115,18 +331,199 @@ def set_language():
 	return jsonify({"stt_lang": session.get('stt_lang'), "tts_lang": session.get('tts_lang')})
 
 
+# Latest time filter accepted (9999-12-31), so every bound fits an SQLite integer.
+MAX_TIMESTAMP = 253402300799
+
+
+def _timestamp(value) -> int:
+	return max(0, min(int(value), MAX_TIMESTAMP))
+
+
+def parse_reminder_query(args):
+	"""
+	Translate /api/reminders query args into iter_reminders filters.
+	cursor=<when_ts>:<id>, from/to=<epoch s> (inclusive), upcoming=1 (due from now on),
+	due_within=<minutes> (due between now and now + N minutes). Raises ValueError on bad input.
+	"""
+	query = {}
+	cursor = args.get('cursor')
+	if cursor:
+		when_ts, _, rem_id = cursor.partition(':')
+		query['after'] = (_timestamp(when_ts), _timestamp(rem_id))
+	now = int(time.time())
+	since = [_timestamp(args['from'])] if args.get('from') else []
+	until = [_timestamp(args['to'])] if args.get('to') else []
+	if args.get('upcoming', '').lower() in ('1', 'true', 'yes'):
+		since.append(now)
+	if args.get('due_within'):
+		minutes = float(args['due_within'])
+		if not math.isfinite(minutes):
+			raise ValueError(f"due_within must be finite: {minutes}")
+		since.append(now)
+		until.append(_timestamp(now + max(0.0, min(minutes * 60, MAX_TIMESTAMP))))
+	if since:
+		query['since'] = max(since)
+	if until:
+		query['until'] = min(until)
+	return query
+
+
+def reminders_page_size(args) -> int:
+	limit = int(args.get('limit') or config.REMINDERS_PAGE_SIZE)
+	return max(1, min(limit, config.REMINDERS_MAX_PAGE_SIZE))
+
+
+def wants_ndjson(req) -> bool:
+	return req.args.get('format') == 'ndjson' or req.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def to_ndjson(rows):
+	for row in rows:
+		yield json.dumps(row) + "\n"
+
+
+def reminders_page(rows, limit: int):
+	"""Build the JSON page body from up to limit + 1 rows (the extra row only signals more)."""
+	has_more = len(rows) > limit
+	rows = rows[:limit]
+	next_cursor = f"{rows[-1]['when_ts']}:{rows[-1]['id']}" if has_more else None
+	return {"reminders": rows, "next_cursor": next_cursor}
+
+
 @app.get('/api/reminders')
 def api_reminders():
 	try:
-		return jsonify({"reminders": list_reminders()})
+		query = parse_reminder_query(request.args)
+		limit = reminders_page_size(request.args)
+	except ValueError:
+		return jsonify({"error": "invalid cursor, limit or time filter"}), 400
+	try:
+		if wants_ndjson(request):
+			return Response(stream_with_context(to_ndjson(iter_reminders(**query))), mimetype='application/x-ndjson')
+		return jsonify(reminders_page(query_reminders(limit=limit + 1, **query), limit))
 	except Exception as exc:
 		return jsonify({"error": str(exc)}), 500
 
 
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def sse_event(event) -> str:
+	return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+
+
+@app.get('/api/reminders/events')
+def reminder_events():
+	"""Server-sent events stream of reminders as they fall due."""
+	q = reminder_hub.subscribe()
+
+	def stream():
+		try:
+			yield ": connected\n\n"
+			while True:
+				try:
+					event = q.get(timeout=SSE_KEEPALIVE_SECONDS)
+				except queue.Empty:
+					yield ": keep-alive\n\n"
+					continue
+				yield sse_event(event)
+		finally:
+			reminder_hub.unsubscribe(q)
+	return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
 @app.get('/api/health')
 def health():
 	return jsonify({"status": "ok"})
 
 
+@app.get('/api/tts-cache')
+def tts_cache():
+	return jsonify(tts.cache_stats())
+
+
+@app.get('/api/metrics')
+def api_metrics():
+	if not config.METRICS_ENABLED:
+		return jsonify({"error": "metrics are disabled (METRICS_ENABLED=false)"}), 404
+	return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def start_tts_warmup():
+	"""Pre-synthesize the fixed executor responses in the background."""
+	if not config.TTS_WARMUP:
+		return None
+	thread = threading.Thread(target=tts.warm_up, args=(STATIC_RESPONSES, config.TTS_LANGUAGE), name="tts-warmup", daemon=True)
+	thread.start()
+	return thread
+
+
+def load_engines():
+	"""Create the STT and TTS engines, loading local models if any."""
+	for kind, get_engine in (("STT", get_stt_engine), ("TTS", get_tts_engine)):
+		try:
+			get_engine()
+		except Exception:
+			logger.exception("Loading %s engine failed", kind)
+
+
+def start_engine_load():
+	"""Create the STT and TTS engines (loading local models, if any) before the first request needs them."""
+	thread = threading.Thread(target=load_engines, name="engine-load", daemon=True)
+	thread.start()
+	return thread
+
+
+def init_app():
+	"""
+	Process-level setup kept out of import time: data directories, the reminders schema and the
+	TTS disk cache index, and the in-memory frontend. Idempotent; storage, the cache and the
+	frontend also do their part on first use.
+	"""
+	config.ensure_dirs()
+	storage.init_storage()
+	tts.open_cache()
+	static.manifest()
+
+
+# Imported lazily by the services; PRELOAD_IMPORTS loads them after start-up.
+PRELOAD_MODULES = (
+	"speech_recognition", "backend.services.audio_prep", "backend.services.vad", "gtts", "requests", "psutil",
+)
+
+
+def warm_up(tts_timeout=None):
+	"""
+	What start_services does in the background, done before serving instead: heavy imports, the
+	STT/TTS engines, the app-name index and the weather connection pool, then the fixed replies
+	into the TTS cache, waiting at most tts_timeout s for those (the rest finish in the background).
+	"""
+	import_modules(PRELOAD_MODULES)
+	load_engines()
+	app_resolver()
+	weather.open_session()
+	thread = start_tts_warmup()
+	if thread is not None:
+		thread.join(tts_timeout)
+
+
+def start_services(preload_modules=PRELOAD_MODULES):
+	"""Background work a serving process runs alongside requests."""
+	if config.PRELOAD_IMPORTS:
+		preload(preload_modules)
+	start_tts_warmup()
+	start_engine_load()
+	start_reminder_scheduler()
+	start_process_index()
+
+
+def create_app(start_background: bool = True):
+	"""App factory for servers and workers: gunicorn 'backend.app:create_app()'."""
+	init_app()
+	if start_background:
+		start_services()
+	return app
+
+
 if __name__ == '__main__':
-	app.run(host=config.HOST, port=config.PORT, debug=config.FLASK_DEBUG) 
\ No newline at end of file
+	create_app().run(host=config.HOST, port=config.PORT, debug=config.FLASK_DEBUG) 
\ No newline at end of file
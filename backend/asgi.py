@@ -0,0 +1,565 @@
+"""
+Async (ASGI) entry point serving the same routes and JSON contract as backend.app.
+
+Network-bound work (Google STT, gTTS, Open-Meteo) is awaited on a shared pooled HTTP client
+instead of holding a worker thread, so one process can keep hundreds of voice requests in flight.
+
+Run: python -m backend.asgi   (or: hypercorn 'backend.asgi:create_app()')
+"""
+import json
+import time
+import asyncio
+import itertools
+import logging
+from collections import deque
+from contextlib import nullcontext
+from typing import AsyncContextManager
+
+from quart import Quart, Request, Response, g, request, jsonify, session, websocket
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from backend import admission, batch, config, jobs, metrics, static
+from backend.app import (
+	AUDIO_ID_RE, AUDIO_MAX_AGE, SSE_KEEPALIVE_SECONDS, PRELOAD_MODULES, get_audio_mode, init_app, job_wait_seconds, start_services,
+	parse_reminder_query, reminders_page, reminders_page_size, sse_event, stream_max_bytes, to_ndjson, wants_ndjson,
+)
+from backend.nlu.rule_based import interpret
+from backend.executor import execute_intent, predict_response, DEFAULT_WEATHER_CITY, LOCAL_INTENTS
+from backend.services import tts
+from backend.services.aio import http as aio_http
+from backend.services.aio import speech as aio_speech
+from backend.services.aio import tts as aio_tts
+from backend.services.aio import weather as aio_weather
+from backend.services.speech import read_audio
+from backend.services.tts import to_base64_audio_mp3
+from backend.storage import iter_reminders, query_reminders
+from backend.scheduler import hub as reminder_hub
+from backend.utils import StageTimer, lazy_import, spooled_upload_stream
+
+logger = logging.getLogger(__name__)
+
+vad = lazy_import("backend.services.vad")
+
+class SpooledRequest(Request):
+	def make_form_data_parser(self):
+		parser = super().make_form_data_parser()
+		parser.stream_factory = spooled_upload_stream
+		return parser
+
+
+app = Quart(__name__)
+app.request_class = SpooledRequest
+app.secret_key = 'nova-dev'  # for session
+
+
+def get_langs():
+	stt_lang = session.get('stt_lang') or config.STT_LANGUAGE
+	tts_lang = session.get('tts_lang') or config.TTS_LANGUAGE
+	return stt_lang, tts_lang
+
+
+async def execute_intent_async(intent: str, entities, lang=None):
+	"""(response_text, job) as jobs.run_intent, without blocking the event loop."""
+	if jobs.is_job_intent(intent):
+		# Process launches, UI automation and psutil scans run on the job pool.
+		job = jobs.submit(intent, entities, lang)
+		await job.wait_async(config.JOB_ACK_WAIT_MS / 1000)
+		if job.finished or not job.claim_ack():
+			return job.response_text, None
+		await asyncio.to_thread(jobs.share, job)
+		return job.ack_text, job
+	if intent == "weather_query":
+		return await aio_weather.get_current_weather_summary(entities.get("city") or DEFAULT_WEATHER_CITY), None
+	if intent in LOCAL_INTENTS:
+		return execute_intent(intent, entities), None
+	return await asyncio.to_thread(execute_intent, intent, entities), None
+
+
+def _discard_result(task: asyncio.Task) -> None:
+	if not task.cancelled() and task.exception() is not None:
+		logger.warning("Speculative TTS failed: %s", task.exception())
+
+
+async def process_text_command(text: str, audio_mode: str = "data_url"):
+	timer = g.get('stage_timer') or StageTimer()
+	g.stage_timer = timer
+	with timer.stage('interpret'):
+		intent_res = interpret(text)
+	g.intent = intent_res.get('intent')
+	return await respond(text, intent_res, audio_mode, timer, admission.admit_async(admission.lane_for(g.intent), timer))
+
+
+async def respond(text: str, intent_res, audio_mode: str, timer: StageTimer, lane: AsyncContextManager = nullcontext()):
+	"""Execute under lane (an admission slot), then voice the reply after releasing it."""
+	intent = intent_res.get('intent')
+	entities = intent_res.get('entities', {})
+	_, tts_lang = get_langs()
+	predicted = predict_response(intent, entities) if config.TTS_SPECULATIVE else None
+	async with lane:
+		tts_start = timer.now()
+		spec = None
+		if predicted:
+			if audio_mode == "url":
+				spec = tts.start_synthesis(predicted, lang=tts_lang)
+			else:
+				spec = asyncio.ensure_future(aio_tts.synthesize_speech(predicted, lang=tts_lang))
+		with timer.stage('execute'):
+			response_text, job = await execute_intent_async(intent, entities, tts_lang)
+	hit = spec is not None and response_text == predicted
+	if not hit:
+		tts_start = timer.now()
+		if isinstance(spec, asyncio.Future):
+			spec.add_done_callback(_discard_result)
+	res = {
+		"transcription": text,
+		"intent": intent,
+		"entities": entities,
+		"response_text": response_text,
+	}
+	if job is not None:
+		res["job"] = job.ref()
+	if audio_mode == "url":
+		audio_id = spec if hit else tts.start_synthesis(response_text, lang=tts_lang)
+		res["audio_id"] = audio_id
+		res["audio_url"] = f"/api/audio/{audio_id}"
+	else:
+		mp3 = await spec if hit else await aio_tts.synthesize_speech(response_text, lang=tts_lang)
+		timer.mark('tts_speculative' if hit else 'tts', tts_start)
+		with timer.stage('encode'):
+			res["audio_data_url"] = to_base64_audio_mp3(mp3)
+	return res
+
+
+def shed(exc: admission.Overloaded):
+	return jsonify({"error": str(exc), "retry_after": exc.retry_after}), 503, {'Retry-After': str(exc.retry_after)}
+
+
+@app.after_request
+async def add_server_timing(resp):
+	timer = g.get('stage_timer')
+	if timer is not None and timer.stages:
+		resp.headers['Server-Timing'] = timer.server_timing()
+	return resp
+
+
+async def start_request_clock():
+	g.request_start = time.perf_counter()
+
+
+async def record_metrics(resp):
+	rule = request.url_rule
+	metrics.record_request(
+		rule.rule if rule else 'unmatched', resp.status_code, time.perf_counter() - g.request_start,
+		g.get('stage_timer'), g.get('intent'),
+	)
+	return resp
+
+
+if config.METRICS_ENABLED:
+	app.before_request(start_request_clock)
+	app.after_request(record_metrics)
+
+
+@app.after_serving
+async def close_http_pool():
+	await aio_http.aclose()
+
+
+@app.route('/')
+@app.route('/<path:path>')
+async def send_frontend(path='index.html'):
+	status, body, headers = static.respond(path, request.args.get('v'), request.accept_encodings, request.if_none_match)
+	return Response(body, status=status, headers=headers)
+
+
+@app.post('/api/command')
+async def api_command():
+	data = await request.get_json(force=True, silent=True) or {}
+	text = (data.get('text') or '').strip()
+	if not text:
+		return jsonify({"error": "text is required"}), 400
+	lang_override = data.get('tts_lang')
+	if lang_override:
+		session['tts_lang'] = lang_override
+	try:
+		res = await process_text_command(text, get_audio_mode(data.get('audio_mode')))
+		return jsonify(res)
+	except admission.Overloaded as exc:
+		return shed(exc)
+	except Exception as exc:
+		logger.exception("/api/command error")
+		return jsonify({"error": str(exc)}), 500
+
+
+async def _synthesize_data_url(text: str, lang: str, limit: asyncio.Semaphore) -> str:
+	async with limit:
+		return to_base64_audio_mp3(await aio_tts.synthesize_speech(text, lang=lang))
+
+
+async def run_batch_async(commands, mode: str):
+	"""Async batch.run_batch: same ordering and de-duplication, TTS awaited on the shared pool."""
+	parsed = batch.interpret_batch([text for text, _ in commands])
+	limit = asyncio.Semaphore(max(config.BATCH_TTS_WORKERS, 1))
+	audio = {}
+	pending = deque()
+
+	async def finish(res, task):
+		if task is not None:
+			try:
+				res["audio_data_url"] = await task
+			except Exception as exc:
+				res["error"] = f"Speech synthesis failed: {exc}"
+		batch.count(res)
+		return json.dumps(res) + "\n"
+
+	try:
+		for index, ((text, lang), intent_res) in enumerate(zip(commands, parsed)):
+			res = batch.new_result(index, text, intent_res)
+			task = None
+			if not text:
+				res["error"] = "text is required"
+			else:
+				try:
+					async with admission.admit_async(admission.lane_for(res["intent"])):
+						res["response_text"], job = await execute_intent_async(res["intent"], res["entities"], lang)
+					if job is not None:
+						res["job"] = job.ref()
+					key = (res["response_text"], lang)
+					if mode == "url":
+						if key not in audio:
+							audio[key] = tts.start_synthesis(*key)
+						res["audio_id"] = audio[key]
+						res["audio_url"] = f"/api/audio/{audio[key]}"
+					elif mode == "data_url":
+						if key not in audio:
+							audio[key] = asyncio.ensure_future(_synthesize_data_url(*key, limit))
+						task = audio[key]
+				except admission.Overloaded as exc:
+					res["error"] = str(exc)
+					res["retry_after"] = exc.retry_after
+				except Exception as exc:
+					logger.exception("Batch command %d failed", index)
+					res["error"] = str(exc)
+			pending.append((res, task))
+			while pending and (pending[0][1] is None or pending[0][1].done()):
+				yield await finish(*pending.popleft())
+		while pending:
+			yield await finish(*pending.popleft())
+	finally:
+		for _, task in pending:
+			if task is not None:
+				task.cancel()
+
+
+@app.post('/api/commands')
+async def api_commands():
+	data = await request.get_json(force=True, silent=True)
+	try:
+		commands = batch.parse_commands(data, get_langs()[1])
+	except ValueError as exc:
+		return jsonify({"error": str(exc)}), 400
+	resp = Response(run_batch_async(commands, batch.audio_mode(data.get('audio_mode'))), mimetype='application/x-ndjson')
+	resp.timeout = None
+	return resp
+
+
+@app.post('/api/upload-audio')
+async def upload_audio():
+	timer = g.stage_timer = StageTimer()
+	try:
+		admission.check('audio')
+	except admission.Overloaded as exc:
+		return shed(exc)
+	with timer.stage('receive'):
+		files = await request.files
+	if 'file' not in files:
+		return jsonify({"error": "file is required (WAV or FLAC)"}), 400
+	file = files['file']
+	if not file.filename:
+		return jsonify({"error": "empty filename"}), 400
+	form = await request.form
+	try:
+		stt_lang, _ = get_langs()
+		async with admission.admit_async('audio', timer):
+			with timer.stage('decode'):
+				try:
+					audio = await asyncio.to_thread(read_audio, file.stream)
+				except ValueError as exc:
+					return jsonify({"error": str(exc)}), 400
+			with timer.stage('stt'):
+				text = await aio_speech.transcribe_audio(audio, language=stt_lang)
+		if not text:
+			return jsonify({"error": "Could not transcribe audio", "transcription": ""}), 400
+		res = await process_text_command(text, get_audio_mode(form.get('audio_mode')))
+		return jsonify(res)
+	except admission.Overloaded as exc:
+		return shed(exc)
+	except Exception as exc:
+		logger.exception("/api/upload-audio error")
+		return jsonify({"error": str(exc)}), 500
+	finally:
+		file.close()
+
+
+async def transcribe_segment(segment: bytes):
+	stt_lang, _ = get_langs()
+	async with admission.admit_async('audio', g.stage_timer):
+		with g.stage_timer.stage('stt'):
+			return await aio_speech.transcribe_pcm(segment, config.STREAM_SAMPLE_RATE, language=stt_lang)
+
+
+@app.post('/api/stream-audio')
+async def stream_audio():
+	"""Chunked raw PCM body; see backend.app.stream_audio."""
+	try:
+		admission.check('audio')
+	except admission.Overloaded as exc:
+		return shed(exc)
+	segmenter = vad.SpeechSegmenter.from_config()
+	g.stage_timer = StageTimer()
+
+	async def listen():
+		remaining = stream_max_bytes()
+		async for chunk in request.body:
+			remaining -= len(chunk)
+			if remaining < 0:
+				raise RequestEntityTooLarge()
+			closed = segmenter.feed(chunk)
+			if closed:
+				return closed[0]
+		return segmenter.flush()
+
+	try:
+		with g.stage_timer.stage('listen'):
+			segment = await asyncio.wait_for(listen(), config.STREAM_LISTEN_SECONDS)
+	except asyncio.TimeoutError:
+		return jsonify({"error": "No utterance before the listen deadline", "transcription": ""}), 408
+	except RequestEntityTooLarge:
+		return jsonify({"error": "Too much audio without an utterance", "transcription": ""}), 413
+	if not segment:
+		return jsonify({"error": "No speech detected", "transcription": ""}), 400
+	try:
+		text = await transcribe_segment(segment)
+		if not text:
+			return jsonify({"error": "Could not transcribe audio", "transcription": ""}), 400
+		res = await process_text_command(text, get_audio_mode(request.args.get('audio_mode')))
+		return jsonify(res)
+	except admission.Overloaded as exc:
+		return shed(exc)
+	except Exception as exc:
+		logger.exception("/api/stream-audio error")
+		return jsonify({"error": str(exc)}), 500
+
+
+@app.websocket('/api/stream-audio')
+async def stream_audio_ws():
+	"""
+	Binary messages carry raw 16-bit mono PCM at STREAM_SAMPLE_RATE as it is captured.
+	Each utterance the VAD closes is transcribed and executed while capture continues, and
+	answered with {"type": "result", ...} (the /api/command payload). A text message
+	{"type": "end"} flushes the open utterance; the server then sends {"type": "done"}.
+	"""
+	audio_mode = get_audio_mode(websocket.args.get('audio_mode'))
+	segmenter = vad.SpeechSegmenter.from_config()
+	segments: "asyncio.Queue" = asyncio.Queue()
+
+	async def recognize():
+		while True:
+			segment = await segments.get()
+			if segment is None:
+				return
+			await websocket.send_json({"type": "speech_end", "duration_ms": len(segment) * 500 // config.STREAM_SAMPLE_RATE})
+			g.stage_timer = StageTimer()
+			g.intent = None
+			status = 200
+			try:
+				text = await transcribe_segment(segment)
+				if not text:
+					res = {"error": "Could not transcribe audio", "transcription": ""}
+					status = 400
+				else:
+					res = await process_text_command(text, audio_mode)
+			except admission.Overloaded as exc:
+				res = {"error": str(exc), "retry_after": exc.retry_after}
+				status = 503
+			except Exception as exc:
+				logger.exception("/api/stream-audio websocket error")
+				res = {"error": str(exc)}
+				status = 500
+			if config.METRICS_ENABLED:
+				# Each utterance counts as one request; its latency runs from speech end to result.
+				metrics.record_request(
+					'ws:/api/stream-audio', status, time.perf_counter() - g.stage_timer.origin, g.stage_timer, g.intent,
+				)
+			res["type"] = "result"
+			res["server_timing"] = g.stage_timer.server_timing()
+			await websocket.send_json(res)
+
+	worker = asyncio.ensure_future(recognize())
+	try:
+		while True:
+			message = await websocket.receive()
+			if isinstance(message, bytes):
+				for segment in segmenter.feed(message):
+					segments.put_nowait(segment)
+				continue
+			try:
+				control = json.loads(message)
+			except ValueError:
+				control = {}
+			if control.get("type") == "end":
+				break
+		segment = segmenter.flush()
+		if segment:
+			segments.put_nowait(segment)
+		segments.put_nowait(None)
+		await worker
+		await websocket.send_json({"type": "done"})
+	finally:
+		worker.cancel()
+
+
+@app.get('/api/audio/<audio_id>')
+async def get_audio(audio_id):
+	if not AUDIO_ID_RE.fullmatch(audio_id):
+		return jsonify({"error": "unknown audio id"}), 404
+	if request.if_none_match.contains(audio_id):
+		resp = Response(b"", status=304)
+		resp.set_etag(audio_id)
+		return resp
+	if not request.range:
+		chunks = tts.stream_audio(audio_id)
+		if chunks is not None:
+			async def stream():
+				while True:
+					chunk = await asyncio.to_thread(next, chunks, None)
+					if chunk is None:
+						return
+					yield chunk
+			resp = Response(stream(), mimetype='audio/mpeg')
+			resp.set_etag(audio_id)
+			resp.cache_control.max_age = AUDIO_MAX_AGE
+			resp.headers['Accept-Ranges'] = 'bytes'
+			return resp
+	try:
+		mp3 = await asyncio.to_thread(tts.get_audio, audio_id)
+	except Exception as exc:
+		logger.exception("/api/audio error")
+		return jsonify({"error": str(exc)}), 500
+	if mp3 is None:
+		return jsonify({"error": "unknown audio id"}), 404
+	resp = Response(mp3, mimetype='audio/mpeg')
+	resp.set_etag(audio_id)
+	resp.cache_control.max_age = AUDIO_MAX_AGE
+	return await resp.make_conditional(request, accept_ranges=True, complete_length=len(mp3))
+
+
+@app.get('/api/jobs/<job_id>')
+async def get_job(job_id):
+	job = jobs.get_job(job_id)
+	if job is None:
+		return jsonify({"error": "unknown job id"}), 404
+	try:
+		wait = job_wait_seconds(request.args)
+	except ValueError:
+		return jsonify({"error": "invalid wait"}), 400
+	if wait:
+		await job.wait_async(wait)
+	return jsonify(job.to_dict())
+
+
+@app.post('/api/language')
+async def set_language():
+	data = await request.get_json(force=True, silent=True) or {}
+	stt_lang = data.get('stt_lang')
+	tts_lang = data.get('tts_lang')
+	if stt_lang:
+		session['stt_lang'] = stt_lang
+	if tts_lang:
+		session['tts_lang'] = tts_lang
+	return jsonify({"stt_lang": session.get('stt_lang'), "tts_lang": session.get('tts_lang')})
+
+
+@app.get('/api/reminders')
+async def api_reminders():
+	try:
+		query = parse_reminder_query(request.args)
+		limit = reminders_page_size(request.args)
+	except ValueError:
+		return jsonify({"error": "invalid cursor, limit or time filter"}), 400
+	try:
+		if wants_ndjson(request):
+			lines = to_ndjson(iter_reminders(**query))
+
+			async def stream():
+				# Pull blocks of lines off the cursor in a worker thread.
+				while True:
+					block = await asyncio.to_thread(lambda: "".join(itertools.islice(lines, 500)))
+					if not block:
+						return
+					yield block
+			return Response(stream(), mimetype='application/x-ndjson')
+		rows = await asyncio.to_thread(query_reminders, limit=limit + 1, **query)
+		return jsonify(reminders_page(rows, limit))
+	except Exception as exc:
+		return jsonify({"error": str(exc)}), 500
+
+
+@app.get('/api/reminders/events')
+async def reminder_events():
+	q = reminder_hub.subscribe_async()
+
+	async def stream():
+		try:
+			yield ": connected\n\n"
+			while True:
+				try:
+					event = await asyncio.wait_for(q.get(), SSE_KEEPALIVE_SECONDS)
+				except asyncio.TimeoutError:
+					yield ": keep-alive\n\n"
+					continue
+				yield sse_event(event)
+		finally:
+			reminder_hub.unsubscribe(q)
+	resp = Response(stream(), mimetype='text/event-stream')
+	resp.headers['Cache-Control'] = 'no-cache'
+	resp.timeout = None
+	return resp
+
+
+@app.get('/api/health')
+async def health():
+	return jsonify({"status": "ok"})
+
+
+@app.get('/api/tts-cache')
+async def tts_cache():
+	return jsonify(tts.cache_stats())
+
+
+@app.get('/api/metrics')
+async def api_metrics():
+	if not config.METRICS_ENABLED:
+		return jsonify({"error": "metrics are disabled (METRICS_ENABLED=false)"}), 404
+	return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def create_app(start_background: bool = True):
+	"""App factory: hypercorn 'backend.asgi:create_app()'."""
+	init_app()
+	if start_background:
+		start_services(PRELOAD_MODULES + ("aiohttp", "speech_recognition.recognizers.google"))
+	return app
+
+
+def main():
+	from hypercorn.asyncio import serve
+	from hypercorn.config import Config
+
+	hc = Config()
+	hc.bind = [f"{config.ASGI_HOST}:{config.ASGI_PORT}"]
+	asyncio.run(serve(create_app(), hc))
+
+
+if __name__ == '__main__':
+	main()
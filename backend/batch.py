@@ -0,0 +1,149 @@
+"""
+Batch text commands (POST /api/commands) for integration clients and log replays.
+
+The whole batch is interpreted up front, each distinct text once. Commands then execute one after
+another in input order, so side effects (reminders, app launches) happen in the order they were
+sent; job intents are acknowledged exactly as on /api/command. Each command takes a slot in its
+admission lane as a single request would; a shed command gets an error and retry_after. Each
+distinct (response text, language) is synthesized once, BATCH_TTS_WORKERS at a time, while later
+commands are still executing. Results are yielded in input order, each as soon as it and
+everything before it is ready, so the server can stream them as NDJSON.
+
+Request body:
+  {"commands": ["what time is it", {"text": "weather in Paris", "tts_lang": "fr"}, ...],
+   "audio_mode": "data_url" | "url" | "none", "tts_lang": "en"}
+"""
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from backend import admission, config, jobs, metrics
+from backend.nlu.rule_based import interpret
+from backend.services import tts
+
+logger = logging.getLogger(__name__)
+
+AUDIO_MODES = ("data_url", "url", "none")
+
+_tts_pool = ThreadPoolExecutor(max_workers=max(config.BATCH_TTS_WORKERS, 1), thread_name_prefix="batch-tts")
+
+
+def _string(obj: Dict[str, Any], key: str) -> Optional[str]:
+	value = obj.get(key)
+	if value is not None and not isinstance(value, str):
+		raise ValueError(f"{key} must be a string")
+	return value
+
+
+def parse_commands(data: Any, default_lang: str) -> List[Tuple[str, str]]:
+	"""
+	[(text, tts_lang), ...] from a request body. Raises ValueError for a malformed body (including
+	a text or tts_lang that is not a string) or one over BATCH_MAX_COMMANDS; an item with no text
+	is kept (as "") and answered with an error.
+	"""
+	commands = data.get("commands") if isinstance(data, dict) else None
+	if not isinstance(commands, list) or not commands:
+		raise ValueError("commands must be a non-empty list")
+	if len(commands) > config.BATCH_MAX_COMMANDS:
+		raise ValueError(f"at most {config.BATCH_MAX_COMMANDS} commands per batch")
+	lang = _string(data, "tts_lang") or default_lang
+	parsed = []
+	for item in commands:
+		if isinstance(item, dict):
+			parsed.append(((_string(item, "text") or "").strip(), _string(item, "tts_lang") or lang))
+		elif isinstance(item, str):
+			parsed.append((item.strip(), lang))
+		else:
+			raise ValueError("each command must be a string or an object with text")
+	return parsed
+
+
+def audio_mode(requested: Optional[str]) -> str:
+	mode = requested or config.AUDIO_RESPONSE_MODE
+	return mode if mode in AUDIO_MODES else "data_url"
+
+
+def interpret_batch(texts: List[str]) -> List[Dict[str, Any]]:
+	"""interpret() for every text, running it once per distinct text."""
+	seen: Dict[str, Dict[str, Any]] = {}
+	results = []
+	for text in texts:
+		res = seen.get(text)
+		if res is None:
+			res = seen[text] = interpret(text)
+		results.append(res)
+	return results
+
+
+def new_result(index: int, text: str, intent_res: Dict[str, Any]) -> Dict[str, Any]:
+	return {
+		"index": index,
+		"transcription": text,
+		"intent": intent_res.get("intent"),
+		"entities": intent_res.get("entities", {}),
+	}
+
+
+def count(res: Dict[str, Any]) -> None:
+	if config.METRICS_ENABLED and res.get("intent"):
+		metrics.commands_total.inc(res["intent"], "error" if "error" in res else "ok")
+
+
+def _synthesize_data_url(text: str, language: str) -> str:
+	return tts.to_base64_audio_mp3(tts.synthesize_speech(text, lang=language))
+
+
+def _finish(res: Dict[str, Any], audio: Optional[Future]) -> Dict[str, Any]:
+	if audio is not None:
+		try:
+			res["audio_data_url"] = audio.result()
+		except Exception as exc:
+			res["error"] = f"Speech synthesis failed: {exc}"
+	count(res)
+	return res
+
+
+def run_batch(commands: List[Tuple[str, str]], mode: str) -> Iterator[Dict[str, Any]]:
+	"""One result per command, in input order."""
+	parsed = interpret_batch([text for text, _ in commands])
+	audio: Dict[Tuple[str, str], Any] = {}
+	pending: Deque[Tuple[Dict[str, Any], Optional[Future]]] = deque()
+	try:
+		for index, ((text, lang), intent_res) in enumerate(zip(commands, parsed)):
+			res = new_result(index, text, intent_res)
+			fut = None
+			if not text:
+				res["error"] = "text is required"
+			else:
+				try:
+					with admission.admit(admission.lane_for(res["intent"])):
+						res["response_text"], job = jobs.run_intent(res["intent"], res["entities"], lang)
+					if job is not None:
+						res["job"] = job.ref()
+					key = (res["response_text"], lang)
+					if mode == "url":
+						if key not in audio:
+							audio[key] = tts.start_synthesis(*key)
+						res["audio_id"] = audio[key]
+						res["audio_url"] = f"/api/audio/{audio[key]}"
+					elif mode == "data_url":
+						if key not in audio:
+							audio[key] = _tts_pool.submit(_synthesize_data_url, *key)
+						fut = audio[key]
+				except admission.Overloaded as exc:
+					res["error"] = str(exc)
+					res["retry_after"] = exc.retry_after
+				except Exception as exc:
+					logger.exception("Batch command %d failed", index)
+					res["error"] = str(exc)
+			pending.append((res, fut))
+			while pending and (pending[0][1] is None or pending[0][1].done()):
+				yield _finish(*pending.popleft())
+		while pending:
+			yield _finish(*pending.popleft())
+	finally:
+		# Client gone: drop synthesis nobody will read.
+		for _, fut in pending:
+			if fut is not None:
+				fut.cancel()
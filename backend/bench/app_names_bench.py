@@ -0,0 +1,107 @@
+"""
+App-name resolution: the original linear alias scan vs. the alias index with fuzzy fallback.
+
+Run: python -m backend.bench.app_names_bench [--typos 2000] [--repeat 200000] [--seed 7]
+
+Reports lookup latency for exact hits, fuzzy hits (cached and uncached) and misses, then
+accuracy on --typos single-edit misspellings of the known aliases (a letter dropped, doubled,
+swapped or replaced, the way STT output tends to be off) and how often words that are not
+apps get resolved to one anyway.
+"""
+import argparse
+import random
+import string
+import time
+from typing import Callable, Dict, List, Tuple
+
+import backend.executor  # noqa: F401  (registers the executor's app names)
+from backend.nlu.rule_based import APP_ALIASES, app_resolver, normalize_app
+
+NOT_APPS = [
+	"the door", "music", "my email", "window", "the lights", "a new tab", "settings", "door",
+	"youtube", "photos", "the garage", "camera", "mail", "maps", "files", "clock", "weather",
+]
+
+
+def normalize_linear(name: str) -> str:
+	"""Reference: the original exact-only scan over APP_ALIASES."""
+	name_l = name.strip().lower()
+	for canonical, aliases in APP_ALIASES.items():
+		if name_l == canonical or any(name_l == a for a in aliases):
+			return canonical
+	return name_l
+
+
+def misspell(word: str, rng: random.Random) -> str:
+	i = rng.randrange(len(word))
+	op = rng.choice(("drop", "double", "swap", "replace"))
+	if op == "drop" and len(word) > 1:
+		return word[:i] + word[i + 1:]
+	if op == "double":
+		return word[:i] + word[i] + word[i:]
+	if op == "swap" and i < len(word) - 1:
+		return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+	return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def typo_corpus(n: int, rng: random.Random) -> List[Tuple[str, str]]:
+	aliases = [(a, c) for c, variants in APP_ALIASES.items() for a in variants if len(a.replace(" ", "")) >= 5]
+	corpus = []
+	while len(corpus) < n:
+		alias, canonical = rng.choice(aliases)
+		typo = misspell(alias, rng)
+		if typo != alias:
+			corpus.append((typo, canonical))
+	return corpus
+
+
+def _avg_ns(fn: Callable[[], object], repeat: int) -> float:
+	start = time.perf_counter()
+	for _ in range(repeat):
+		fn()
+	return (time.perf_counter() - start) / repeat * 1e9
+
+
+def accuracy(fn: Callable[[str], str], corpus: List[Tuple[str, str]]) -> Dict[str, int]:
+	known = set(APP_ALIASES) | set(app_resolver()._exact.values())
+	counts = {"right": 0, "wrong": 0, "unresolved": 0}
+	for typo, canonical in corpus:
+		got = fn(typo)
+		if got == canonical:
+			counts["right"] += 1
+		elif got in known:
+			counts["wrong"] += 1
+		else:
+			counts["unresolved"] += 1
+	return counts
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--typos", type=int, default=2000)
+	parser.add_argument("--repeat", type=int, default=200000)
+	parser.add_argument("--seed", type=int, default=7)
+	args = parser.parse_args()
+
+	resolver = app_resolver()
+	print(f"{len(resolver._exact)} exact keys, {len(resolver._keys)} fuzzy keys, {len(resolver._grams)} trigrams")
+	print(f"{'lookup':<28} {'linear ns':>10} {'index ns':>10}")
+	for label, name in (("exact hit", "whatsapp"), ("exact hit (spoken form)", "note pad app"),
+			("fuzzy hit (cached)", "calculater"), ("miss (cached)", "the door")):
+		normalize_app(name)
+		print(f"{label:<28} {_avg_ns(lambda: normalize_linear(name), args.repeat):10.0f} "
+			f"{_avg_ns(lambda: normalize_app(name), args.repeat):10.0f}")
+	fuzzy = _avg_ns(lambda: resolver._fuzzy("calculater"), max(1, args.repeat // 100))
+	print(f"{'fuzzy hit (uncached)':<28} {'':>10} {fuzzy:10.0f}")
+
+	corpus = typo_corpus(args.typos, random.Random(args.seed))
+	for label, fn in (("linear", normalize_linear), ("index", normalize_app)):
+		c = accuracy(fn, corpus)
+		print(f"{label:<8} misspellings: {c['right'] / len(corpus):6.1%} right, "
+			f"{c['wrong'] / len(corpus):6.1%} wrong app, {c['unresolved'] / len(corpus):6.1%} unresolved")
+	false_hits = [(n, normalize_app(n)) for n in NOT_APPS if resolver.resolve(n)[0] is not None]
+	print(f"non-app names resolved to an app: {len(false_hits)}/{len(NOT_APPS)} {false_hits or ''}")
+
+
+if __name__ == "__main__":
+	main()
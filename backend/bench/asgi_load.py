@@ -0,0 +1,146 @@
+"""
+Load test: threaded WSGI app vs. the async ASGI app under concurrent network-bound requests.
+
+Both servers run as subprocesses against local stubs (backend.bench.stubs) with injected
+latency, so every "weather in <city>" command waits on geocode + forecast + gTTS upstream calls.
+The WSGI server gets a fixed pool of worker threads, like a gthread worker; the ASGI server is
+a single event loop.
+
+Run: python -m backend.bench.asgi_load [--requests 1000] [--concurrency 200] [--latency 0.1] [--threads 8]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import aiohttp
+
+from backend.bench.stubs import free_port, spawn, stub_env
+
+CITIES = ["London", "Paris", "Berlin", "Madrid", "Rome", "Oslo", "Vienna", "Dublin"]
+
+
+def serve_wsgi(port: int, threads: int) -> None:
+	"""Serve backend.app with a bounded thread pool (one request per thread, like gunicorn gthread)."""
+	from werkzeug.serving import BaseWSGIServer
+	from backend.app import create_app
+
+	app = create_app(start_background=False)
+
+	class PooledWSGIServer(BaseWSGIServer):
+		request_queue_size = 2048
+
+		def __init__(self, *args, **kwargs):
+			super().__init__(*args, **kwargs)
+			self._pool = ThreadPoolExecutor(max_workers=threads)
+
+		def process_request(self, request, client_address):
+			self._pool.submit(self._handle, request, client_address)
+
+		def _handle(self, request, client_address):
+			try:
+				self.finish_request(request, client_address)
+			except Exception:
+				self.handle_error(request, client_address)
+			finally:
+				self.shutdown_request(request)
+
+	PooledWSGIServer("127.0.0.1", port, app).serve_forever()
+
+
+def percentile(values: List[float], pct: float) -> float:
+	ordered = sorted(values)
+	idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+	return ordered[idx]
+
+
+async def run_load(base_url: str, total: int, concurrency: int) -> Dict[str, float]:
+	sem = asyncio.Semaphore(concurrency)
+	latencies: List[float] = []
+	errors = 0
+	connector = aiohttp.TCPConnector(limit=concurrency)
+	async with aiohttp.ClientSession(base_url, connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as client:
+		async def one(i: int) -> None:
+			nonlocal errors
+			async with sem:
+				start = time.perf_counter()
+				try:
+					async with client.post("/api/command", json={"text": f"weather in {CITIES[i % len(CITIES)]}"}) as resp:
+						await resp.read()
+						if resp.status != 200:
+							errors += 1
+				except aiohttp.ClientError:
+					errors += 1
+				latencies.append(time.perf_counter() - start)
+
+		start = time.perf_counter()
+		await asyncio.gather(*(one(i) for i in range(total)))
+		elapsed = time.perf_counter() - start
+	return {
+		"requests": total,
+		"errors": errors,
+		"rps": total / elapsed,
+		"p50_ms": statistics.median(latencies) * 1000,
+		"p95_ms": percentile(latencies, 95) * 1000,
+		"p99_ms": percentile(latencies, 99) * 1000,
+	}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--requests", type=int, default=1000)
+	parser.add_argument("--concurrency", type=int, default=200)
+	parser.add_argument("--latency", type=float, default=0.1, help="stub latency per upstream call (s)")
+	parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads")
+	parser.add_argument("--serve-wsgi", type=int, metavar="PORT", help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.serve_wsgi:
+		serve_wsgi(args.serve_wsgi, args.threads)
+		return
+
+	stub_port = free_port()
+	stub = spawn(["backend.bench.stubs", "--port", str(stub_port), "--latency", str(args.latency)], {}, stub_port)
+	procs = [stub]
+	try:
+		with tempfile.TemporaryDirectory() as tmp:
+			env = dict(
+				stub_env(f"http://127.0.0.1:{stub_port}"),
+				# Disable the TTS cache so every request really goes upstream.
+				TTS_CACHE_MEMORY_BYTES="0",
+				TTS_CACHE_DISK_BYTES="0",
+				TTS_CACHE_DIR=os.path.join(tmp, "tts"),
+				TTS_WARMUP="false",
+				USE_SQLITE="false",
+			)
+			results = {}
+			for name in ("wsgi", "asgi"):
+				port = free_port()
+				if name == "wsgi":
+					module = ["backend.bench.asgi_load", "--serve-wsgi", str(port), "--threads", str(args.threads)]
+					server = spawn(module, env, port)
+				else:
+					server = spawn(["backend.asgi"], dict(env, ASGI_PORT=str(port)), port)
+				procs.append(server)
+				try:
+					results[name] = asyncio.run(run_load(f"http://127.0.0.1:{port}", args.requests, args.concurrency))
+				finally:
+					server.terminate()
+					server.wait()
+	finally:
+		for proc in procs:
+			if proc.poll() is None:
+				proc.terminate()
+				proc.wait()
+
+	print(f"{args.requests} requests, concurrency {args.concurrency}, stub latency {args.latency * 1000:.0f} ms/call, WSGI threads {args.threads}")
+	for name, r in results.items():
+		print(f"{name:>5}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms  p99 {r['p99_ms']:7.1f} ms  errors {r['errors']}")
+
+
+if __name__ == "__main__":
+	main()
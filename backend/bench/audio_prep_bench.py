@@ -0,0 +1,100 @@
+"""
+Benchmark for backend.services.audio_prep (pre-STT conditioning).
+
+Run: python -m backend.bench.audio_prep_bench [--repeat 20] [--speech 3] [--silence 1.5]
+
+For a few typical upload formats, builds a WAV of --silence seconds of near-silence, --speech
+seconds of speech-like signal and --silence seconds of near-silence, then reports:
+  - preprocessing throughput in input samples per second (all channels), and
+  - the FLAC payload actually POSTed to the recognizer, raw (as sr.AudioFile would decode it)
+    versus preprocessed, with the time spent encoding each.
+"""
+import argparse
+import io
+import time
+import wave
+from typing import List, Tuple
+
+import numpy as np
+import speech_recognition as sr
+from speech_recognition.recognizers.google import create_request_builder
+
+from backend import config
+from backend.services.audio_prep import preprocess_pcm
+
+FORMATS: List[Tuple[str, int, int, int]] = [
+	# name, rate, channels, sample width
+	("48k stereo 16-bit", 48000, 2, 2),
+	("44.1k mono 16-bit", 44100, 1, 2),
+	("16k mono 16-bit", 16000, 1, 2),
+	("48k mono 24-bit", 48000, 1, 3),
+]
+
+
+def speech_like(rate: int, seconds: float, rng: np.random.Generator) -> np.ndarray:
+	"""Noise shaped by a syllable-rate envelope over a few harmonics; quiet, as laptop mics are."""
+	t = np.arange(int(rate * seconds)) / rate
+	envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) ** 2
+	voice = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((140, 280, 420, 900), 1))
+	return (0.06 * envelope * (voice + 0.3 * rng.standard_normal(t.size))).astype(np.float32)
+
+
+def build_wav(rate: int, channels: int, width: int, speech_s: float, silence_s: float, seed: int = 7) -> bytes:
+	rng = np.random.default_rng(seed)
+	quiet = lambda s: (0.002 * rng.standard_normal(int(rate * s))).astype(np.float32)
+	mono = np.concatenate([quiet(silence_s), speech_like(rate, speech_s, rng), quiet(silence_s)])
+	data = np.repeat(mono[:, None], channels, axis=1).ravel()
+	scaled = np.clip(data * 2 ** (8 * width - 1), -2 ** (8 * width - 1), 2 ** (8 * width - 1) - 1).astype(np.int32)
+	if width == 2:
+		pcm = scaled.astype("<i2").tobytes()
+	else:
+		pcm = scaled.astype("<i4").view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+	buf = io.BytesIO()
+	with wave.open(buf, "wb") as wf:
+		wf.setnchannels(channels)
+		wf.setsampwidth(width)
+		wf.setframerate(rate)
+		wf.writeframes(pcm)
+	return buf.getvalue()
+
+
+def upstream_payload(audio: sr.AudioData) -> Tuple[int, float]:
+	builder = create_request_builder(endpoint=config.STT_ENDPOINT)
+	start = time.perf_counter()
+	body = builder.build_data(audio)
+	return len(body), time.perf_counter() - start
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--repeat", type=int, default=20)
+	parser.add_argument("--speech", type=float, default=3.0)
+	parser.add_argument("--silence", type=float, default=1.5)
+	args = parser.parse_args()
+
+	print(f"{'format':<18} {'prep Msamp/s':>12} {'raw FLAC':>10} {'prep FLAC':>10} {'raw s':>6} {'prep s':>6} {'encode raw/prep ms':>19}")
+	for name, rate, channels, width in FORMATS:
+		wav = build_wav(rate, channels, width, args.speech, args.silence)
+		with wave.open(io.BytesIO(wav), "rb") as wf:
+			frames = wf.readframes(wf.getnframes())
+		with sr.AudioFile(io.BytesIO(wav)) as source:
+			raw_audio = sr.Recognizer().record(source)
+
+		start = time.perf_counter()
+		for _ in range(args.repeat):
+			pcm, out_rate = preprocess_pcm(frames, rate, width, channels)
+		elapsed = (time.perf_counter() - start) / args.repeat
+		samples = len(frames) // width
+
+		raw_bytes, raw_enc = upstream_payload(raw_audio)
+		prep_bytes, prep_enc = upstream_payload(sr.AudioData(pcm, out_rate, 2))
+		raw_s = len(frames) / (rate * channels * width)
+		prep_s = len(pcm) / (2 * out_rate)
+		print(
+			f"{name:<18} {samples / elapsed / 1e6:12.1f} {raw_bytes:>10,} {prep_bytes:>10,} "
+			f"{raw_s:6.2f} {prep_s:6.2f} {raw_enc * 1e3:9.1f} / {prep_enc * 1e3:<7.1f}"
+		)
+
+
+if __name__ == "__main__":
+	main()
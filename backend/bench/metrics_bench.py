@@ -0,0 +1,61 @@
+"""
+Per-request cost of backend.metrics.
+
+Run: python -m backend.bench.metrics_bench [--requests 200000] [--threads 1,4,16]
+
+Records --requests synthetic /api/upload-audio requests (six timed stages and an intent, as
+the real pipeline produces) from each thread count and reports the cost per request, then the
+time to render the resulting exposition. With METRICS_ENABLED=false none of this runs.
+"""
+import argparse
+import threading
+import time
+
+from backend import metrics
+from backend.utils import StageTimer
+
+INTENTS = ["time", "date", "weather_query", "open_app", "set_reminder", "none"]
+
+
+def fake_timer(i: int) -> StageTimer:
+	timer = StageTimer()
+	start = timer.origin
+	for k, stage in enumerate(("receive", "decode", "stt", "interpret", "execute", "tts")):
+		timer.mark(stage, start, start + 0.0004 * (k + 1) * (1 + i % 7))
+	return timer
+
+
+def run(requests: int, threads: int) -> float:
+	timers = [fake_timer(i) for i in range(64)]
+	per_thread = requests // threads
+
+	def worker(offset: int) -> None:
+		for i in range(per_thread):
+			j = offset + i
+			metrics.record_request("/api/upload-audio", 200, 0.05 + (j % 11) * 0.01, timers[j % 64], INTENTS[j % len(INTENTS)])
+
+	pool = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+	start = time.perf_counter()
+	for t in pool:
+		t.start()
+	for t in pool:
+		t.join()
+	return (time.perf_counter() - start) / (per_thread * threads)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--requests", type=int, default=200000)
+	parser.add_argument("--threads", default="1,4,16")
+	args = parser.parse_args()
+
+	print(f"{'threads':>7} {'us/request':>11}")
+	for threads in (int(t) for t in args.threads.split(",")):
+		print(f"{threads:7d} {run(args.requests, threads) * 1e6:11.2f}")
+	start = time.perf_counter()
+	body = metrics.render()
+	print(f"render: {len(body.splitlines())} lines, {len(body) / 1024:.1f} KB in {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark for backend.nlu.rule_based.interpret.
+
+Run: python -m backend.bench.nlu_bench [--size 300000] [--seed 7]
+
+Generates a synthetic command corpus, checks that the compiled matcher returns exactly
+what the original linear scan over INTENTS returns, then reports utterances per second
+for both.
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from backend.nlu import rule_based
+from backend.nlu.rule_based import INTENTS, interpret, normalize_app
+
+TEMPLATES = [
+	"hello", "hey nova", "hi there", "bye", "goodbye for now", "see you later",
+	"what's the time?", "what time is it", "what's the date?", "what day is it today",
+	"open {app}", "launch {app}", "start {app}", "close {app}", "quit {app}", "exit {app}",
+	"open https://{site}", "open www.{site}", "open /home/user/{word}", "open C:\\Users\\Public",
+	"type {words}", "write {words}", "dictate {words}",
+	"save as {word}.txt", "save {words} as {word}.txt", "save {words}",
+	"remind me to {words} in {n} minutes", "remind me to {words} at {h}:{m:02d} {ampm}",
+	"weather in {city}", "what's the forecast", "weather",
+	"set language to es", "switch lang to en-GB",
+	# Misses: these scan the text without matching any intent.
+	"{words}", "please {words}", "how are you doing", "tell me a joke about {word}",
+	"play some music", "turn up the volume", "what is the meaning of {word}",
+]
+APPS = ["notepad", "note pad", "calculator", "calc", "vs code", "chrome", "whatsapp", "instagram", "spotify"]
+SITES = ["example.com", "instagram.com", "news.ycombinator.com/item?id=1"]
+CITIES = ["London", "New York", "Paris", "San Francisco", "Tokyo", "Delhi"]
+WORDS = [
+	"buy", "milk", "call", "mom", "stand", "up", "water", "plants", "report", "draft",
+	"meeting", "notes", "groceries", "walk", "the", "dog", "pay", "rent", "email", "bob",
+]
+
+
+def build_corpus(size: int, seed: int = 7) -> List[str]:
+	rng = random.Random(seed)
+	corpus = []
+	for _ in range(size):
+		tpl = rng.choice(TEMPLATES)
+		corpus.append(tpl.format(
+			app=rng.choice(APPS),
+			site=rng.choice(SITES),
+			city=rng.choice(CITIES),
+			word=rng.choice(WORDS),
+			words=" ".join(rng.choices(WORDS, k=rng.randint(2, 8))),
+			n=rng.randint(1, 120),
+			h=rng.randint(1, 12),
+			m=rng.randint(0, 59),
+			ampm=rng.choice(["am", "pm", ""]),
+		))
+	return corpus
+
+
+def interpret_linear(text: str) -> Dict[str, Any]:
+	"""Reference implementation: try every pattern in INTENTS order."""
+	text = (text or "").strip()
+	if not text:
+		return {"intent": "none", "entities": {}}
+	for intent, pattern in INTENTS.items():
+		m = pattern.search(text)
+		if m:
+			entities = {k: v for k, v in (m.groupdict() or {}).items() if v}
+			if "app" in entities:
+				entities["app"] = normalize_app(entities["app"])
+			if intent == "save_text" and "content" in entities:
+				entities["content"] = entities["content"].strip()
+			return {"intent": intent, "entities": entities}
+	return {"intent": "none", "entities": {}}
+
+
+def _time(fn, corpus: List[str]) -> float:
+	start = time.perf_counter()
+	for text in corpus:
+		fn(text)
+	return time.perf_counter() - start
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--size", type=int, default=300_000)
+	parser.add_argument("--seed", type=int, default=7)
+	args = parser.parse_args()
+
+	corpus = build_corpus(args.size, args.seed)
+	mismatches = [t for t in set(corpus) if interpret(t) != interpret_linear(t)]
+	if mismatches:
+		raise SystemExit(f"compiled matcher disagrees with linear scan on {len(mismatches)} inputs, e.g. {mismatches[:3]!r}")
+
+	triggered = sum(1 for t in corpus if rule_based._match_intent(t.strip()))
+	print(f"corpus: {len(corpus)} utterances ({len(set(corpus))} unique, {len(corpus) - triggered} without a trigger word)")
+	for name, fn in (("linear", interpret_linear), ("compiled", interpret)):
+		elapsed = _time(fn, corpus)
+		print(f"{name:>9}: {len(corpus) / elapsed:12,.0f} utt/s  ({elapsed * 1e6 / len(corpus):.2f} us/utt)")
+
+
+if __name__ == "__main__":
+	main()
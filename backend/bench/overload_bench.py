@@ -0,0 +1,150 @@
+"""
+Overload: latency of cheap local intents while network-bound requests saturate the server,
+with admission control off and on.
+
+Run: python -m backend.bench.overload_bench [--servers wsgi,asgi] [--duration 10] [--flood 64]
+     [--latency 0.5] [--threads 16] [--connections 16]
+
+--flood clients send "weather in <city>" back to back (geocode + forecast + gTTS against the stub
+at --latency s per call) while one probe client sends "what time is it" / "hello" / "what's the
+date" every --interval s. The WSGI server has --threads worker threads (backend.bench.asgi_load),
+the ASGI server --connections pooled upstream connections; both are shared by the two kinds of
+request. With admission on, the network lane gets --network-limit slots and --network-queue
+queue places (leaving threads and connections for the local fast lane) and sheds the rest with
+503. Reported per run: probe p50/p95/p99, flood throughput and latency of answered requests,
+and how many were shed.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+
+from backend.bench.asgi_load import CITIES, percentile
+from backend.bench.stubs import free_port, spawn, stub_env
+
+PROBES = ["what time is it", "hello", "what's the date"]
+
+
+async def run_overload(base_url: str, duration: float, flood: int, interval: float) -> Dict[str, Any]:
+	probe_latencies: List[float] = []
+	flood_latencies: List[float] = []
+	shed = errors = 0
+	retry_after: List[int] = []
+	stop = time.monotonic() + duration
+	connector = aiohttp.TCPConnector(limit=flood + 8)
+	async with aiohttp.ClientSession(base_url, connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as client:
+		async def flooder(i: int) -> None:
+			nonlocal shed, errors
+			while time.monotonic() < stop:
+				start = time.perf_counter()
+				try:
+					async with client.post("/api/command", json={"text": f"weather in {CITIES[i % len(CITIES)]}"}) as resp:
+						await resp.read()
+						if resp.status == 503:
+							shed += 1
+							retry_after.append(int(resp.headers.get("Retry-After", 0)))
+							# A shed request costs the server next to nothing; back off briefly like a client would.
+							await asyncio.sleep(0.05)
+						elif resp.status == 200:
+							flood_latencies.append(time.perf_counter() - start)
+						else:
+							errors += 1
+				except aiohttp.ClientError:
+					errors += 1
+
+		async def prober() -> None:
+			nonlocal errors
+			i = 0
+			await asyncio.sleep(min(1.0, duration / 4))  # let the flood build up
+			while time.monotonic() < stop:
+				start = time.perf_counter()
+				async with client.post("/api/command", json={"text": PROBES[i % len(PROBES)]}) as resp:
+					await resp.read()
+					if resp.status == 200:
+						probe_latencies.append(time.perf_counter() - start)
+					else:
+						errors += 1
+				i += 1
+				await asyncio.sleep(interval)
+
+		await asyncio.gather(prober(), *(flooder(i) for i in range(flood)))
+	return {
+		"probe_p50_ms": statistics.median(probe_latencies) * 1e3 if probe_latencies else float("nan"),
+		"probe_p95_ms": percentile(probe_latencies, 95) * 1e3 if probe_latencies else float("nan"),
+		"probe_p99_ms": percentile(probe_latencies, 99) * 1e3 if probe_latencies else float("nan"),
+		"probes": len(probe_latencies),
+		"flood_rps": len(flood_latencies) / duration,
+		"flood_p50_ms": statistics.median(flood_latencies) * 1e3 if flood_latencies else float("nan"),
+		"shed": shed,
+		"retry_after": statistics.median(retry_after) if retry_after else 0,
+		"errors": errors,
+	}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--servers", default="wsgi,asgi")
+	parser.add_argument("--duration", type=float, default=10.0)
+	parser.add_argument("--flood", type=int, default=64, help="concurrent network-bound clients")
+	parser.add_argument("--interval", type=float, default=0.05, help="pause between probe requests (s)")
+	parser.add_argument("--latency", type=float, default=0.5, help="stub latency per upstream call (s)")
+	parser.add_argument("--threads", type=int, default=16, help="WSGI worker threads")
+	parser.add_argument("--connections", type=int, default=16, help="ASGI upstream connection pool")
+	parser.add_argument("--network-limit", type=int, default=8)
+	parser.add_argument("--network-queue", type=int, default=4)
+	args = parser.parse_args()
+
+	stub_port = free_port()
+	stub = spawn(["backend.bench.stubs", "--port", str(stub_port), "--latency", str(args.latency)], {}, stub_port)
+	results = {}
+	try:
+		with tempfile.TemporaryDirectory() as tmp:
+			env = dict(
+				stub_env(f"http://127.0.0.1:{stub_port}"),
+				# Every reply goes upstream for TTS, so local intents need a free thread or connection too.
+				TTS_CACHE_MEMORY_BYTES="0",
+				TTS_CACHE_DISK_BYTES="0",
+				TTS_CACHE_DIR=os.path.join(tmp, "tts"),
+				TTS_WARMUP="false",
+				TTS_SPECULATIVE="false",
+				USE_SQLITE="false",
+				ASYNC_HTTP_MAX_CONNECTIONS=str(args.connections),
+				ADMISSION_LIMITS=f"network={args.network_limit}",
+				ADMISSION_QUEUES=f"network={args.network_queue}",
+			)
+			for name in filter(None, (s.strip() for s in args.servers.split(","))):
+				for admission in ("false", "true"):
+					port = free_port()
+					run_env = dict(env, ADMISSION_ENABLED=admission, ASGI_PORT=str(port))
+					if name == "wsgi":
+						module = ["backend.bench.asgi_load", "--serve-wsgi", str(port), "--threads", str(args.threads)]
+					else:
+						module = ["backend.asgi"]
+					server = spawn(module, run_env, port)
+					try:
+						results[(name, admission)] = asyncio.run(
+							run_overload(f"http://127.0.0.1:{port}", args.duration, args.flood, args.interval)
+						)
+					finally:
+						server.terminate()
+						server.wait()
+	finally:
+		stub.terminate()
+		stub.wait()
+
+	print(f"{args.flood} flood clients for {args.duration:.0f} s, stub latency {args.latency * 1000:.0f} ms/call, "
+		f"WSGI threads {args.threads}, ASGI connections {args.connections}, "
+		f"network lane {args.network_limit} slots + {args.network_queue} queued")
+	print(f"{'server':<6} {'admission':<9} {'local p50':>10} {'p95':>9} {'p99':>9} {'flood req/s':>12} {'flood p50':>10} {'shed':>6} {'Retry-After':>11} {'errors':>6}")
+	for (name, admission), r in results.items():
+		print(f"{name:<6} {'on' if admission == 'true' else 'off':<9} {r['probe_p50_ms']:8.1f}ms {r['probe_p95_ms']:7.1f}ms "
+			f"{r['probe_p99_ms']:7.1f}ms {r['flood_rps']:12.1f} {r['flood_p50_ms']:8.1f}ms {r['shed']:6d} {r['retry_after']:9.0f} s {r['errors']:6d}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,151 @@
+"""
+Production server (backend.serve, pre-forked workers) vs. the development server (python -m backend.app).
+
+Run: python -m backend.bench.prefork_bench [--workers 0] [--duration 10] [--concurrency 64] [--max-requests 2000]
+
+Both servers run against the local stubs (backend.bench.stubs, --latency s per upstream call);
+the development server with FLASK_DEBUG=false, so the reloader and debugger do not skew it.
+Reported per server: the time from launch until /api/health answers and the latency of the
+first "hello" after that (the development server warms its TTS cache in the background, a
+worker before it accepts). Then --concurrency clients send a mix of local commands and page
+loads for --duration s: throughput, p50/p99 latency and errors. The production server
+recycles each worker after about --max-requests requests, so the run also shows whether
+recycling drops requests.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import aiohttp
+
+from backend.bench.asgi_load import percentile
+from backend.bench.stubs import free_port, spawn, stub_env
+
+COMMANDS = ["hello", "what time is it", "what's the date", "thank you"]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		try:
+			with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+				return
+		except OSError:
+			time.sleep(0.01)
+	raise RuntimeError(f"server on port {port} did not come up")
+
+
+async def first_reply(base_url: str, launched: float) -> Tuple[float, float]:
+	"""Seconds from launch until /api/health answers, and the latency of the first "hello" after that."""
+	async with aiohttp.ClientSession(base_url) as client:
+		async with client.get("/api/health") as resp:
+			await resp.read()
+			resp.raise_for_status()
+		ready = time.perf_counter() - launched
+		start = time.perf_counter()
+		async with client.post("/api/command", json={"text": "hello"}) as resp:
+			await resp.read()
+			resp.raise_for_status()
+		return ready, time.perf_counter() - start
+
+
+async def run_load(base_url: str, duration: float, concurrency: int) -> Dict[str, Any]:
+	latencies: List[float] = []
+	errors = 0
+	stop = time.monotonic() + duration
+	connector = aiohttp.TCPConnector(limit=concurrency)
+	async with aiohttp.ClientSession(base_url, connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as client:
+		async def user(i: int) -> None:
+			nonlocal errors
+			n = i
+			while time.monotonic() < stop:
+				n += 1
+				start = time.perf_counter()
+				try:
+					if n % 5 == 0:
+						request = client.get("/", headers={"Accept-Encoding": "gzip"})
+					else:
+						request = client.post("/api/command", json={"text": COMMANDS[n % len(COMMANDS)]})
+					async with request as resp:
+						await resp.read()
+						if resp.status != 200:
+							errors += 1
+							continue
+				except aiohttp.ClientError:
+					errors += 1
+					continue
+				latencies.append(time.perf_counter() - start)
+
+		await asyncio.gather(*(user(i) for i in range(concurrency)))
+	return {
+		"rps": len(latencies) / duration,
+		"p50_ms": statistics.median(latencies) * 1e3 if latencies else float("nan"),
+		"p99_ms": percentile(latencies, 99) * 1e3 if latencies else float("nan"),
+		"errors": errors,
+	}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--servers", default="dev,prefork")
+	parser.add_argument("--workers", type=int, default=0, help="production workers (0 = one per CPU)")
+	parser.add_argument("--threads", type=int, default=16, help="threads per production worker")
+	parser.add_argument("--max-requests", type=int, default=2000)
+	parser.add_argument("--duration", type=float, default=10.0)
+	parser.add_argument("--concurrency", type=int, default=64)
+	parser.add_argument("--latency", type=float, default=0.1, help="stub latency per upstream call (s)")
+	args = parser.parse_args()
+	workers = args.workers or os.cpu_count() or 1
+
+	stub_port = free_port()
+	stub = spawn(["backend.bench.stubs", "--port", str(stub_port), "--latency", str(args.latency)], {}, stub_port)
+	results = {}
+	try:
+		for name in filter(None, (s.strip() for s in args.servers.split(","))):
+			with tempfile.TemporaryDirectory() as tmp:
+				port = free_port()
+				env = dict(
+					os.environ,
+					**stub_env(f"http://127.0.0.1:{stub_port}"),
+					PORT=str(port),
+					FLASK_DEBUG="false",
+					SQLITE_DB_PATH=os.path.join(tmp, "reminders.db"),
+					TTS_CACHE_DIR=os.path.join(tmp, "tts"),
+					WEATHER_GEOCODE_CACHE_PATH=os.path.join(tmp, "geocode.json"),
+				)
+				if name == "dev":
+					cmd = [sys.executable, "-m", "backend.app"]
+				else:
+					cmd = [sys.executable, "-m", "backend.serve", "--workers", str(workers), "--threads", str(args.threads),
+						"--max-requests", str(args.max_requests), "--max-requests-jitter", str(args.max_requests // 10)]
+				launched = time.perf_counter()
+				server = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+				try:
+					wait_for_port(port)
+					base_url = f"http://127.0.0.1:{port}"
+					ready, first = asyncio.run(first_reply(base_url, launched))
+					results[name] = dict(asyncio.run(run_load(base_url, args.duration, args.concurrency)), ready=ready, first=first)
+				finally:
+					server.terminate()
+					server.wait()
+	finally:
+		stub.terminate()
+		stub.wait()
+
+	print(f"{args.concurrency} clients for {args.duration:.0f} s, stub latency {args.latency * 1000:.0f} ms/call, "
+		f"{os.cpu_count()} CPUs; prefork: {workers} workers x {args.threads} threads, recycled every ~{args.max_requests} requests")
+	print(f"{'server':<8} {'ready':>8} {'first hello':>12} {'req/s':>8} {'p50':>9} {'p99':>9} {'errors':>7}")
+	for name, r in results.items():
+		print(f"{name:<8} {r['ready'] * 1e3:6.0f}ms {r['first'] * 1e3:10.1f}ms {r['rps']:8.1f} "
+			f"{r['p50_ms']:7.1f}ms {r['p99_ms']:7.1f}ms {r['errors']:7d}")
+
+
+if __name__ == "__main__":
+	main()
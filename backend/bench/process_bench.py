@@ -0,0 +1,97 @@
+"""
+close_application: full psutil.process_iter scan vs. the background process-name index.
+
+Run: python -m backend.bench.process_bench [--background 2000] [--targets 5] [--repeat 20]
+
+Starts --background idle processes to make the host busy, plus --targets processes named like
+an app from PROCESS_NAMES (a symlinked `sleep`, so their process name matches; POSIX only).
+Reports the time to find the targets with the original linear scan and with the index (lookup,
+full refresh and incremental refresh), then closes them with close_application and checks
+that every target exited.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import List
+
+import psutil
+
+from backend.executor import PROCESS_NAMES, close_application, process_index
+from backend.services.process_index import ProcessIndex
+
+APP = "calculator"
+TARGET_NAME = "gnome-calculator"
+
+
+def scan_linear(app: str) -> List[psutil.Process]:
+	"""Reference: the original per-request walk over every process."""
+	targets = PROCESS_NAMES.get(app, [])
+	found = []
+	for proc in psutil.process_iter(attrs=["name"]):
+		try:
+			pname = proc.info.get("name") or ""
+			if any(t.lower() in pname.lower() for t in targets):
+				found.append(proc)
+		except (psutil.NoSuchProcess, psutil.AccessDenied):
+			continue
+	return found
+
+
+def _avg_ms(fn, repeat: int) -> float:
+	start = time.perf_counter()
+	for _ in range(repeat):
+		fn()
+	return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--background", type=int, default=2000)
+	parser.add_argument("--targets", type=int, default=5)
+	parser.add_argument("--repeat", type=int, default=20)
+	args = parser.parse_args()
+
+	sleep = shutil.which("sleep")
+	if sleep is None:
+		raise SystemExit("needs a POSIX `sleep` binary")
+	procs: List[subprocess.Popen] = []
+	with tempfile.TemporaryDirectory() as tmp:
+		target = os.path.join(tmp, TARGET_NAME)
+		os.symlink(sleep, target)
+		try:
+			for _ in range(args.background):
+				procs.append(subprocess.Popen([sleep, "600"]))
+			targets = [subprocess.Popen([target, "600"]) for _ in range(args.targets)]
+			procs += targets
+			print(f"{len(psutil.pids())} processes on the host, {args.targets} named {TARGET_NAME!r}")
+
+			assert len(scan_linear(APP)) == args.targets
+			linear = _avg_ms(lambda: scan_linear(APP), args.repeat)
+			full = _avg_ms(lambda: ProcessIndex(PROCESS_NAMES).refresh(), max(1, args.repeat // 4))
+			process_index.refresh()
+			incremental = _avg_ms(process_index.refresh, args.repeat)
+			assert len(process_index.processes_for(APP)) == args.targets
+			lookup = _avg_ms(lambda: process_index.processes_for(APP), args.repeat * 50)
+			print(f"{'linear scan per close':<28} {linear:9.3f} ms")
+			print(f"{'index lookup per close':<28} {lookup:9.3f} ms")
+			print(f"{'index full build':<28} {full:9.3f} ms  (once, at start-up)")
+			print(f"{'index refresh (no changes)':<28} {incremental:9.3f} ms  (background, every PROCESS_INDEX_INTERVAL)")
+
+			start = time.perf_counter()
+			reply = close_application(APP)
+			elapsed = (time.perf_counter() - start) * 1e3
+			exited = sum(1 for p in targets if p.poll() is not None)
+			print(f"close_application: {reply!r} in {elapsed:.1f} ms, {exited}/{len(targets)} targets exited")
+		finally:
+			for p in procs:
+				if p.poll() is None:
+					p.kill()
+			for p in procs:
+				p.wait()
+
+
+if __name__ == "__main__":
+	main()
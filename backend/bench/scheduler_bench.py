@@ -0,0 +1,151 @@
+"""
+Benchmark for backend.scheduler.ReminderScheduler against a simulated clock.
+
+Run: python -m backend.bench.scheduler_bench [--count 1000000] [--span 86400] [--step 1] [--seed 7]
+
+Generates --count reminders spread uniformly over --span seconds and drives them through
+the scheduler twice, advancing a fake clock by --step seconds per tick:
+
+  bulk      all reminders are heapified up front (schedule_many)
+  windowed  reminders are read window by window from a sorted in-memory "index", as the
+            scheduler does against SQLite, with a prepare event --lead seconds before each
+
+Both runs check that every reminder fires exactly once, never early, and in when_ts order.
+"""
+import argparse
+import bisect
+import random
+import time
+from typing import Any, Dict, List
+
+from backend.scheduler import ReminderScheduler
+
+
+def build_reminders(count: int, span: int, start: int, seed: int = 7) -> List[Dict[str, Any]]:
+	rng = random.Random(seed)
+	rows = [{"id": i + 1, "what": f"task {i}", "when_ts": start + rng.randrange(span)} for i in range(count)]
+	rows.sort(key=lambda r: (r["when_ts"], r["id"]))
+	return rows
+
+
+class Clock:
+	def __init__(self, now: float):
+		self.now = now
+
+	def __call__(self) -> float:
+		return self.now
+
+
+class Checker:
+	"""on_fire callback recording order violations and late/early deliveries."""
+
+	def __init__(self, clock: Clock):
+		self.clock = clock
+		self.last_ts = float("-inf")
+		self.seen = set()
+		self.out_of_order = 0
+		self.early = 0
+		self.max_lag = 0.0
+
+	def __call__(self, reminder: Dict[str, Any]) -> None:
+		ts = reminder["when_ts"]
+		if ts < self.last_ts:
+			self.out_of_order += 1
+		if ts > self.clock.now:
+			self.early += 1
+		self.max_lag = max(self.max_lag, self.clock.now - ts)
+		self.last_ts = ts
+		self.seen.add(reminder["id"])
+
+
+def _drive(sched: ReminderScheduler, clock: Clock, end: float, step: float) -> float:
+	start = time.perf_counter()
+	while clock.now <= end:
+		sched.run_due(clock.now)
+		clock.now += step
+	return time.perf_counter() - start
+
+
+def _report(name: str, rows: List[Dict[str, Any]], checker: Checker, sched: ReminderScheduler, schedule_s: float, fire_s: float) -> None:
+	n = len(rows)
+	missing = n - len(checker.seen)
+	schedule = f"schedule {n / schedule_s:12,.0f} rem/s" if schedule_s else "load + prepare + fire"
+	print(
+		f"{name:>9}: {schedule} | fire {sched.fired / fire_s:12,.0f} rem/s "
+		f"| {fire_s * 1e6 / max(1, sched.fired):.2f} us/rem | max lag {checker.max_lag:.0f}s"
+	)
+	if missing or checker.out_of_order or checker.early or sched.fired != n:
+		raise SystemExit(
+			f"{name}: fired {sched.fired}/{n}, missing {missing}, "
+			f"out of order {checker.out_of_order}, early {checker.early}"
+		)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--count", type=int, default=1_000_000)
+	parser.add_argument("--span", type=int, default=86_400, help="seconds over which reminders are spread")
+	parser.add_argument("--step", type=float, default=1.0, help="simulated seconds per tick")
+	parser.add_argument("--window", type=int, default=3600)
+	parser.add_argument("--lead", type=float, default=30.0, help="prepare lead time in the windowed run")
+	parser.add_argument("--seed", type=int, default=7)
+	args = parser.parse_args()
+
+	t0 = 1_700_000_000
+	rows = build_reminders(args.count, args.span, t0, args.seed)
+	end = t0 + args.span + args.step
+	print(f"{len(rows):,} reminders over {args.span:,}s, tick {args.step}s")
+
+	# Bulk: everything in one heap.
+	clock = Clock(t0 - 1)
+	checker = Checker(clock)
+	sched = ReminderScheduler(on_fire=checker, clock=clock)
+	shuffled = rows[:]
+	random.Random(args.seed).shuffle(shuffled)
+	start = time.perf_counter()
+	sched.schedule_many(shuffled)
+	schedule_s = time.perf_counter() - start
+	_report("bulk", rows, checker, sched, schedule_s, _drive(sched, clock, end, args.step))
+
+	# Per-reminder schedule() (the add_reminder listener path), one heap push each.
+	sched = ReminderScheduler(on_fire=lambda r: None, clock=clock)
+	start = time.perf_counter()
+	for row in shuffled:
+		sched.schedule(row)
+	print(f"{'push':>9}: schedule {len(rows) / (time.perf_counter() - start):12,.0f} rem/s (one schedule() call each)")
+
+	# Windowed: only the next hour is resident; each window is a range read on the sorted keys.
+	keys = [r["when_ts"] for r in rows]
+	reads = [0]
+
+	def load_window(since: int, until: int):
+		reads[0] += 1
+		return rows[bisect.bisect_right(keys, since):bisect.bisect_right(keys, until)]
+
+	clock = Clock(t0 - 1)
+	checker = Checker(clock)
+	prepared = [0]
+
+	def on_prepare(reminder):
+		prepared[0] += 1
+		return {"audio_id": reminder["id"]}
+
+	sched = ReminderScheduler(
+		on_fire=checker, on_prepare=on_prepare, lead=args.lead,
+		load_window=load_window, window=args.window, clock=clock,
+	)
+	peak = 0
+	start = time.perf_counter()
+	while clock.now <= end:
+		if sched._loaded_until is None or clock.now + args.window / 2 >= sched._loaded_until:
+			sched.load_next_window(clock.now)
+			peak = max(peak, len(sched))
+		sched.run_due(clock.now)
+		clock.now += args.step
+	elapsed = time.perf_counter() - start
+	_report("windowed", rows, checker, sched, 0.0, elapsed)
+	print(f"{'':>9}  {reads[0]} window reads, peak heap {peak:,} events, {prepared[0]:,} prepared")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,124 @@
+"""
+Cold-start cost of a server process: interpreter + import + app init, and where the import time goes.
+
+Run: python -m backend.bench.startup_bench [--modules backend.app,backend.asgi] [--repeat 5] [--top 15]
+
+Each module is started --repeat times in a fresh interpreter (state in a temporary directory).
+Reported per module: wall time until create_app(start_background=False) returns, split into
+import and init, the median per-module import cost from `python -X importtime` (self and
+cumulative, top --top by self time), the same grouped by top-level package, and which of the
+heavy optional dependencies were imported at start-up rather than on first use.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+HEAVY = ("numpy", "speech_recognition", "gtts", "requests", "psutil", "dotenv", "aiohttp", "multiprocessing")
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+import {module} as m
+t1 = time.perf_counter()
+m.create_app(start_background=False)
+t2 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "init": t2 - t1}}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+	"""module -> (self us, cumulative us) from -X importtime output."""
+	modules = {}
+	for line in stderr.splitlines():
+		m = IMPORTTIME_RE.match(line)
+		if m:
+			modules[m.group(4)] = (int(m.group(1)), int(m.group(2)))
+	return modules
+
+
+def run_child(args: List[str], env: Dict[str, str]) -> subprocess.CompletedProcess:
+	out = subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, timeout=120)
+	if out.returncode != 0:
+		raise SystemExit(out.stderr)
+	return out
+
+
+def measure(module: str, repeat: int, env: Dict[str, str]) -> Dict[str, object]:
+	wall, imports, inits = [], [], []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		out = run_child(["-c", CHILD.format(module=module)], env)
+		wall.append(time.perf_counter() - start)
+		phases = json.loads(out.stdout.strip().splitlines()[-1])
+		imports.append(phases["import"])
+		inits.append(phases["init"])
+
+	runs = [parse_importtime(run_child(["-X", "importtime", "-c", f"import {module}"], env).stderr) for _ in range(repeat)]
+	names = set().union(*runs)
+	per_module = {
+		name: (
+			statistics.median(r[name][0] for r in runs if name in r),
+			statistics.median(r[name][1] for r in runs if name in r),
+		)
+		for name in names
+	}
+	return {
+		"wall": statistics.median(wall),
+		"import": statistics.median(imports),
+		"init": statistics.median(inits),
+		"modules": per_module,
+		"own": per_module.get(module, (0, 0))[1],
+	}
+
+
+def by_package(modules: Dict[str, Tuple[float, float]]) -> Dict[str, float]:
+	totals: Dict[str, float] = {}
+	for name, (self_us, _) in modules.items():
+		top = name.split(".")[0]
+		totals[top] = totals.get(top, 0) + self_us
+	return totals
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--modules", default="backend.app,backend.asgi")
+	parser.add_argument("--repeat", type=int, default=5)
+	parser.add_argument("--top", type=int, default=15)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as tmp:
+		env = dict(
+			os.environ,
+			SQLITE_DB_PATH=os.path.join(tmp, "reminders.db"),
+			TTS_CACHE_DIR=os.path.join(tmp, "tts"),
+			WEATHER_GEOCODE_CACHE_PATH=os.path.join(tmp, "geocode.json"),
+		)
+		for module in filter(None, (m.strip() for m in args.modules.split(","))):
+			r = measure(module, args.repeat, env)
+			print(f"\n{module}: {r['wall'] * 1e3:.0f} ms to a ready app "
+				f"(import {r['import'] * 1e3:.0f} ms, init {r['init'] * 1e3:.1f} ms, rest is interpreter start-up)")
+			print(f"  -X importtime total for {module}: {r['own'] / 1e3:.1f} ms")
+			print(f"  {'module':<48} {'self ms':>8} {'cumul ms':>9}")
+			ranked = sorted(r["modules"].items(), key=lambda kv: kv[1][0], reverse=True)
+			for name, (self_us, cum_us) in ranked[:args.top]:
+				print(f"  {name:<48} {self_us / 1e3:8.1f} {cum_us / 1e3:9.1f}")
+			print(f"  {'package':<48} {'self ms':>8}")
+			for name, total in sorted(by_package(r["modules"]).items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+				print(f"  {name:<48} {total / 1e3:8.1f}")
+			loaded = [name for name in HEAVY if name in r["modules"]]
+			deferred = [name for name in HEAVY if name not in r["modules"]]
+			print(f"  heavy dependencies imported at start-up: {', '.join(loaded) or 'none'}")
+			print(f"  deferred to first use: {', '.join(deferred) or 'none'}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,122 @@
+"""
+Frontend asset serving: send_from_directory per request vs. the in-memory manifest (backend.static).
+
+Run: python -m backend.bench.static_bench [--requests 2000] [--downlink-kbps 2000]
+
+A page load fetches index.html, styles.css, app.js, capture-worklet.js and flac-worker.js. Three
+visits are timed through the Flask test client (in process, so the numbers are server cost only):
+"first" with an empty browser cache, "revalidate" where the browser holds every asset and
+asks again, and "repeat" where it also honours the cache headers it was sent. Reported per
+visit: server time per page load, bytes on the wire, and the time those bytes take over an
+--downlink-kbps link.
+"""
+import argparse
+import os
+import re
+import time
+from typing import Dict, List, Tuple
+
+from flask import Flask, request, send_from_directory
+
+from backend import config, static
+
+ASSETS = ["index.html", "styles.css", "app.js", "capture-worklet.js", "flac-worker.js"]
+ACCEPT = {"Accept-Encoding": "gzip, deflate, br"}
+
+
+def baseline_app() -> Flask:
+	"""The routes as they were: a filesystem check and send_from_directory on every request."""
+	app = Flask(__name__)
+
+	@app.route('/')
+	def index():
+		return send_from_directory(config.FRONTEND_DIR, 'index.html')
+
+	@app.route('/<path:path>')
+	def send_frontend(path):
+		if os.path.exists(os.path.join(config.FRONTEND_DIR, path)):
+			return send_from_directory(config.FRONTEND_DIR, path)
+		return send_from_directory(config.FRONTEND_DIR, 'index.html')
+	return app
+
+
+def manifest_app() -> Flask:
+	app = Flask(__name__)
+
+	@app.route('/')
+	@app.route('/<path:path>')
+	def send_frontend(path='index.html'):
+		status, body, headers = static.respond(path, request.args.get('v'), request.accept_encodings, request.if_none_match)
+		return app.response_class(body, status=status, headers=headers)
+	return app
+
+
+def page_urls(client) -> List[str]:
+	"""Asset URLs as the page references them (versioned when index.html says so)."""
+	html = client.get("/").get_data(as_text=True)
+	urls = ["/"]
+	for name in ASSETS[1:]:
+		m = re.search(re.escape(name) + r"\?v=\w+", html)
+		urls.append("/" + (m.group(0) if m else name))
+	return urls
+
+
+def is_fresh(headers) -> bool:
+	"""Whether a browser may reuse the response without asking (Cache-Control max-age, not no-cache)."""
+	cc = headers.get("Cache-Control", "")
+	return "max-age=" in cc and "no-cache" not in cc and not cc.startswith("max-age=0")
+
+
+def visit(client, urls: List[str], cache: Dict[str, Tuple[dict, int]], mode: str) -> Tuple[int, int]:
+	"""One page load; returns (requests sent, bytes received). Fills cache on "first"."""
+	sent = received = 0
+	for url in urls:
+		headers = dict(ACCEPT)
+		if mode != "first":
+			cached, _ = cache[url]
+			if mode == "repeat" and is_fresh(cached):
+				continue
+			if "ETag" in cached:
+				headers["If-None-Match"] = cached["ETag"]
+			if "Last-Modified" in cached:
+				headers["If-Modified-Since"] = cached["Last-Modified"]
+		resp = client.get(url, headers=headers)
+		body = resp.get_data()
+		sent += 1
+		received += len(body) + sum(len(k) + len(v) + 4 for k, v in resp.headers.items())
+		if mode == "first":
+			cache[url] = (dict(resp.headers), resp.status_code)
+		resp.close()
+	return sent, received
+
+
+def run(app: Flask, repeat: int) -> Dict[str, Tuple[float, int, int]]:
+	client = app.test_client()
+	urls = page_urls(client)
+	cache: Dict[str, Tuple[dict, int]] = {}
+	visit(client, urls, cache, "first")
+	results = {}
+	for mode in ("first", "revalidate", "repeat"):
+		start = time.perf_counter()
+		for _ in range(repeat):
+			sent, received = visit(client, urls, cache, mode)
+		results[mode] = ((time.perf_counter() - start) / repeat, sent, received)
+	return results
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--requests", type=int, default=2000, help="page loads timed per visit kind")
+	parser.add_argument("--downlink-kbps", type=float, default=2000)
+	args = parser.parse_args()
+
+	static.manifest()
+	bytes_per_s = args.downlink_kbps * 1000 / 8
+	print(f"{'server':<9} {'visit':<11} {'per page':>9} {'requests':>9} {'bytes':>8} {'transfer':>9}")
+	for name, app in (("baseline", baseline_app()), ("manifest", manifest_app())):
+		for mode, (seconds, sent, received) in run(app, args.requests).items():
+			print(f"{name:<9} {mode:<11} {seconds * 1e6:7.0f}us {sent:>9} {received:>8,} {received / bytes_per_s * 1e3:7.1f}ms")
+
+
+if __name__ == "__main__":
+	main()
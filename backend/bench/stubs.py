@@ -0,0 +1,119 @@
+"""
+Local stand-ins for the external services, with injected latency.
+
+Serves on one port:
+  GET  /v1/search                              Open-Meteo geocoding
+  GET  /v1/forecast                            Open-Meteo forecast
+  POST /_/TranslateWebserverUi/data/batchexecute  gTTS
+  POST /speech-api/v2/recognize                Google STT (SpeechRecognition "v2" API)
+
+Run: python -m backend.bench.stubs --port 8765 --latency 0.2
+Point the app at it with stub_env(base_url).
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from quart import Quart, request
+
+# A valid silent MPEG-1 Layer III frame header padded to one frame; enough for clients to treat as MP3.
+STUB_MP3 = b"\xff\xfb\x90\x64" + b"\x00" * 413
+STUB_TRANSCRIPT = "weather in London"
+
+
+def make_stub_app(latency: float, transcript: str = STUB_TRANSCRIPT) -> Quart:
+	stub = Quart(__name__)
+
+	@stub.get('/v1/search')
+	async def geocode():
+		await asyncio.sleep(latency)
+		name = request.args.get('name', 'Nowhere')
+		return {"results": [{"latitude": 51.5085, "longitude": -0.1257, "name": name.title()}]}
+
+	@stub.get('/v1/forecast')
+	async def forecast():
+		await asyncio.sleep(latency)
+		return {"current": {"temperature_2m": 14.2, "relative_humidity_2m": 71, "apparent_temperature": 13.1}}
+
+	@stub.post('/_/TranslateWebserverUi/data/batchexecute')
+	async def tts():
+		await asyncio.sleep(latency)
+		b64 = base64.b64encode(STUB_MP3).decode('ascii')
+		line = '[["wrb.fr","jQ1olc","[\\"' + b64 + '\\"]",null,null,null,"generic"]]'
+		return ")]}'\n\n" + line + "\n", 200, {"Content-Type": "application/json; charset=utf-8"}
+
+	@stub.post('/speech-api/v2/recognize')
+	async def stt():
+		await request.get_data()
+		await asyncio.sleep(latency)
+		result = {"result": [{"alternative": [{"transcript": transcript, "confidence": 0.95}], "final": True}], "result_index": 0}
+		return '{"result":[]}\n' + json.dumps(result) + "\n", 200, {"Content-Type": "application/json"}
+
+	return stub
+
+
+def stub_env(base_url: str) -> Dict[str, str]:
+	"""Environment overrides that point every external call of the app at the stub server."""
+	return {
+		"WEATHER_GEOCODE_URL": f"{base_url}/v1/search",
+		"WEATHER_FORECAST_URL": f"{base_url}/v1/forecast",
+		"TTS_ENDPOINT": base_url,
+		"STT_ENDPOINT": f"{base_url}/speech-api/v2/recognize",
+	}
+
+
+def free_port() -> int:
+	with socket.socket() as s:
+		s.bind(("127.0.0.1", 0))
+		return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 20.0) -> None:
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		try:
+			with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+				return
+		except OSError:
+			time.sleep(0.1)
+	raise RuntimeError(f"server on port {port} did not come up")
+
+
+def spawn(module_args, env_overrides: Dict[str, str], port: int) -> subprocess.Popen:
+	"""Start `python -m <module_args>` with extra environment and wait until it listens on port."""
+	env = dict(os.environ, **env_overrides)
+	proc = subprocess.Popen([sys.executable, "-m", *module_args], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+	try:
+		wait_for_port(port)
+	except Exception:
+		proc.kill()
+		raise
+	return proc
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--latency", type=float, default=0.1, help="seconds added to every stub response")
+	parser.add_argument("--transcript", default=STUB_TRANSCRIPT)
+	args = parser.parse_args()
+
+	from hypercorn.asyncio import serve
+	from hypercorn.config import Config
+
+	hc = Config()
+	hc.bind = [f"{args.host}:{args.port}"]
+	hc.backlog = 2048
+	asyncio.run(serve(make_stub_app(args.latency, args.transcript), hc))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,255 @@
+"""
+End-to-end benchmark suite: in-process pipeline pieces plus full HTTP requests, with every
+external service replaced by the local stub (backend.bench.stubs) at --latency seconds.
+
+Run: python -m backend.bench.suite [--output results.json] [--compare baseline.json]
+     [--servers wsgi,asgi] [--requests 400] [--concurrency 16] [--latency 0.05] [--scale 1.0]
+
+In-process cases:
+  nlu.interpret            rule-based interpreter over the nlu_bench corpus
+  executor.local           execute_intent for time/date/greet/bye/none
+  executor.reminder        execute_intent("reminder_create") incl. the SQLite insert
+  executor.weather         execute_intent("weather_query") (geocode + forecast caches warm)
+  storage.add_reminder     reminder insert
+  storage.query_page       one /api/reminders page (100 rows) out of the inserted set
+  tts.to_base64            to_base64_audio_mp3 of a 24 KB MP3
+HTTP cases, per server in --servers (threaded WSGI with --threads workers, and ASGI):
+  <server>.command         POST /api/command, mixing local, reminder and weather commands
+  <server>.upload          POST /api/upload-audio with a 1.5 s 16 kHz WAV
+  <server>.batch           POST /api/commands with BATCH_SIZE of the same commands (ops are
+                           batches; --requests / 10 of them)
+
+Caches that would hide upstream latency (TTS memory/disk) are off, and all state lives in a
+temporary directory. Every case reports ops/s and p50/p95/p99 latency. --output writes the
+results with the commit and machine they came from; --compare prints the change against an
+earlier file and exits with status 1 if any case regressed by more than --threshold percent
+(lower throughput or higher p95).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from backend.bench.asgi_load import percentile
+from backend.bench.stubs import free_port, spawn, stub_env
+
+COMMANDS = [
+	"what time is it", "what's the date", "hello", "remind me to stretch in {n} minutes",
+	"weather in London", "weather in Paris", "tell me a joke",
+]
+BATCH_SIZE = 25
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+	return {
+		"name": name,
+		"ops": len(latencies),
+		"errors": errors,
+		"ops_per_s": len(latencies) / elapsed if elapsed else 0.0,
+		"p50_ms": percentile(latencies, 50) * 1e3,
+		"p95_ms": percentile(latencies, 95) * 1e3,
+		"p99_ms": percentile(latencies, 99) * 1e3,
+	}
+
+
+def time_calls(name: str, fn: Callable[[int], Any], count: int) -> Dict[str, Any]:
+	latencies = []
+	start = time.perf_counter()
+	for i in range(count):
+		t0 = time.perf_counter()
+		fn(i)
+		latencies.append(time.perf_counter() - t0)
+	return summarize(name, latencies, time.perf_counter() - start)
+
+
+def run_in_process(scale: float) -> List[Dict[str, Any]]:
+	# Imported late: config is read from the environment main() prepared.
+	from backend import storage
+	from backend.bench.nlu_bench import build_corpus
+	from backend.executor import execute_intent
+	from backend.nlu.rule_based import interpret
+	from backend.services.tts import to_base64_audio_mp3
+
+	n = lambda count: max(1, int(count * scale))
+	corpus = build_corpus(n(50_000))
+	local = [("time", {}), ("date", {}), ("greet", {}), ("bye", {}), ("none", {})]
+	cities = ["London", "Paris", "Berlin", "Madrid"]
+	for city in cities:
+		execute_intent("weather_query", {"city": city})
+	now = int(time.time())
+	mp3 = bytes(random.Random(7).getrandbits(8) for _ in range(24 * 1024))
+
+	return [
+		time_calls("nlu.interpret", lambda i: interpret(corpus[i]), len(corpus)),
+		time_calls("executor.local", lambda i: execute_intent(*local[i % len(local)]), n(20_000)),
+		time_calls("executor.reminder", lambda i: execute_intent("reminder_create", {"what": f"task {i}", "in_minutes": "5"}), n(2_000)),
+		time_calls("executor.weather", lambda i: execute_intent("weather_query", {"city": cities[i % len(cities)]}), n(5_000)),
+		time_calls("storage.add_reminder", lambda i: storage.add_reminder(f"bench {i}", now + 60 + i), n(5_000)),
+		time_calls("storage.query_page", lambda i: storage.query_reminders(since=now, limit=100), n(2_000)),
+		time_calls("tts.to_base64", lambda i: to_base64_audio_mp3(mp3), n(5_000)),
+	]
+
+
+async def http_load(name: str, base_url: str, total: int, concurrency: int, send) -> Dict[str, Any]:
+	"""send(client, i) returns the request context manager for the i-th request."""
+	sem = asyncio.Semaphore(concurrency)
+	latencies: List[float] = []
+	errors = 0
+	connector = aiohttp.TCPConnector(limit=concurrency)
+	async with aiohttp.ClientSession(base_url, connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as client:
+		async def one(i: int) -> None:
+			nonlocal errors
+			async with sem:
+				t0 = time.perf_counter()
+				try:
+					async with send(client, i) as resp:
+						await resp.read()
+						if resp.status != 200:
+							errors += 1
+				except aiohttp.ClientError:
+					errors += 1
+				latencies.append(time.perf_counter() - t0)
+
+		start = time.perf_counter()
+		await asyncio.gather(*(one(i) for i in range(total)))
+		return summarize(name, latencies, time.perf_counter() - start, errors)
+
+
+def run_http(server: str, base_url: str, total: int, concurrency: int) -> List[Dict[str, Any]]:
+	from backend.bench.audio_prep_bench import build_wav
+
+	wav = build_wav(16000, 1, 2, 1.0, 0.25)
+
+	def command(client, i):
+		return client.post("/api/command", json={"text": COMMANDS[i % len(COMMANDS)].format(n=i % 50 + 1)})
+
+	def upload(client, i):
+		form = aiohttp.FormData()
+		form.add_field("file", wav, filename="a.wav", content_type="audio/wav")
+		return client.post("/api/upload-audio", data=form)
+
+	def commands(client, i):
+		batch = [COMMANDS[(i + k) % len(COMMANDS)].format(n=k % 50 + 1) for k in range(BATCH_SIZE)]
+		return client.post("/api/commands", json={"commands": batch})
+
+	return [
+		asyncio.run(http_load(f"{server}.command", base_url, total, concurrency, command)),
+		asyncio.run(http_load(f"{server}.upload", base_url, total, concurrency, upload)),
+		asyncio.run(http_load(f"{server}.batch", base_url, max(1, total // 10), concurrency, commands)),
+	]
+
+
+def start_server(server: str, env: Dict[str, str], threads: int):
+	port = free_port()
+	if server == "wsgi":
+		module = ["backend.bench.asgi_load", "--serve-wsgi", str(port), "--threads", str(threads)]
+		return spawn(module, env, port), port
+	if server == "asgi":
+		return spawn(["backend.asgi"], dict(env, ASGI_PORT=str(port)), port), port
+	raise SystemExit(f"unknown server {server!r}; choose wsgi or asgi")
+
+
+def git_commit() -> Optional[str]:
+	try:
+		out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+	except OSError:
+		return None
+	return out.stdout.strip() or None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+	"""Print the change against a previous run; True if any case regressed beyond threshold percent."""
+	with open(baseline_path) as f:
+		baseline = {r["name"]: r for r in json.load(f)["results"]}
+	regressed = False
+	print(f"\nvs {baseline_path}:")
+	print(f"{'case':<22} {'ops/s':>9} {'p95':>9}")
+	for r in results:
+		old = baseline.get(r["name"])
+		if old is None:
+			print(f"{r['name']:<22} {'new':>9}")
+			continue
+		ops = (r["ops_per_s"] / old["ops_per_s"] - 1) * 100 if old["ops_per_s"] else 0.0
+		p95 = (r["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+		bad = ops < -threshold or p95 > threshold
+		regressed |= bad
+		print(f"{r['name']:<22} {ops:+8.1f}% {p95:+8.1f}%{'  REGRESSION' if bad else ''}")
+	return regressed
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--servers", default="wsgi,asgi", help="comma-separated; empty for in-process cases only")
+	parser.add_argument("--requests", type=int, default=400, help="per HTTP case")
+	parser.add_argument("--concurrency", type=int, default=16)
+	parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads")
+	parser.add_argument("--latency", type=float, default=0.05, help="stub latency per upstream call (s)")
+	parser.add_argument("--scale", type=float, default=1.0, help="multiplier for in-process iteration counts")
+	parser.add_argument("--output", help="write results as JSON")
+	parser.add_argument("--compare", metavar="BASELINE", help="JSON from an earlier --output")
+	parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold (%%)")
+	args = parser.parse_args()
+
+	stub_port = free_port()
+	stub = spawn(["backend.bench.stubs", "--port", str(stub_port), "--latency", str(args.latency)], {}, stub_port)
+	try:
+		with tempfile.TemporaryDirectory() as tmp:
+			env = dict(
+				stub_env(f"http://127.0.0.1:{stub_port}"),
+				SQLITE_DB_PATH=os.path.join(tmp, "reminders.db"),
+				WEATHER_GEOCODE_CACHE_PATH=os.path.join(tmp, "geocode.json"),
+				TTS_CACHE_MEMORY_BYTES="0",
+				TTS_CACHE_DISK_BYTES="0",
+				TTS_CACHE_DIR=os.path.join(tmp, "tts"),
+				TTS_WARMUP="false",
+				REMINDER_SCHEDULER="false",
+			)
+			os.environ.update(env)
+			results = run_in_process(args.scale)
+			for server in filter(None, (s.strip() for s in args.servers.split(","))):
+				proc, port = start_server(server, env, args.threads)
+				try:
+					results += run_http(server, f"http://127.0.0.1:{port}", args.requests, args.concurrency)
+				finally:
+					proc.terminate()
+					proc.wait()
+	finally:
+		stub.terminate()
+		stub.wait()
+
+	print(f"stub latency {args.latency * 1e3:.0f} ms/call, HTTP: {args.requests} requests at concurrency {args.concurrency}")
+	print(f"{'case':<22} {'ops':>7} {'ops/s':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+	for r in results:
+		print(
+			f"{r['name']:<22} {r['ops']:7d} {r['ops_per_s']:11.1f} {r['p50_ms']:9.3f} "
+			f"{r['p95_ms']:9.3f} {r['p99_ms']:9.3f} {r['errors']:6d}"
+		)
+
+	if args.output:
+		report = {
+			"commit": git_commit(),
+			"timestamp": int(time.time()),
+			"python": sys.version.split()[0],
+			"platform": platform.platform(),
+			"cpus": os.cpu_count(),
+			"args": vars(args),
+			"results": results,
+		}
+		with open(args.output, "w") as f:
+			json.dump(report, f, indent=2)
+		print(f"wrote {args.output}")
+	if args.compare and compare(results, args.compare, args.threshold):
+		raise SystemExit(1)
+
+
+if __name__ == "__main__":
+	main()
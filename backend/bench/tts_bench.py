@@ -0,0 +1,91 @@
+"""
+Latency and throughput of the TTS engines, bypassing the audio cache.
+
+Run: python -m backend.bench.tts_bench [--engines gtts,piper] [--requests 40] [--concurrency 4] [--latency 0.15]
+
+gtts is measured against the local stub (backend.bench.stubs) with --latency seconds of
+injected round-trip time, or against Google with --live. piper needs PIPER_VOICES (and the
+piper-tts/lameenc packages); its start-up (process spawn + model load + warm-up) is
+reported separately, since requests never pay for it.
+
+For each engine: sequential latency p50/p95 over --requests distinct sentences, then
+throughput with --concurrency requests in flight.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from backend.bench.asgi_load import percentile
+from backend.bench.stubs import free_port, spawn, stub_env
+
+SENTENCES = [
+	"It's {n} degrees in London with light rain.",
+	"Reminder number {n}: call the dentist before noon.",
+	"Opening notepad for you, request {n}.",
+	"Your meeting starts in {n} minutes, don't forget the slides.",
+]
+
+
+def sentences(count: int, offset: int = 0) -> List[str]:
+	return [SENTENCES[i % len(SENTENCES)].format(n=offset + i) for i in range(count)]
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--engines", default="gtts,piper")
+	parser.add_argument("--requests", type=int, default=40)
+	parser.add_argument("--concurrency", type=int, default=4)
+	parser.add_argument("--latency", type=float, default=0.15, help="stub round-trip for gtts (s)")
+	parser.add_argument("--live", action="store_true", help="call Google instead of the stub")
+	parser.add_argument("--lang", default="en")
+	args = parser.parse_args()
+
+	stub = None
+	if not args.live:
+		port = free_port()
+		stub = spawn(["backend.bench.stubs", "--port", str(port), "--latency", str(args.latency)], {}, port)
+		os.environ.update(stub_env(f"http://127.0.0.1:{port}"))
+	# Engines read config at import time.
+	from backend.services import tts_engines
+
+	try:
+		print(f"{'engine':<7} {'startup s':>9} {'p50 ms':>8} {'p95 ms':>8} {'seq req/s':>10} {f'req/s @{args.concurrency}':>11} {'avg KB':>7}")
+		for name in filter(None, (e.strip() for e in args.engines.split(","))):
+			start = time.perf_counter()
+			try:
+				engine = tts_engines.ENGINES[name]()
+			except (KeyError, RuntimeError) as exc:
+				print(f"{name:<7} skipped: {exc}")
+				continue
+			startup = time.perf_counter() - start
+			if not engine.supports(args.lang):
+				print(f"{name:<7} skipped: no voice for {args.lang!r}")
+				continue
+
+			latencies, sizes = [], []
+			seq_start = time.perf_counter()
+			for text in sentences(args.requests):
+				t0 = time.perf_counter()
+				sizes.append(len(engine.submit(text, args.lang).result()))
+				latencies.append(time.perf_counter() - t0)
+			seq_elapsed = time.perf_counter() - seq_start
+
+			batch = sentences(args.requests, offset=args.requests)
+			par_start = time.perf_counter()
+			with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+				list(pool.map(lambda text: engine.submit(text, args.lang).result(), batch))
+			par_elapsed = time.perf_counter() - par_start
+
+			print(
+				f"{name:<7} {startup:9.2f} {percentile(latencies, 50) * 1e3:8.1f} {percentile(latencies, 95) * 1e3:8.1f} "
+				f"{args.requests / seq_elapsed:10.1f} {args.requests / par_elapsed:11.1f} {sum(sizes) / len(sizes) / 1024:7.1f}"
+			)
+	finally:
+		if stub is not None:
+			stub.terminate()
+
+
+if __name__ == "__main__":
+	main()
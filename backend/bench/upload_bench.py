@@ -0,0 +1,68 @@
+"""
+Voice upload size and server decode cost: 16 kHz 16-bit WAV vs. FLAC.
+
+Run: python -m backend.bench.upload_bench [--speech 1.5,3,6] [--silence 0.5] [--uplink-kbps 384] [--repeat 20]
+
+The web client used to upload 16 kHz mono WAV and now FLAC-encodes in a Worker
+(frontend/flac-worker.js: fixed predictors with partitioned Rice coding). Here the same
+speech-like clips as audio_prep_bench are FLAC-encoded by the flac converter at -5, which
+compresses about as well. Reported per clip: upload bytes for each format, the time to send
+them over an --uplink-kbps link, and the median time for speech.read_audio to validate and
+decode each upload on the server.
+"""
+import argparse
+import io
+import statistics
+import subprocess
+import time
+from typing import Callable
+
+import speech_recognition as sr
+
+from backend import config
+from backend.bench.audio_prep_bench import build_wav
+from backend.services.speech import read_audio
+
+RATE = 16000
+
+
+def encode_flac(wav: bytes) -> bytes:
+	cmd = [sr.audio.get_flac_converter(), "-5", "--stdout", "--totally-silent", "-"]
+	return subprocess.run(cmd, input=wav, capture_output=True, check=True).stdout
+
+
+def median_ms(fn: Callable[[], object], repeat: int) -> float:
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		times.append(time.perf_counter() - start)
+	return statistics.median(times) * 1e3
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--speech", default="1.5,3,6", help="seconds of speech per clip, comma-separated")
+	parser.add_argument("--silence", type=float, default=0.5, help="seconds of near-silence before and after")
+	parser.add_argument("--uplink-kbps", type=float, default=384)
+	parser.add_argument("--repeat", type=int, default=20)
+	args = parser.parse_args()
+
+	# Decode only: conditioning costs the same for both formats and is measured by audio_prep_bench.
+	config.PREPROCESS_AUDIO = False
+	bytes_per_s = args.uplink_kbps * 1000 / 8
+	print(f"{'clip':>6} {'WAV bytes':>10} {'FLAC bytes':>11} {'ratio':>6} {'WAV send':>9} {'FLAC send':>10} {'WAV decode':>11} {'FLAC decode':>12}")
+	for speech in (float(s) for s in args.speech.split(",") if s.strip()):
+		wav = build_wav(RATE, 1, 2, speech, args.silence)
+		flac = encode_flac(wav)
+		assert read_audio(io.BytesIO(flac)).frame_data == read_audio(io.BytesIO(wav)).frame_data
+		wav_ms = median_ms(lambda: read_audio(io.BytesIO(wav)), args.repeat)
+		flac_ms = median_ms(lambda: read_audio(io.BytesIO(flac)), args.repeat)
+		print(
+			f"{speech + 2 * args.silence:5.1f}s {len(wav):>10,} {len(flac):>11,} {len(wav) / len(flac):5.1f}x "
+			f"{len(wav) / bytes_per_s * 1e3:7.0f}ms {len(flac) / bytes_per_s * 1e3:8.0f}ms {wav_ms:9.2f}ms {flac_ms:10.2f}ms"
+		)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,8 +1,24 @@
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env if present
-load_dotenv()
+
+def _find_dotenv() -> str:
+	"""The .env that load_dotenv() would find (searching up from this directory), or ''."""
+	path = os.path.dirname(os.path.abspath(__file__))
+	while True:
+		candidate = os.path.join(path, ".env")
+		if os.path.isfile(candidate):
+			return candidate
+		parent = os.path.dirname(path)
+		if parent == path:
+			return ""
+		path = parent
+
+
+# Load environment variables from .env if present (python-dotenv is only imported when there is one)
+_DOTENV_PATH = _find_dotenv()
+if _DOTENV_PATH:
+	from dotenv import load_dotenv
+	load_dotenv(_DOTENV_PATH)
 
 # Flask settings
 FLASK_DEBUG = os.getenv("FLASK_DEBUG", "true").lower() == "true"
@@ -12,22 +28,189 @@ PORT = int(os.getenv("PORT", "5000"))
 # STT/TTS settings
 STT_LANGUAGE = os.getenv("STT_LANGUAGE", "en-US")
 TTS_LANGUAGE = os.getenv("TTS_LANGUAGE", "en")
+# Upstream endpoints; override to point at local stubs (see backend/bench/stubs.py)
+STT_ENDPOINT = os.getenv("STT_ENDPOINT", "http://www.google.com/speech-api/v2/recognize")
+TTS_ENDPOINT = os.getenv("TTS_ENDPOINT", "")  # empty = gTTS default (translate.google.com)
 
 # Reminders storage
 USE_SQLITE = os.getenv("USE_SQLITE", "true").lower() == "true"
 SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", os.path.join(os.path.dirname(__file__), "data", "reminders.db"))
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+# Seconds a query waits for a pooled connection before failing
+SQLITE_POOL_TIMEOUT = float(os.getenv("SQLITE_POOL_TIMEOUT", "10"))
+# Max inserts the group-commit writer folds into one transaction
+SQLITE_WRITE_BATCH = int(os.getenv("SQLITE_WRITE_BATCH", "256"))
+# Seconds a write waits for its commit before failing the request
+SQLITE_WRITE_TIMEOUT = float(os.getenv("SQLITE_WRITE_TIMEOUT", "30"))
+# Several server processes share issued audio ids, job results and newly added reminders through
+# the SQLite database; others pick them up every POLL s. backend.serve turns it on for more than one
+# worker (unless set); set it for other multi-process servers (gunicorn -w N)
+SHARED_STATE = os.getenv("SHARED_STATE", "false").lower() == "true"
+SHARED_POLL_SECONDS = float(os.getenv("SHARED_POLL_SECONDS", "1"))
+# Reminder delivery: pre-synthesize PRESYNTH s before due; keep WINDOW s of reminders in memory;
+# on startup, still deliver reminders that fell due up to CATCHUP s ago
+REMINDER_SCHEDULER = os.getenv("REMINDER_SCHEDULER", "true").lower() == "true"
+REMINDER_PRESYNTH_SECONDS = float(os.getenv("REMINDER_PRESYNTH_SECONDS", "30"))
+REMINDER_WINDOW_SECONDS = float(os.getenv("REMINDER_WINDOW_SECONDS", "3600"))
+REMINDER_CATCHUP_SECONDS = float(os.getenv("REMINDER_CATCHUP_SECONDS", "60"))
+# GET /api/reminders page size (default and cap)
+REMINDERS_PAGE_SIZE = int(os.getenv("REMINDERS_PAGE_SIZE", "100"))
+REMINDERS_MAX_PAGE_SIZE = int(os.getenv("REMINDERS_MAX_PAGE_SIZE", "1000"))
 
 # Paths
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "data")
 TMP_DIR = os.path.join(BASE_DIR, "tmp")
+FRONTEND_DIR = os.path.join(os.path.dirname(BASE_DIR), "frontend")
+
+# The frontend is read into memory (with gzip/brotli variants) at start-up; STATIC_RELOAD re-reads
+# it when a file changes, for editing the UI without restarting
+STATIC_RELOAD = os.getenv("STATIC_RELOAD", "false").lower() == "true"
+
+# Uploads are held in memory up to this many bytes, then spooled to an anonymous file in TMP_DIR
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(8 * 1024 * 1024)))
+# Longest FLAC upload accepted; its decoded size is checked against this before decoding
+MAX_AUDIO_SECONDS = float(os.getenv("MAX_AUDIO_SECONDS", "300"))
+
+# Text-to-speech engine: gtts (network) or piper (local; pip install piper-tts lameenc).
+# PIPER_VOICES maps languages to voice models ("en=/voices/en_US-lessac-medium.onnx,es=...");
+# other languages use gtts. Piper runs in TTS_PROCESSES pre-warmed worker processes
+TTS_ENGINE = os.getenv("TTS_ENGINE", "gtts")
+PIPER_VOICES = os.getenv("PIPER_VOICES", "")
+TTS_PROCESSES = int(os.getenv("TTS_PROCESSES", "2"))
+TTS_MP3_BITRATE = int(os.getenv("TTS_MP3_BITRATE", "64"))
+
+# Speech-to-text engine: google (network) or whisper (local, pip install openai-whisper).
+# Local engines micro-batch up to STT_BATCH_SIZE clips arriving within STT_BATCH_WAIT_MS
+STT_ENGINE = os.getenv("STT_ENGINE", "google")
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))
+STT_BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "8"))
+STT_BATCH_WAIT_MS = float(os.getenv("STT_BATCH_WAIT_MS", "20"))
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "")
+
+# Streaming voice input (/api/stream-audio): 16-bit mono PCM at STREAM_SAMPLE_RATE, cut into
+# utterances by an energy VAD (threshold is RMS as a fraction of full scale). A request is given
+# up (408, or 413 past that much audio) if no utterance closes within STREAM_LISTEN_SECONDS
+STREAM_SAMPLE_RATE = int(os.getenv("STREAM_SAMPLE_RATE", "16000"))
+STREAM_LISTEN_SECONDS = float(os.getenv("STREAM_LISTEN_SECONDS", "30"))
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_ENERGY_THRESHOLD = float(os.getenv("VAD_ENERGY_THRESHOLD", "0.02"))
+VAD_SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "500"))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "150"))
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "200"))
+VAD_MAX_SEGMENT_SECONDS = float(os.getenv("VAD_MAX_SEGMENT_SECONDS", "15"))
+
+# Audio conditioning before STT: mono, at most PREP_SAMPLE_RATE, silence trimmed (keeping PAD ms
+# around speech, VAD threshold), peak normalized to PREP_PEAK with at most PREP_MAX_GAIN boost
+PREPROCESS_AUDIO = os.getenv("PREPROCESS_AUDIO", "true").lower() == "true"
+PREP_SAMPLE_RATE = int(os.getenv("PREP_SAMPLE_RATE", "16000"))
+PREP_TRIM_PAD_MS = int(os.getenv("PREP_TRIM_PAD_MS", "150"))
+PREP_PEAK = float(os.getenv("PREP_PEAK", "0.9"))
+PREP_MAX_GAIN = float(os.getenv("PREP_MAX_GAIN", "10"))
+
+
+# TTS audio cache (in-memory LRU + on-disk store, sizes in bytes)
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(DATA_DIR, "tts_cache"))
+TTS_WARMUP = os.getenv("TTS_WARMUP", "true").lower() == "true"
+
+# How replies carry audio: "data_url" (inline base64) or "url" (audio id + /api/audio/<id> stream)
+AUDIO_RESPONSE_MODE = os.getenv("AUDIO_RESPONSE_MODE", "data_url")
+TTS_STREAM_WORKERS = int(os.getenv("TTS_STREAM_WORKERS", "4"))
+# Concurrent gTTS part requests per process (1 = fetch parts sequentially)
+TTS_PARALLEL_WORKERS = int(os.getenv("TTS_PARALLEL_WORKERS", "4"))
+# Start synthesizing a predictable response while the intent is still executing
+TTS_SPECULATIVE = os.getenv("TTS_SPECULATIVE", "true").lower() == "true"
 
-# Create needed directories if not exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(TMP_DIR, exist_ok=True)
+# Slow intents run as background jobs on EXECUTOR_WORKERS threads; a request waits JOB_ACK_WAIT_MS for
+# the result, then answers with an acknowledgement and delivers the result via /api/jobs/<id> or push.
+# Limits and timeouts are "intent=value" lists; JOB_TIMEOUT applies to intents not listed.
+EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", "4"))
+JOB_INTENTS = os.getenv("JOB_INTENTS", "open_app,open_path,close_app,type_text,save_as")
+JOB_INTENT_LIMITS = os.getenv("JOB_INTENT_LIMITS", "type_text=1,save_as=1")
+JOB_TIMEOUTS = os.getenv("JOB_TIMEOUTS", "close_app=10")
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "30"))
+JOB_ACK_WAIT_MS = float(os.getenv("JOB_ACK_WAIT_MS", "200"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "300"))
+
+# App names in open/close commands that match no alias are fuzzy-matched; a match needs at least
+# APP_MATCH_MIN_SCORE similarity (0-1) and must beat the next app by APP_MATCH_MARGIN
+APP_MATCH_MIN_SCORE = float(os.getenv("APP_MATCH_MIN_SCORE", "0.75"))
+APP_MATCH_MARGIN = float(os.getenv("APP_MATCH_MARGIN", "0.1"))
+
+# POST /api/commands: at most BATCH_MAX_COMMANDS per request; the distinct replies of a batch are
+# synthesized BATCH_TTS_WORKERS at a time
+BATCH_MAX_COMMANDS = int(os.getenv("BATCH_MAX_COMMANDS", "1000"))
+BATCH_TTS_WORKERS = int(os.getenv("BATCH_TTS_WORKERS", "8"))
+
+# Admission control per lane (audio = speech-to-text, network = ADMISSION_NETWORK_INTENTS, local = every other
+# intent, the fast lane). A lane runs at most LIMITS requests at once; up to QUEUES more wait, each at most
+# DEADLINES_MS, and the rest are shed with 503 + Retry-After. All three are "lane=value" lists.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "audio=8,network=16,local=64")
+ADMISSION_QUEUES = os.getenv("ADMISSION_QUEUES", "audio=32,network=64,local=256")
+ADMISSION_DEADLINES_MS = os.getenv("ADMISSION_DEADLINES_MS", "audio=3000,network=2000,local=250")
+ADMISSION_NETWORK_INTENTS = os.getenv("ADMISSION_NETWORK_INTENTS", "weather_query")
+
+# close_application looks processes up in a name index refreshed every INTERVAL s, then
+# terminates all matches at once and waits up to CLOSE_APP_TIMEOUT s for them to exit
+PROCESS_INDEX_INTERVAL = float(os.getenv("PROCESS_INDEX_INTERVAL", "2"))
+CLOSE_APP_TIMEOUT = float(os.getenv("CLOSE_APP_TIMEOUT", "1"))
+
+# Per-stage latency histograms and outcome counters at /api/metrics (off = no per-request cost)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
 
 # Weather
 WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "open-meteo")
+WEATHER_GEOCODE_URL = os.getenv("WEATHER_GEOCODE_URL", "https://geocoding-api.open-meteo.com/v1/search")
+WEATHER_FORECAST_URL = os.getenv("WEATHER_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+WEATHER_POOL_SIZE = int(os.getenv("WEATHER_POOL_SIZE", "20"))
+# City -> coordinates never expire and survive restarts
+WEATHER_GEOCODE_CACHE_PATH = os.getenv("WEATHER_GEOCODE_CACHE_PATH", os.path.join(DATA_DIR, "geocode_cache.json"))
+# Current weather per rounded coordinate: fresh for TTL seconds, then served stale (and refreshed) for STALE more
+WEATHER_FORECAST_TTL = float(os.getenv("WEATHER_FORECAST_TTL", "600"))
+WEATHER_FORECAST_STALE = float(os.getenv("WEATHER_FORECAST_STALE", "1800"))
+# At most this many coordinates keep a cached forecast (least recently used evicted first)
+WEATHER_FORECAST_MAX_ENTRIES = int(os.getenv("WEATHER_FORECAST_MAX_ENTRIES", "1024"))
+WEATHER_COORD_DECIMALS = int(os.getenv("WEATHER_COORD_DECIMALS", "2"))
+
+# Start-up: heavy dependencies are imported on first use; with PRELOAD_IMPORTS the app factory
+# imports them on a background thread once the server is up, so the first voice request does not wait
+PRELOAD_IMPORTS = os.getenv("PRELOAD_IMPORTS", "true").lower() == "true"
+
+# Production server (python -m backend.serve): WORKERS pre-forked processes (0 = one per CPU) sharing
+# one listening socket, each serving up to WORKER_THREADS connections at once (idle keep-alive
+# connections are closed after WORKER_KEEPALIVE s). A worker warms up before it accepts connections,
+# waiting at most WORKER_WARMUP_TIMEOUT s for the TTS part. After WORKER_MAX_REQUESTS requests
+# (plus a random 0..JITTER, so workers do not recycle together; 0 = never) it stops accepting,
+# finishes in-flight requests within WORKER_GRACEFUL_TIMEOUT s, and is replaced by a fresh worker
+WORKERS = int(os.getenv("WORKERS", "0"))
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "16"))
+WORKER_KEEPALIVE = float(os.getenv("WORKER_KEEPALIVE", "5"))
+WORKER_WARMUP_TIMEOUT = float(os.getenv("WORKER_WARMUP_TIMEOUT", "30"))
+WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", "10000"))
+WORKER_MAX_REQUESTS_JITTER = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "1000"))
+WORKER_GRACEFUL_TIMEOUT = float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+
+# Async (ASGI) serving mode
+ASGI_HOST = os.getenv("ASGI_HOST", HOST)
+ASGI_PORT = int(os.getenv("ASGI_PORT", str(PORT)))
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "200"))
+ASYNC_HTTP_TIMEOUT = float(os.getenv("ASYNC_HTTP_TIMEOUT", "10"))
 
 # Security / API keys (optional)
-# Example: GOOGLE_APPLICATION_CREDENTIALS for Google Cloud STT, not used by default 
\ No newline at end of file
+# Example: GOOGLE_APPLICATION_CREDENTIALS for Google Cloud STT, not used by default 
+
+
+_dirs_ready = False
+
+
+def ensure_dirs() -> None:
+	"""Create the data and upload spool directories; done by app init rather than at import."""
+	global _dirs_ready
+	if not _dirs_ready:
+		os.makedirs(DATA_DIR, exist_ok=True)
+		os.makedirs(TMP_DIR, exist_ok=True)
+		_dirs_ready = True
@@ -5,9 +5,11 @@ import subprocess
 import webbrowser
 from datetime import datetime
 from typing import Dict, Any, Optional
-import psutil
 
+from backend import config
+from backend.nlu.rule_based import register_app_names
 from backend.storage import save_text_file, add_reminder
+from backend.services.process_index import ProcessIndex, terminate_all
 from backend.services.weather import get_current_weather_summary
 from backend.utils import parse_reminder_time
 
@@ -47,6 +49,30 @@ PROCESS_NAMES = {
 	"vscode": ["Code.exe", "code"],
 }
 
+process_index = ProcessIndex(PROCESS_NAMES)
+register_app_names({app for commands in APP_COMMANDS.values() for app in commands} | set(PROCESS_NAMES))
+
+
+# Responses that never depend on the request; pre-synthesized by tts.warm_up at startup.
+GREET_RESPONSE = "Hello! How can I help?"
+BYE_RESPONSE = "Goodbye!"
+REMINDER_SAVED_RESPONSE = "Reminder saved. I'll remember that."
+REMINDER_TIME_ERROR_RESPONSE = "I couldn't understand the reminder time. Please say 'in 10 minutes' or 'at 5:30 pm'."
+FALLBACK_RESPONSE = "I didn't understand that. Please try again."
+
+DEFAULT_WEATHER_CITY = "New York"
+
+# Intents answered locally without I/O; cheap enough to run inline on any thread or event loop.
+LOCAL_INTENTS = frozenset({"greet", "bye", "time", "date", "set_language", "none"})
+
+STATIC_RESPONSES = (
+	GREET_RESPONSE,
+	BYE_RESPONSE,
+	REMINDER_SAVED_RESPONSE,
+	REMINDER_TIME_ERROR_RESPONSE,
+	FALLBACK_RESPONSE,
+)
+
 
 def _platform_key() -> str:
 	if OS_NAME.startswith("win"):
@@ -145,17 +171,13 @@ def save_as(filename: str) -> str:
 
 
 def close_application(app: str) -> str:
-	targets = PROCESS_NAMES.get(app, [])
-	closed_any = False
-	for proc in psutil.process_iter(attrs=["name"]):
-		try:
-			pname = proc.info.get("name") or ""
-			if any(t.lower() in pname.lower() for t in targets):
-				proc.terminate()
-				closed_any = True
-		except (psutil.NoSuchProcess, psutil.AccessDenied):
-			continue
-	return f"Closed {app}." if closed_any else f"Could not find running {app}."
+	closed = terminate_all(process_index.processes_for(app), config.CLOSE_APP_TIMEOUT)
+	return f"Closed {app}." if closed else f"Could not find running {app}."
+
+
+def start_process_index() -> None:
+	"""Keep the process-name index fresh in the background so close requests only look it up."""
+	process_index.start(config.PROCESS_INDEX_INTERVAL)
 
 
 def get_time_response() -> str:
@@ -174,21 +196,61 @@ def save_text(content: str, filename: Optional[str]) -> str:
 def create_reminder(what: str, in_minutes: Optional[str], at_time: Optional[str], am_pm: Optional[str]) -> str:
 	when_ts = parse_reminder_time(in_minutes, at_time, am_pm)
 	if not when_ts:
-		return "I couldn't understand the reminder time. Please say 'in 10 minutes' or 'at 5:30 pm'."
+		return REMINDER_TIME_ERROR_RESPONSE
 	add_reminder(what, when_ts)
-	return "Reminder saved. I'll remember that."
+	return REMINDER_SAVED_RESPONSE
 
 
 def weather_summary(city: Optional[str]) -> str:
-	city = city or "New York"
+	city = city or DEFAULT_WEATHER_CITY
 	return get_current_weather_summary(city)
 
 
+def predict_response(intent: str, entities: Dict[str, Any]) -> Optional[str]:
+	"""
+	Best guess at what execute_intent will answer, without running it. Used to start TTS
+	speculatively; a wrong guess only costs a wasted synthesis.
+	"""
+	if intent == "greet":
+		return GREET_RESPONSE
+	if intent == "bye":
+		return BYE_RESPONSE
+	if intent == "reminder_create":
+		return REMINDER_SAVED_RESPONSE
+	if intent == "open_app":
+		app = entities.get("app", "")
+		if APP_COMMANDS.get(_platform_key(), {}).get(app):
+			return f"Opening {app}."
+		return None
+	if intent == "close_app":
+		return f"Closed {entities.get('app', '')}."
+	if intent == "set_language":
+		return f"Language set to {entities.get('lang')}."
+	if intent == "none":
+		return FALLBACK_RESPONSE
+	return None
+
+
+def ack_response(intent: str, entities: Dict[str, Any]) -> str:
+	"""What to say right away when intent keeps running as a background job (see backend.jobs)."""
+	if intent == "open_app":
+		return f"Opening {entities.get('app', '')}."
+	if intent == "close_app":
+		return f"Closing {entities.get('app', '')}."
+	if intent == "open_path":
+		return f"Opening {entities.get('target', '')}."
+	if intent == "type_text":
+		return "Typing that now."
+	if intent == "save_as":
+		return f"Saving as {entities.get('filename', '')}."
+	return "Working on it."
+
+
 def execute_intent(intent: str, entities: Dict[str, Any]) -> str:
 	if intent == "greet":
-		return "Hello! How can I help?"
+		return GREET_RESPONSE
 	if intent == "bye":
-		return "Goodbye!"
+		return BYE_RESPONSE
 	if intent == "time":
 		return get_time_response()
 	if intent == "date":
@@ -212,4 +274,4 @@ def execute_intent(intent: str, entities: Dict[str, Any]) -> str:
 	if intent == "set_language":
 		lang = entities.get("lang")
 		return f"Language set to {lang}."
-	return "I didn't understand that. Please try again." 
\ No newline at end of file
+	return FALLBACK_RESPONSE 
\ No newline at end of file
@@ -0,0 +1,341 @@
+"""
+Background jobs for slow intents (app launches, UI automation, process scans).
+
+Intents in JOB_INTENTS run on a bounded pool of EXECUTOR_WORKERS threads instead of the request
+thread. Each intent has its own concurrency limit (JOB_INTENT_LIMITS, e.g. one keyboard
+automation at a time); jobs over the limit wait in a per-intent FIFO without holding a worker.
+A job that has not finished within its timeout (JOB_TIMEOUTS, else JOB_TIMEOUT, counted from
+submission) is reported as timed out; the thread cannot be interrupted, so its slot is only
+freed once the call really returns.
+
+The request waits up to JOB_ACK_WAIT_MS: a job done by then is answered as usual, otherwise the
+client gets an acknowledgement and the final result later, from GET /api/jobs/<id> or as a
+"job" event on the server-sent event stream. With SHARED_STATE an acknowledged job is recorded in
+SQLite as well, so GET /api/jobs/<id> is answered by any server process (a StoredJob).
+"""
+import time
+import heapq
+import logging
+import secrets
+import itertools
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from backend import config, metrics, storage
+from backend.executor import ack_response, execute_intent
+from backend.utils import lazy_import
+
+asyncio = lazy_import("asyncio")
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_RESPONSE = "That is taking too long, so I stopped waiting for it."
+
+_FINISHED = ("done", "error", "timeout")
+
+
+def parse_intent_values(spec: str, cast: Callable[[str], Any]) -> Dict[str, Any]:
+	"""'type_text=1,save_as=1' -> {'type_text': 1, 'save_as': 1}"""
+	values = {}
+	for item in filter(None, (s.strip() for s in spec.split(","))):
+		intent, _, value = item.partition("=")
+		if value:
+			values[intent.strip()] = cast(value.strip())
+	return values
+
+
+JOB_INTENTS = frozenset(s.strip() for s in config.JOB_INTENTS.split(",") if s.strip())
+
+
+class Job:
+	def __init__(self, intent: str, entities: Dict[str, Any], ack_text: str, lang: Optional[str]):
+		self.id = secrets.token_hex(8)
+		self.intent = intent
+		self.entities = entities
+		self.ack_text = ack_text
+		self.lang = lang
+		self.status = "queued"
+		self.response_text: Optional[str] = None
+		self.audio_url: Optional[str] = None
+		self.created = time.time()
+		self.finished_at: Optional[float] = None
+		self.acked = False
+		# Resolves to the job itself once it is done, failed or timed out (and its outcome published).
+		self.future: Future = Future()
+		self._lock = threading.Lock()
+
+	@property
+	def finished(self) -> bool:
+		return self.status in _FINISHED
+
+	def wait(self, timeout: float) -> bool:
+		try:
+			self.future.result(timeout)
+			return True
+		except TimeoutError:
+			return False
+
+	async def wait_async(self, timeout: float) -> None:
+		await asyncio.wait({asyncio.wrap_future(self.future)}, timeout=timeout)
+
+	def claim_ack(self) -> bool:
+		"""Mark that the client was only acknowledged; False if the job finished in the meantime."""
+		with self._lock:
+			if self.finished:
+				return False
+			self.acked = True
+			return True
+
+	def start(self) -> bool:
+		"""Mark the job running; False if it already finished (timed out while queued)."""
+		with self._lock:
+			if self.finished:
+				return False
+			self.status = "running"
+			return True
+
+	def finish(self, status: str, text: str) -> bool:
+		"""Record the outcome once (later calls are ignored); True if this call finished the job."""
+		with self._lock:
+			if self.finished:
+				return False
+			self.status = status
+			self.response_text = text
+			self.finished_at = time.time()
+		return True
+
+	def ref(self) -> Dict[str, Any]:
+		return {"id": self.id, "status": self.status, "url": f"/api/jobs/{self.id}"}
+
+	def to_dict(self) -> Dict[str, Any]:
+		data = {"id": self.id, "intent": self.intent, "status": self.status, "response_text": self.response_text}
+		if self.audio_url:
+			data["audio_url"] = self.audio_url
+		return data
+
+
+class JobQueue:
+	"""
+	run(intent, entities) does the work and returns the response text; on_finish(job) is called
+	once per job, from a worker or the timeout thread, after its outcome is recorded.
+	"""
+
+	def __init__(
+		self,
+		run: Callable[[str, Dict[str, Any]], str],
+		workers: int = 4,
+		limits: Optional[Dict[str, int]] = None,
+		default_limit: Optional[int] = None,
+		timeouts: Optional[Dict[str, float]] = None,
+		default_timeout: float = 30.0,
+		result_ttl: float = 300.0,
+		on_finish: Optional[Callable[[Job], None]] = None,
+	):
+		self._run_intent = run
+		self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+		self._limits = limits or {}
+		self._default_limit = default_limit or workers
+		self._timeouts = timeouts or {}
+		self._default_timeout = default_timeout
+		self._result_ttl = result_ttl
+		self._on_finish = on_finish
+		self._lock = threading.Lock()
+		self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+		self._active: Dict[str, int] = {}
+		self._waiting: Dict[str, Deque[Job]] = {}
+		self._deadlines: List[Tuple[float, int, Job]] = []
+		self._seq = itertools.count()
+		self._cond = threading.Condition(self._lock)
+		self._watcher: Optional[threading.Thread] = None
+
+	def submit(self, intent: str, entities: Dict[str, Any], ack_text: str = "", lang: Optional[str] = None) -> Job:
+		job = Job(intent, entities, ack_text, lang)
+		deadline = time.monotonic() + self._timeouts.get(intent, self._default_timeout)
+		with self._lock:
+			self._prune()
+			self._jobs[job.id] = job
+			heapq.heappush(self._deadlines, (deadline, next(self._seq), job))
+			self._cond.notify()
+			if self._watcher is None:
+				self._watcher = threading.Thread(target=self._watch, name="job-timeouts", daemon=True)
+				self._watcher.start()
+			start = self._active.get(intent, 0) < self._limits.get(intent, self._default_limit)
+			if start:
+				self._active[intent] = self._active.get(intent, 0) + 1
+			else:
+				self._waiting.setdefault(intent, deque()).append(job)
+		if start:
+			self._pool.submit(self._run, job)
+		return job
+
+	def get(self, job_id: str) -> Optional[Job]:
+		with self._lock:
+			return self._jobs.get(job_id)
+
+	def pending(self) -> Dict[str, int]:
+		"""Running plus queued jobs per intent."""
+		with self._lock:
+			return {intent: n + len(self._waiting.get(intent, ())) for intent, n in self._active.items() if n}
+
+	def _prune(self) -> None:
+		cutoff = time.time() - self._result_ttl
+		while self._jobs:
+			job = next(iter(self._jobs.values()))
+			if not job.finished or job.finished_at > cutoff:
+				break
+			self._jobs.popitem(last=False)
+
+	def _run(self, job: Job) -> None:
+		try:
+			if job.start():
+				try:
+					status, text = "done", self._run_intent(job.intent, job.entities)
+				except Exception as exc:
+					logger.exception("Job %s (%s) failed", job.id, job.intent)
+					status, text = "error", f"Sorry, that failed: {exc}"
+				self._complete(job, status, text)
+		finally:
+			self._release(job.intent)
+
+	def _release(self, intent: str) -> None:
+		with self._lock:
+			waiting = self._waiting.get(intent)
+			nxt = waiting.popleft() if waiting else None
+			if nxt is None:
+				self._active[intent] -= 1
+		if nxt is not None:
+			self._pool.submit(self._run, nxt)
+
+	def _complete(self, job: Job, status: str, text: str) -> None:
+		if not job.finish(status, text):
+			return
+		try:
+			if self._on_finish is not None:
+				self._on_finish(job)
+		except Exception:
+			logger.exception("Job %s completion callback failed", job.id)
+		finally:
+			job.future.set_result(job)
+
+	def _watch(self) -> None:
+		while True:
+			with self._cond:
+				while not self._deadlines:
+					self._cond.wait()
+				deadline, _, job = self._deadlines[0]
+				delay = deadline - time.monotonic()
+				if delay > 0:
+					self._cond.wait(delay)
+					continue
+				heapq.heappop(self._deadlines)
+			if not job.finished:
+				logger.warning("Job %s (%s) timed out", job.id, job.intent)
+				self._complete(job, "timeout", TIMEOUT_RESPONSE)
+
+
+class StoredJob:
+	"""A job acknowledged by another server process, read back from its shared record."""
+
+	def __init__(self, job_id: str, data: Dict[str, Any]):
+		self.id = job_id
+		self._data = data
+
+	@property
+	def finished(self) -> bool:
+		return self._data.get("status") in _FINISHED
+
+	def wait(self, timeout: float) -> bool:
+		"""Re-read the record every SHARED_POLL_SECONDS until it is finished or timeout passes."""
+		deadline = time.monotonic() + timeout
+		while not self.finished:
+			left = deadline - time.monotonic()
+			if left <= 0:
+				return False
+			time.sleep(min(config.SHARED_POLL_SECONDS, left))
+			self._data = storage.load_job(self.id) or self._data
+		return True
+
+	async def wait_async(self, timeout: float) -> None:
+		deadline = time.monotonic() + timeout
+		while not self.finished:
+			left = deadline - time.monotonic()
+			if left <= 0:
+				return
+			await asyncio.sleep(min(config.SHARED_POLL_SECONDS, left))
+			self._data = await asyncio.to_thread(storage.load_job, self.id) or self._data
+
+	def to_dict(self) -> Dict[str, Any]:
+		return dict(self._data)
+
+
+def share(job: Job) -> None:
+	"""Record an acknowledged job's state for the other server processes (SHARED_STATE)."""
+	if not storage.shared_state():
+		return
+	try:
+		storage.save_job(job.id, job.to_dict(), job.finished)
+	except Exception:
+		logger.warning("Could not share job %s", job.id, exc_info=True)
+
+
+def _publish(job: Job) -> None:
+	"""Push the outcome of an acknowledged job, with audio when it differs from what was said."""
+	if not job.acked:
+		return
+	from backend.scheduler import hub
+	from backend.services import tts
+
+	if job.response_text and job.response_text != job.ack_text:
+		job.audio_url = f"/api/audio/{tts.start_synthesis(job.response_text, lang=job.lang)}"
+	share(job)
+	hub.publish(dict(job.to_dict(), type="job"))
+
+
+job_queue = JobQueue(
+	execute_intent,
+	workers=config.EXECUTOR_WORKERS,
+	limits=parse_intent_values(config.JOB_INTENT_LIMITS, int),
+	timeouts=parse_intent_values(config.JOB_TIMEOUTS, float),
+	default_timeout=config.JOB_TIMEOUT,
+	result_ttl=config.JOB_RESULT_TTL,
+	on_finish=_publish,
+)
+
+metrics.register(metrics.Gauge(
+	"nova_jobs_pending", "Background jobs running or queued, by intent.", ("intent",),
+	lambda: {(intent,): n for intent, n in job_queue.pending().items()},
+))
+
+
+def is_job_intent(intent: str) -> bool:
+	return intent in JOB_INTENTS
+
+
+def submit(intent: str, entities: Dict[str, Any], lang: Optional[str] = None) -> Job:
+	return job_queue.submit(intent, entities, ack_response(intent, entities), lang)
+
+
+def get_job(job_id: str) -> Union[Job, StoredJob, None]:
+	"""A job of this process, else (SHARED_STATE) one another server process acknowledged."""
+	job = job_queue.get(job_id)
+	if job is None and storage.shared_state():
+		data = storage.load_job(job_id)
+		if data is not None:
+			return StoredJob(job_id, data)
+	return job
+
+
+def run_intent(intent: str, entities: Dict[str, Any], lang: Optional[str] = None) -> Tuple[str, Optional[Job]]:
+	"""
+	(response_text, job): job intents get JOB_ACK_WAIT_MS to finish; if they have not, the
+	acknowledgement is returned with the still-running job. Other intents run inline.
+	"""
+	if not is_job_intent(intent):
+		return execute_intent(intent, entities), None
+	job = submit(intent, entities, lang)
+	if job.wait(config.JOB_ACK_WAIT_MS / 1000) or not job.claim_ack():
+		return job.response_text, None
+	share(job)
+	return job.ack_text, job
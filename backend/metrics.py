@@ -0,0 +1,142 @@
+"""
+Process-wide latency histograms, outcome counters and queue-depth gauges, served in the Prometheus text exposition
+format at /api/metrics.
+
+Handlers already time their pipeline stages with utils.StageTimer for the Server-Timing header;
+record_request() folds a finished request's timer into the histograms below in one pass. The
+servers only install their metrics hooks when METRICS_ENABLED is set, so with metrics off the
+request path does no extra work at all.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backend.utils import StageTimer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: from local intents and cache hits (~1 ms) up to slow network STT/TTS.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+	return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+	pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+	if extra:
+		pairs.append(extra)
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+	return str(int(value)) if value == int(value) else repr(value)
+
+
+class Counter:
+	def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+		self.name = name
+		self.doc = doc
+		self.labels = tuple(labels)
+		self._values: Dict[Tuple[str, ...], float] = {}
+		self._lock = threading.Lock()
+
+	def inc(self, *label_values: str, amount: float = 1) -> None:
+		with self._lock:
+			self._values[label_values] = self._values.get(label_values, 0) + amount
+
+	def collect(self) -> Iterator[str]:
+		yield f"# HELP {self.name} {self.doc}"
+		yield f"# TYPE {self.name} counter"
+		with self._lock:
+			values = sorted(self._values.items())
+		for label_values, value in values:
+			yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+
+class Histogram:
+	"""Fixed-bucket histogram; each series keeps per-bucket counts (the last is +Inf) and a sum."""
+
+	def __init__(self, name: str, doc: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+		self.name = name
+		self.doc = doc
+		self.labels = tuple(labels)
+		self.buckets = tuple(buckets)
+		self._series: Dict[Tuple[str, ...], List[float]] = {}
+		self._lock = threading.Lock()
+
+	def observe(self, value: float, *label_values: str) -> None:
+		i = bisect.bisect_left(self.buckets, value)
+		with self._lock:
+			series = self._series.get(label_values)
+			if series is None:
+				series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+			series[i] += 1
+			series[-1] += value
+
+	def collect(self) -> Iterator[str]:
+		yield f"# HELP {self.name} {self.doc}"
+		yield f"# TYPE {self.name} histogram"
+		with self._lock:
+			snapshot = sorted((k, list(v)) for k, v in self._series.items())
+		bounds = [f'le="{_number(b)}"' for b in self.buckets] + ['le="+Inf"']
+		for label_values, series in snapshot:
+			cumulative = 0
+			for bound, count in zip(bounds, series):
+				cumulative += count
+				yield f"{self.name}_bucket{_labels(self.labels, label_values, bound)} {cumulative}"
+			yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(series[-1])}"
+			yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+
+class Gauge:
+	"""Sampled at render time: read() returns {label values: current value}."""
+
+	def __init__(self, name: str, doc: str, labels: Sequence[str], read: Callable[[], Dict[Tuple[str, ...], float]]):
+		self.name = name
+		self.doc = doc
+		self.labels = tuple(labels)
+		self.read = read
+
+	def collect(self) -> Iterator[str]:
+		yield f"# HELP {self.name} {self.doc}"
+		yield f"# TYPE {self.name} gauge"
+		for label_values, value in sorted(self.read().items()):
+			yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+
+REGISTRY: List = []
+
+
+def register(metric):
+	REGISTRY.append(metric)
+	return metric
+
+
+requests_total = register(Counter("nova_requests_total", "HTTP requests by route and status.", ("route", "status")))
+request_seconds = register(Histogram("nova_request_seconds", "Time to response headers by route.", ("route",)))
+stage_seconds = register(Histogram(
+	"nova_stage_seconds",
+	"Pipeline stage latency (receive, decode, listen, queue_<lane>, stt, interpret, execute, tts, tts_speculative, encode).",
+	("stage",),
+))
+execute_seconds = register(Histogram("nova_execute_seconds", "Intent execution latency by intent.", ("intent",)))
+commands_total = register(Counter("nova_commands_total", "Interpreted commands by intent and outcome.", ("intent", "outcome")))
+
+
+def record_request(route: str, status: int, seconds: float, timer: Optional[StageTimer] = None, intent: Optional[str] = None) -> None:
+	requests_total.inc(route, str(status))
+	request_seconds.observe(seconds, route)
+	if timer is not None:
+		for stage, (_, duration) in timer.stages.items():
+			stage_seconds.observe(duration, stage)
+	if intent:
+		commands_total.inc(intent, "ok" if status < 400 else "error")
+		execute = timer.stages.get("execute") if timer is not None else None
+		if execute is not None:
+			execute_seconds.observe(execute[1], intent)
+
+
+def render() -> str:
+	return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
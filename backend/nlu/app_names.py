@@ -0,0 +1,116 @@
+"""
+App-name resolution for open/close commands: exact alias lookups plus a fuzzy fallback for
+names the speech recognizer got slightly wrong ("calculater", "note pad app", "crome").
+
+Every alias is indexed under its lowercase form, its normalized form (punctuation and filler
+words such as "the" or "app" dropped) and its compact form (no spaces), so an exact hit is one
+dict lookup. A miss is matched against the compact aliases: a trigram inverted index picks
+the candidates sharing letters with the name, and each candidate is scored with an edit-distance
+similarity (1.0 = identical). The best app wins if it scores at least min_score and beats the
+best different app by margin; anything else stays unresolved. Fuzzy results are cached.
+"""
+import re
+import functools
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+FILLER_WORDS = frozenset({"the", "a", "an", "my", "app", "application", "program", "please", "up"})
+
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def normalize_name(name: str) -> str:
+	"""'Note-Pad app ' -> 'note pad'"""
+	words = _NON_WORD_RE.sub(" ", name.lower()).split()
+	return " ".join(w for w in words if w not in FILLER_WORDS)
+
+
+def trigrams(text: str) -> Set[str]:
+	padded = f"^{text}$"
+	return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+	"""1 - (optimal string alignment distance / longer length): 1.0 for equal strings."""
+	if a == b:
+		return 1.0
+	if not a or not b:
+		return 0.0
+	prev2: List[int] = []
+	prev = list(range(len(b) + 1))
+	for i in range(1, len(a) + 1):
+		cur = [i] + [0] * len(b)
+		for j in range(1, len(b) + 1):
+			cost = 0 if a[i - 1] == b[j - 1] else 1
+			cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+			if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+				cur[j] = min(cur[j], prev2[j - 2] + 1)
+		prev2, prev = prev, cur
+	return 1.0 - prev[-1] / max(len(a), len(b))
+
+
+class AppResolver:
+	def __init__(
+		self,
+		aliases: Dict[str, Sequence[str]],
+		names: Iterable[str] = (),
+		min_score: float = 0.75,
+		margin: float = 0.1,
+		min_length: int = 4,
+		cache_size: int = 4096,
+	):
+		self.min_score = min_score
+		self.margin = margin
+		self.min_length = min_length
+		self._exact: Dict[str, str] = {}
+		self._keys: List[Tuple[str, str]] = []
+		self._grams: Dict[str, List[int]] = {}
+		for canonical, variants in aliases.items():
+			for alias in (canonical, *variants):
+				self._add(alias, canonical)
+		for name in names:
+			self._add(name, name)
+		self._fuzzy_cached = functools.lru_cache(maxsize=cache_size)(self._fuzzy)
+
+	def _add(self, alias: str, canonical: str) -> None:
+		normalized = normalize_name(alias)
+		compact = normalized.replace(" ", "")
+		for key in (alias.strip().lower(), normalized, compact):
+			# Earlier entries win, so an explicit alias is never shadowed by a bare name.
+			self._exact.setdefault(key, canonical)
+		if compact and (compact, canonical) not in self._keys:
+			for gram in trigrams(compact):
+				self._grams.setdefault(gram, []).append(len(self._keys))
+			self._keys.append((compact, canonical))
+
+	def exact(self, name: str) -> Optional[str]:
+		canonical = self._exact.get(name)
+		if canonical is None:
+			normalized = normalize_name(name)
+			canonical = self._exact.get(normalized) or self._exact.get(normalized.replace(" ", ""))
+		return canonical
+
+	def resolve(self, name: str) -> Tuple[Optional[str], float]:
+		"""(canonical app, confidence); (None, 0.0) when nothing is close enough."""
+		canonical = self.exact(name)
+		if canonical is not None:
+			return canonical, 1.0
+		return self._fuzzy_cached(normalize_name(name).replace(" ", ""))
+
+	def _fuzzy(self, compact: str) -> Tuple[Optional[str], float]:
+		if len(compact) < self.min_length:
+			return None, 0.0
+		candidates: Set[int] = set()
+		for gram in trigrams(compact):
+			candidates.update(self._grams.get(gram, ()))
+		best: Dict[str, float] = {}
+		for i in candidates:
+			key, canonical = self._keys[i]
+			score = similarity(compact, key)
+			if score > best.get(canonical, 0.0):
+				best[canonical] = score
+		ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+		if not ranked or ranked[0][1] < self.min_score:
+			return None, 0.0
+		if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < self.margin:
+			return None, 0.0
+		return ranked[0]
@@ -1,5 +1,8 @@
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+from backend import config
+from backend.nlu.app_names import AppResolver
 
 INTENTS = {
 	"greet": re.compile(r"\b(hi|hello|hey)\b", re.I),
@@ -17,6 +20,25 @@ INTENTS = {
 	"set_language": re.compile(r"\b(set|switch)\s+(?:language|lang)\s+to\s+(?P<lang>[a-z]{2}(?:-[A-Z]{2})?)\b", re.I),
 }
 
+# Whole words at least one of which must appear for the intent's pattern to match.
+# Every pattern above anchors its leading keyword with \b on both sides, so a single
+# scan for these words tells us which intents are worth running at all.
+INTENT_TRIGGERS = {
+	"greet": ("hi", "hello", "hey"),
+	"bye": ("bye", "goodbye", "see"),
+	"time": ("time",),
+	"date": ("date", "day", "today"),
+	"open_app": ("open", "launch", "start"),
+	"close_app": ("close", "quit", "exit"),
+	"open_path": ("open", "launch", "start"),
+	"type_text": ("type", "write", "dictate"),
+	"save_as": ("save",),
+	"save_text": ("save",),
+	"reminder_create": ("remind",),
+	"weather_query": ("weather", "forecast"),
+	"set_language": ("set", "switch"),
+}
+
 APP_ALIASES = {
 	"notepad": ["notepad", "note pad"],
 	"calculator": ["calculator", "calc"],
@@ -27,25 +49,90 @@ APP_ALIASES = {
 }
 
 
+# Apps known elsewhere (the executor's launch commands and process names); see register_app_names.
+_app_names: Set[str] = set()
+_resolver: Optional[AppResolver] = None
+
+
+def register_app_names(names: Iterable[str]) -> None:
+	"""Make names resolvable (and fuzzy-matchable) as apps in their own right."""
+	global _resolver
+	_app_names.update(n.lower() for n in names)
+	_resolver = None
+
+
+def app_resolver() -> AppResolver:
+	"""The alias index, built on first use and again after register_app_names."""
+	global _resolver
+	resolver = _resolver
+	if resolver is None:
+		resolver = _resolver = AppResolver(
+			APP_ALIASES, sorted(_app_names), min_score=config.APP_MATCH_MIN_SCORE, margin=config.APP_MATCH_MARGIN,
+		)
+	return resolver
+
+
 def normalize_app(name: str) -> str:
+	"""Canonical app for a spoken name (exact alias, else a confident fuzzy match), else the name lowercased."""
 	name_l = name.strip().lower()
-	for canonical, variants in APP_ALIASES.items():
-		if name_l == canonical or any(name_l == v for v in variants):
-			return canonical
-	return name_l
+	canonical, _ = app_resolver().resolve(name_l)
+	return canonical or name_l
+
+
+def _compile_matcher() -> Tuple[re.Pattern, Dict[str, int], Tuple[Tuple[int, str, re.Pattern], ...]]:
+	"""
+	Build the single-pass trigger scanner.
+	Words sharing the same set of intents are merged into one named group, so a match's
+	lastgroup maps straight to a bitmask of candidate intents (bit i = i-th entry of INTENTS).
+	"""
+	ordered = tuple(INTENTS.items())
+	word_masks: Dict[str, int] = {}
+	for bit, (intent, _) in enumerate(ordered):
+		for word in INTENT_TRIGGERS[intent]:
+			word_masks[word] = word_masks.get(word, 0) | (1 << bit)
+	groups: Dict[int, List[str]] = {}
+	for word, mask in word_masks.items():
+		groups.setdefault(mask, []).append(word)
+	alternatives = []
+	group_masks: Dict[str, int] = {}
+	for i, (mask, words) in enumerate(groups.items()):
+		name = f"g{i}"
+		group_masks[name] = mask
+		alternatives.append(f"(?P<{name}>{'|'.join(map(re.escape, words))})")
+	scanner = re.compile(r"\b(?:" + "|".join(alternatives) + r")\b", re.I)
+	table = tuple((1 << bit, intent, pattern) for bit, (intent, pattern) in enumerate(ordered))
+	return scanner, group_masks, table
+
+
+_TRIGGER_RE, _GROUP_MASKS, _INTENT_TABLE = _compile_matcher()
+
+
+def _match_intent(text: str) -> Optional[Tuple[str, "re.Match"]]:
+	"""Return the first (intent, match) in INTENTS order, evaluating only triggered intents."""
+	mask = 0
+	for trig in _TRIGGER_RE.finditer(text):
+		mask |= _GROUP_MASKS[trig.lastgroup]
+	if not mask:
+		return None
+	for bit, intent, pattern in _INTENT_TABLE:
+		if mask & bit:
+			m = pattern.search(text)
+			if m:
+				return intent, m
+	return None
 
 
 def interpret(text: str) -> Dict[str, Any]:
 	text = (text or "").strip()
 	if not text:
 		return {"intent": "none", "entities": {}}
-	for intent, pattern in INTENTS.items():
-		m = pattern.search(text)
-		if m:
-			entities = {k: v for k, v in (m.groupdict() or {}).items() if v}
-			if "app" in entities:
-				entities["app"] = normalize_app(entities["app"])
-			if intent == "save_text" and "content" in entities:
-				entities["content"] = entities["content"].strip()
-			return {"intent": intent, "entities": entities}
-	return {"intent": "none", "entities": {}} 
\ No newline at end of file
+	found = _match_intent(text)
+	if found:
+		intent, m = found
+		entities = {k: v for k, v in (m.groupdict() or {}).items() if v}
+		if "app" in entities:
+			entities["app"] = normalize_app(entities["app"])
+		if intent == "save_text" and "content" in entities:
+			entities["content"] = entities["content"].strip()
+		return {"intent": intent, "entities": entities}
+	return {"intent": "none", "entities": {}}
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""
+Reminder delivery: a min-heap of pending reminders ordered by due time.
+
+Each reminder gets up to two heap events: a "prepare" event REMINDER_PRESYNTH_SECONDS before it
+is due (pre-synthesizes the spoken text) and a "fire" event at when_ts (pushes it to connected
+clients). Every event costs one heap push and one pop, O(log n).
+
+Only reminders due within the next REMINDER_WINDOW_SECONDS are held in memory. The next window is
+read from the (when_ts, id) index as the clock approaches it, so the table is never polled as a whole.
+"""
+import time
+import heapq
+import queue
+import logging
+import itertools
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from backend import config
+from backend.utils import lazy_import
+
+asyncio = lazy_import("asyncio")
+
+logger = logging.getLogger(__name__)
+
+_PREPARE, _FIRE = 0, 1
+# Seconds before a failed window read is retried
+LOAD_RETRY_SECONDS = 5.0
+
+Reminder = Dict[str, Any]
+
+
+def reminder_text(what: str) -> str:
+	return f"Reminder: {what}" if what else "Reminder!"
+
+
+class ReminderScheduler:
+	"""
+	on_prepare(reminder) may return a dict merged into the reminder before it fires (e.g. an
+	audio id); on_fire(reminder) delivers it. load_window(since, until), when given, returns the
+	stored reminders with since < when_ts <= until and enables windowed loading.
+	"""
+
+	def __init__(
+		self,
+		on_fire: Callable[[Reminder], None],
+		on_prepare: Optional[Callable[[Reminder], Optional[Dict[str, Any]]]] = None,
+		lead: float = 0.0,
+		load_window: Optional[Callable[[int, int], Iterable[Reminder]]] = None,
+		window: float = 3600.0,
+		clock: Callable[[], float] = time.time,
+	):
+		self._on_fire = on_fire
+		self._on_prepare = on_prepare
+		self._lead = lead
+		self._load_window = load_window
+		self._window = window
+		self._clock = clock
+		self._cond = threading.Condition()
+		self._heap: List[tuple] = []
+		self._seq = itertools.count()
+		self._scheduled: Set[int] = set()
+		self._loaded_until: Optional[int] = None
+		self._thread: Optional[threading.Thread] = None
+		self._stopped = False
+		self._retry_at = 0.0
+		self.fired = 0
+
+	def __len__(self) -> int:
+		return len(self._heap)
+
+	def _push(self, reminder: Reminder) -> None:
+		if self._on_prepare is not None and self._lead > 0:
+			entry = (reminder["when_ts"] - self._lead, _PREPARE, next(self._seq), reminder)
+		else:
+			entry = (reminder["when_ts"], _FIRE, next(self._seq), reminder)
+		heapq.heappush(self._heap, entry)
+
+	def schedule(self, reminder: Reminder) -> bool:
+		"""Add a reminder. Returns False if it is beyond the loaded window (it will be loaded later)."""
+		rem_id = reminder.get("id")
+		with self._cond:
+			if self._loaded_until is not None and reminder["when_ts"] > self._loaded_until:
+				return False
+			if rem_id is not None:
+				if rem_id in self._scheduled:
+					return True
+				self._scheduled.add(rem_id)
+			self._push(reminder)
+			self._cond.notify()
+		return True
+
+	def schedule_many(self, reminders: Iterable[Reminder]) -> int:
+		"""Bulk schedule without windowing or de-duplication checks; O(n) heapify."""
+		with self._cond:
+			start = len(self._heap)
+			for reminder in reminders:
+				self._push_unsorted(reminder)
+			if len(self._heap) - start:
+				heapq.heapify(self._heap)
+				self._cond.notify()
+			return len(self._heap) - start
+
+	def _push_unsorted(self, reminder: Reminder) -> None:
+		kind = _PREPARE if self._on_prepare is not None and self._lead > 0 else _FIRE
+		ts = reminder["when_ts"] - self._lead if kind == _PREPARE else reminder["when_ts"]
+		self._heap.append((ts, kind, next(self._seq), reminder))
+
+	def next_due(self) -> Optional[float]:
+		with self._cond:
+			return self._heap[0][0] if self._heap else None
+
+	def run_due(self, now: Optional[float] = None) -> int:
+		"""Process every event due at or before now. Returns how many reminders fired."""
+		now = self._clock() if now is None else now
+		fired = 0
+		while True:
+			with self._cond:
+				if not self._heap or self._heap[0][0] > now:
+					break
+				_, kind, _, reminder = heapq.heappop(self._heap)
+				if kind == _FIRE:
+					self._scheduled.discard(reminder.get("id"))
+			if kind == _PREPARE:
+				extra = None
+				try:
+					extra = self._on_prepare(reminder)
+				except Exception:
+					logger.warning("Preparing reminder %s failed", reminder.get("id"), exc_info=True)
+				if extra:
+					reminder = dict(reminder, **extra)
+				with self._cond:
+					heapq.heappush(self._heap, (reminder["when_ts"], _FIRE, next(self._seq), reminder))
+				continue
+			try:
+				self._on_fire(reminder)
+			except Exception:
+				logger.warning("Delivering reminder %s failed", reminder.get("id"), exc_info=True)
+			fired += 1
+		self.fired += fired
+		return fired
+
+	def load_next_window(self, now: Optional[float] = None) -> int:
+		"""Extend the in-memory window to now + window, reading only the newly covered range."""
+		if self._load_window is None:
+			return 0
+		now = int(self._clock() if now is None else now)
+		with self._cond:
+			previous = self._loaded_until
+			until = now + int(self._window)
+			if previous is not None and previous >= until:
+				return 0
+			# Publish the new bound first: add_reminder listeners schedule anything that
+			# lands in it from now on, and _scheduled drops the overlap with this read.
+			self._loaded_until = until
+		since = previous if previous is not None else now - int(config.REMINDER_CATCHUP_SECONDS) - 1
+		loaded = 0
+		try:
+			for reminder in self._load_window(since, until):
+				with self._cond:
+					if reminder["id"] in self._scheduled:
+						continue
+					self._scheduled.add(reminder["id"])
+					self._push(reminder)
+				loaded += 1
+		except BaseException:
+			# Roll the bound back so the next call reads the failed range again; rows already
+			# pushed are in _scheduled and are not pushed twice.
+			with self._cond:
+				if self._loaded_until == until:
+					self._loaded_until = previous
+			raise
+		return loaded
+
+	def start(self) -> None:
+		if self._thread is not None:
+			return
+		self.load_next_window()
+		self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+		self._thread.start()
+
+	def stop(self) -> None:
+		with self._cond:
+			self._stopped = True
+			self._cond.notify()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def _run(self) -> None:
+		while True:
+			now = self._clock()
+			if self._loaded_until is not None and now + self._window / 2 >= self._loaded_until and now >= self._retry_at:
+				try:
+					self.load_next_window(now)
+				except Exception:
+					logger.exception("Loading reminders failed, retrying in %g s", LOAD_RETRY_SECONDS)
+					self._retry_at = now + LOAD_RETRY_SECONDS
+			self.run_due(now)
+			with self._cond:
+				if self._stopped:
+					return
+				timeout = 60.0
+				if self._heap:
+					timeout = min(timeout, max(0.0, self._heap[0][0] - self._clock()))
+				if self._loaded_until is not None:
+					next_load = max(self._loaded_until - self._window / 2, self._retry_at)
+					timeout = min(timeout, max(0.0, next_load - self._clock()))
+				if timeout > 0:
+					self._cond.wait(timeout)
+
+
+class ReminderHub:
+	"""Fan-out of fired reminders to connected clients; slow clients drop events rather than block."""
+
+	def __init__(self, max_queue: int = 100):
+		self._max_queue = max_queue
+		self._lock = threading.Lock()
+		self._subscribers: Dict[int, Callable[[Reminder], None]] = {}
+
+	def subscribe(self) -> "queue.Queue[Reminder]":
+		q: "queue.Queue[Reminder]" = queue.Queue(maxsize=self._max_queue)
+
+		def deliver(event: Reminder) -> None:
+			try:
+				q.put_nowait(event)
+			except queue.Full:
+				pass
+		with self._lock:
+			self._subscribers[id(q)] = deliver
+		return q
+
+	def subscribe_async(self) -> "asyncio.Queue[Reminder]":
+		"""Subscribe from a coroutine; events are handed to the running loop thread-safely."""
+		loop = asyncio.get_running_loop()
+		q: "asyncio.Queue[Reminder]" = asyncio.Queue(maxsize=self._max_queue)
+
+		def put(event: Reminder) -> None:
+			if not q.full():
+				q.put_nowait(event)
+		with self._lock:
+			self._subscribers[id(q)] = lambda event: loop.call_soon_threadsafe(put, event)
+		return q
+
+	def unsubscribe(self, q) -> None:
+		with self._lock:
+			self._subscribers.pop(id(q), None)
+
+	def publish(self, event: Reminder) -> None:
+		with self._lock:
+			subscribers = list(self._subscribers.values())
+		for deliver in subscribers:
+			try:
+				deliver(event)
+			except RuntimeError:
+				# The subscriber's event loop has closed.
+				pass
+
+
+hub = ReminderHub()
+_scheduler: Optional[ReminderScheduler] = None
+
+
+def _prepare(reminder: Reminder) -> Dict[str, Any]:
+	from backend import storage
+	from backend.services import tts
+
+	text = reminder_text(reminder.get("what", ""))
+	if storage.shared_state() and not storage.claim(f"prepare:{reminder.get('id')}"):
+		# Another worker synthesizes it; the content-addressed id resolves from any worker.
+		return {"audio_id": tts.audio_id(text)}
+	return {"audio_id": tts.start_synthesis(text)}
+
+
+def _deliver(reminder: Reminder) -> None:
+	event = {
+		"type": "reminder",
+		"id": reminder.get("id"),
+		"what": reminder.get("what"),
+		"when_ts": reminder.get("when_ts"),
+		"text": reminder_text(reminder.get("what", "")),
+	}
+	if reminder.get("audio_id"):
+		event["audio_url"] = f"/api/audio/{reminder['audio_id']}"
+	hub.publish(event)
+
+
+def _follow_added(scheduler: ReminderScheduler, after_id: int) -> None:
+	"""Schedule the reminders any server process adds, reading the table by id every SHARED_POLL_SECONDS."""
+	from backend import storage
+
+	while True:
+		time.sleep(config.SHARED_POLL_SECONDS)
+		try:
+			for reminder in storage.reminders_added_after(after_id):
+				scheduler.schedule(reminder)
+				after_id = reminder["id"]
+		except Exception:
+			logger.warning("Reading newly added reminders failed", exc_info=True)
+
+
+def start_reminder_scheduler() -> Optional[ReminderScheduler]:
+	"""
+	Start the process-wide scheduler and subscribe it to newly stored reminders: those added by
+	this process or, with SHARED_STATE, by any server process. Every process delivers every
+	reminder to its own clients.
+	"""
+	global _scheduler
+	if not config.REMINDER_SCHEDULER or _scheduler is not None:
+		return _scheduler
+	from backend import storage
+
+	_scheduler = ReminderScheduler(
+		on_fire=_deliver,
+		on_prepare=_prepare,
+		lead=config.REMINDER_PRESYNTH_SECONDS,
+		load_window=lambda since, until: storage.iter_reminders(since=since + 1, until=until),
+		window=config.REMINDER_WINDOW_SECONDS,
+	)
+	if storage.shared_state():
+		after_id = storage.last_reminder_id()
+		threading.Thread(target=_follow_added, args=(_scheduler, after_id), name="reminder-follow", daemon=True).start()
+	else:
+		storage.add_listener(_scheduler.schedule)
+	_scheduler.start()
+	return _scheduler
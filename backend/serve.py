@@ -0,0 +1,315 @@
+"""
+Production server: pre-forked worker processes sharing one listening socket.
+
+Run: python -m backend.serve [--workers 4] [--threads 16] [--max-requests 10000]
+
+The master binds HOST:PORT, does the process-wide set-up once (directories, reminders schema,
+frontend manifest, heavy imports; the workers inherit it copy-on-write) and forks the workers.
+Each worker creates its own clients and thread pools and warms up (backend.app.warm_up) before
+it accepts a connection, so no request waits on a cold process. A worker takes a connection
+only when one of its threads is free, leaving the rest in the shared backlog for its siblings.
+After its request budget it stops accepting, tells the master (which forks its replacement
+right away), finishes what it has in flight and exits. The first worker boots alone, so the
+others find the fixed TTS replies it synthesized in the disk cache. With more than one worker,
+audio ids, job results and new reminders reach every worker through SQLite (SHARED_STATE,
+backend.storage), so a client may land on any worker. Every worker runs the reminder scheduler
+for its own event-stream clients, so each reminder is loaded and fired once per worker; its
+audio is pre-synthesized only by the worker that claims it first. SIGTERM or SIGINT stop the
+server gracefully. Without fork (Windows) the server runs as one in-process worker.
+"""
+import os
+import time
+import random
+import select
+import signal
+import socket
+import struct
+import logging
+import argparse
+import selectors
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Set
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from backend import config, static, storage
+from backend.app import PRELOAD_MODULES, create_app, warm_up
+from backend.executor import start_process_index
+from backend.scheduler import start_reminder_scheduler
+from backend.utils import import_modules
+
+logger = logging.getLogger(__name__)
+
+# Worker -> master messages on a pipe: +pid when ready to accept, -pid when it stops accepting.
+_MESSAGE = struct.Struct("=i")
+# A worker that dies before it is ready is re-forked after this many seconds, so a broken deploy does not spin.
+RESPAWN_BACKOFF = 1.0
+
+
+class _Handler(WSGIRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	def setup(self) -> None:
+		self.timeout = self.server.keepalive
+		super().setup()
+
+	def handle_one_request(self) -> None:
+		self.raw_requestline = b""
+		super().handle_one_request()
+		if self.raw_requestline:
+			self.server.request_done()
+		if self.server.draining:
+			self.close_connection = True
+
+	def log_request(self, code="-", size="-") -> None:
+		pass
+
+	def log_error(self, format: str, *args) -> None:
+		# An idle keep-alive connection reaching WORKER_KEEPALIVE is routine, not an error.
+		if not format.startswith("Request timed out"):
+			super().log_error(format, *args)
+
+
+class WorkerServer(BaseWSGIServer):
+	"""WSGI server with a bounded thread pool that serves max_requests requests (0 = no limit), then drains."""
+
+	multithread = True
+	multiprocess = True
+
+	def __init__(self, app, host: str, port: int, fd: Optional[int], threads: int, max_requests: int, keepalive: float):
+		super().__init__(host, port, app, handler=_Handler, fd=fd)
+		# Siblings accept on the same socket; whoever loses the race must not block in accept().
+		self.socket.setblocking(False)
+		self.keepalive = keepalive
+		self.max_requests = max_requests
+		self.draining = False
+		self._threads = threads
+		self._served = 0
+		self._lock = threading.Lock()
+		self._slots = threading.Semaphore(threads)
+		self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+
+	def request_done(self) -> None:
+		with self._lock:
+			self._served += 1
+			if self.max_requests and self._served >= self.max_requests and not self.draining:
+				logger.info("Worker %d served %d requests, recycling", os.getpid(), self._served)
+				self.draining = True
+
+	def drain(self) -> None:
+		self.draining = True
+
+	def serve(self, parent: Optional[int] = None, on_drain: Optional[Callable[[], None]] = None) -> None:
+		"""Accept until draining (or until the parent process is gone), then finish in-flight connections."""
+		with selectors.DefaultSelector() as selector:
+			selector.register(self.socket, selectors.EVENT_READ)
+			while not self.draining:
+				if parent is not None and os.getppid() != parent:
+					logger.warning("Worker %d lost its master, stopping", os.getpid())
+					break
+				if not self._slots.acquire(timeout=0.5):
+					continue
+				try:
+					if not selector.select(0.5) or self.draining:
+						self._slots.release()
+						continue
+					conn, addr = self.socket.accept()
+				except OSError:
+					self._slots.release()
+					continue
+				self._pool.submit(self._handle, conn, addr)
+		self.draining = True
+		if on_drain is not None:
+			on_drain()
+		deadline = time.monotonic() + config.WORKER_GRACEFUL_TIMEOUT
+		for held in range(self._threads):
+			if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+				logger.warning("Worker %d exiting with %d connections still open", os.getpid(), self._threads - held)
+				break
+		self._pool.shutdown(wait=False)
+		self.server_close()
+
+	def _handle(self, conn: socket.socket, addr) -> None:
+		try:
+			self.finish_request(conn, addr)
+		except Exception:
+			self.handle_error(conn, addr)
+		finally:
+			self.shutdown_request(conn)
+			self._slots.release()
+
+
+def _exit_now(signum, frame) -> None:
+	raise SystemExit(0)
+
+
+def run_worker(args: argparse.Namespace, fd: Optional[int] = None, ready_fd: Optional[int] = None) -> None:
+	"""One worker: set up and warm up, then serve from fd (or its own socket on args.host/args.port)."""
+	parent = os.getppid() if ready_fd is not None else None
+	if ready_fd is not None:
+		# The master coordinates shutdown; a terminal Ctrl-C reaches the whole process group.
+		signal.signal(signal.SIGINT, signal.SIG_IGN)
+		signal.signal(signal.SIGTERM, _exit_now)
+	start = time.monotonic()
+	app = create_app(start_background=False)
+	warm_up(tts_timeout=config.WORKER_WARMUP_TIMEOUT)
+	start_reminder_scheduler()
+	start_process_index()
+	max_requests = args.max_requests + random.randint(0, args.max_requests_jitter) if args.max_requests else 0
+	server = WorkerServer(app, args.host, args.port, fd, args.threads, max_requests, config.WORKER_KEEPALIVE)
+	logger.info("Worker %d ready in %.2f s", os.getpid(), time.monotonic() - start)
+	if ready_fd is None:
+		server.serve()
+		return
+	signal.signal(signal.SIGTERM, lambda signum, frame: server.drain())
+	os.write(ready_fd, _MESSAGE.pack(os.getpid()))
+	server.serve(parent=parent, on_drain=lambda: os.write(ready_fd, _MESSAGE.pack(-os.getpid())))
+
+
+class Supervisor:
+	"""Keeps args.workers ready or warming workers forked from this process (see the module docstring)."""
+
+	def __init__(self, sock: socket.socket, args: argparse.Namespace):
+		self.sock = sock
+		self.args = args
+		self.workers: Dict[int, float] = {}  # pid -> fork time, while accepting or warming up
+		self.ready: Set[int] = set()
+		self.retiring: Set[int] = set()  # stopped accepting, still finishing requests
+		self.booted = False
+		self.stopping = False
+		self._respawn_at = 0.0
+		self._ready_r, self._ready_w = os.pipe()
+
+	def spawn(self) -> int:
+		pid = os.fork()
+		if pid == 0:
+			code = 0
+			try:
+				os.close(self._ready_r)
+				run_worker(self.args, self.sock.fileno(), self._ready_w)
+			except SystemExit as exc:
+				code = exc.code if isinstance(exc.code, int) else 0
+			except BaseException:
+				logger.exception("Worker %d failed", os.getpid())
+				code = 1
+			finally:
+				logging.shutdown()
+				os._exit(code)
+		self.workers[pid] = time.monotonic()
+		return pid
+
+	def _stop(self, signum, frame) -> None:
+		self.stopping = True
+
+	def run(self) -> None:
+		signal.signal(signal.SIGTERM, self._stop)
+		signal.signal(signal.SIGINT, self._stop)
+		while not self.stopping:
+			self.step()
+		self._shutdown()
+
+	def step(self, timeout: float = 0.5) -> None:
+		"""Fork up to the target, then wait up to timeout for worker messages and reap exited workers."""
+		target = self.args.workers if self.booted else 1
+		while len(self.workers) < target and time.monotonic() >= self._respawn_at:
+			self.spawn()
+		self._read_messages(timeout)
+		self._reap()
+
+	def _read_messages(self, timeout: float) -> None:
+		readable, _, _ = select.select([self._ready_r], [], [], timeout)
+		if not readable:
+			return
+		for (pid,) in _MESSAGE.iter_unpack(os.read(self._ready_r, 4096)):
+			if pid > 0 and pid in self.workers:
+				self.ready.add(pid)
+				self.booted = True
+			elif pid < 0 and -pid in self.workers:
+				# Fork the replacement now, while this one drains.
+				del self.workers[-pid]
+				self.retiring.add(-pid)
+
+	def _reap(self) -> None:
+		while True:
+			try:
+				pid, status = os.waitpid(-1, os.WNOHANG)
+			except ChildProcessError:
+				return
+			if pid == 0:
+				return
+			self.workers.pop(pid, None)
+			self.retiring.discard(pid)
+			code = os.waitstatus_to_exitcode(status)
+			if pid not in self.ready:
+				if not self.stopping:
+					logger.error("Worker %d exited with %d before it was ready", pid, code)
+					self._respawn_at = time.monotonic() + RESPAWN_BACKOFF
+			elif code != 0 and not self.stopping:
+				logger.warning("Worker %d exited with %d", pid, code)
+			self.ready.discard(pid)
+
+	def _shutdown(self) -> None:
+		signal.signal(signal.SIGINT, signal.SIG_IGN)
+		for pid in list(self.workers) + list(self.retiring):
+			try:
+				os.kill(pid, signal.SIGTERM)
+			except ProcessLookupError:
+				pass
+		deadline = time.monotonic() + config.WORKER_GRACEFUL_TIMEOUT + 5
+		while (self.workers or self.retiring) and time.monotonic() < deadline:
+			time.sleep(0.1)
+			self._reap()
+		for pid in list(self.workers) + list(self.retiring):
+			logger.warning("Worker %d did not stop, killing it", pid)
+			os.kill(pid, signal.SIGKILL)
+			os.waitpid(pid, 0)
+		self.sock.close()
+
+
+def prepare() -> None:
+	"""
+	Set-up shared by all workers, done once before forking. The TTS disk cache is indexed by each
+	worker instead, after the first worker's warm-up has filled it; the master starts no threads.
+	"""
+	config.ensure_dirs()
+	storage.init_storage()
+	static.manifest()
+	if config.PRELOAD_IMPORTS:
+		import_modules(PRELOAD_MODULES)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--host", default=config.HOST)
+	parser.add_argument("--port", type=int, default=config.PORT)
+	parser.add_argument("--workers", type=int, default=config.WORKERS, help="worker processes (0 = one per CPU)")
+	parser.add_argument("--threads", type=int, default=config.WORKER_THREADS, help="concurrent connections per worker")
+	parser.add_argument("--max-requests", type=int, default=config.WORKER_MAX_REQUESTS, help="recycle a worker after this many requests (0 = never)")
+	parser.add_argument("--max-requests-jitter", type=int, default=config.WORKER_MAX_REQUESTS_JITTER)
+	args = parser.parse_args()
+	args.workers = args.workers or os.cpu_count() or 1
+
+	if not hasattr(os, "fork"):
+		logger.warning("No fork on this platform: serving from one process, without recycling")
+		args.max_requests = 0
+		logger.info("Listening on http://%s:%d", args.host, args.port)
+		run_worker(args)
+		return
+
+	if args.workers > 1 and "SHARED_STATE" not in os.environ:
+		config.SHARED_STATE = True
+	if args.workers > 1 and not storage.shared_state():
+		logger.warning(
+			"Shared state is off (SHARED_STATE or USE_SQLITE is false): audio URLs, job results and "
+			"new reminders only reach clients of the worker that produced them"
+		)
+	family = socket.AF_INET6 if ":" in args.host else socket.AF_INET
+	sock = socket.create_server((args.host, args.port), family=family, backlog=2048)
+	prepare()
+	logger.info("Listening on http://%s:%d with %d workers x %d threads", args.host, args.port, args.workers, args.threads)
+	Supervisor(sock, args).run()
+
+
+if __name__ == "__main__":
+	main()
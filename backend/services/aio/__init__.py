@@ -0,0 +1 @@
+# asyncio variants of the services, used by backend.asgi
\ No newline at end of file
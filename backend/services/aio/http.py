@@ -0,0 +1,36 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend import config
+from backend.utils import lazy_import
+
+aiohttp = lazy_import("aiohttp")
+
+# One pooled session per event loop; keep-alive connections are shared by every request on that loop.
+_sessions: Dict[int, "aiohttp.ClientSession"] = {}
+
+
+def get_session() -> "aiohttp.ClientSession":
+	loop_id = id(asyncio.get_running_loop())
+	session = _sessions.get(loop_id)
+	if session is None or session.closed:
+		connector = aiohttp.TCPConnector(limit=config.ASYNC_HTTP_MAX_CONNECTIONS, ttl_dns_cache=300)
+		timeout = aiohttp.ClientTimeout(total=config.ASYNC_HTTP_TIMEOUT)
+		session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+		_sessions[loop_id] = session
+	return session
+
+
+def query(params: Dict[str, Any]) -> List[Tuple[str, str]]:
+	"""Flatten list values into repeated keys, the way requests encodes them."""
+	pairs = []
+	for key, value in params.items():
+		for item in (value if isinstance(value, (list, tuple)) else [value]):
+			pairs.append((key, str(item)))
+	return pairs
+
+
+async def aclose() -> None:
+	session: Optional["aiohttp.ClientSession"] = _sessions.pop(id(asyncio.get_running_loop()), None)
+	if session is not None:
+		await session.close()
@@ -0,0 +1,52 @@
+import asyncio
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from backend import config
+from backend.services import speech
+from backend.services.aio.http import get_session
+from backend.services.stt_engines import GoogleEngine, get_engine, loaded_engine
+from backend.utils import lazy_import
+
+aiohttp = lazy_import("aiohttp")
+sr = lazy_import("speech_recognition")
+google = lazy_import("speech_recognition.recognizers.google")
+
+
+def _build_request(audio: "sr.AudioData", language: str) -> Tuple[str, Dict[str, str], bytes]:
+	builder = google.create_request_builder(endpoint=config.STT_ENDPOINT, language=language)
+	return builder.build_url(), builder.build_headers(audio), builder.build_data(audio)
+
+
+async def transcribe_wav_stream(stream: BinaryIO, language: Optional[str] = None) -> str:
+	"""
+	Async counterpart of speech.transcribe_wav_stream for an in-memory (or spooled) WAV or FLAC
+	upload. Decoding and FLAC encoding run in a worker thread; the Google request uses the shared pool.
+	"""
+	audio = await asyncio.to_thread(speech.read_audio, stream)
+	return await transcribe_audio(audio, language=language)
+
+
+async def transcribe_pcm(pcm: bytes, sample_rate: int, language: Optional[str] = None) -> str:
+	audio = await asyncio.to_thread(speech.pcm_audio, pcm, sample_rate)
+	return await transcribe_audio(audio, language=language)
+
+
+async def transcribe_audio(audio: "sr.AudioData", language: Optional[str] = None) -> str:
+	"""Google is called on the shared aiohttp pool; other engines are awaited via their Future."""
+	language = language or config.STT_LANGUAGE
+	# Created at start-up (start_services); the thread hop only covers a first request that beats it.
+	engine = loaded_engine() or await asyncio.to_thread(get_engine)
+	if not isinstance(engine, GoogleEngine):
+		return await asyncio.wrap_future(engine.submit(audio, language))
+	url, headers, body = await asyncio.to_thread(_build_request, audio, language)
+	try:
+		async with get_session().post(url, data=body, headers=headers) as resp:
+			if resp.status != 200:
+				raise RuntimeError(f"Speech recognition service error: recognition request failed: {resp.reason}")
+			response_text = await resp.text()
+	except aiohttp.ClientError as exc:
+		raise RuntimeError(f"Speech recognition service error: {exc}")
+	try:
+		return google.OutputParser(show_all=False, with_confidence=False).parse(response_text)
+	except sr.UnknownValueError:
+		return ""
@@ -0,0 +1,53 @@
+import asyncio
+import base64
+import re
+from typing import List, Optional
+
+from backend import config
+from backend.services import tts
+from backend.services.aio.http import get_session
+from backend.services.tts_engines import GTTSEngine, engine_for, prepare_requests
+
+# Same extraction gTTS.stream() applies to each line of the batchexecute response.
+_AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+
+def _decode_audio(body: str) -> bytes:
+	chunks: List[bytes] = []
+	for line in body.splitlines():
+		if "jQ1olc" in line:
+			m = _AUDIO_RE.search(line)
+			if not m:
+				raise RuntimeError("TTS response contained no audio")
+			chunks.append(base64.b64decode(m.group(1).encode("ascii")))
+	return b"".join(chunks)
+
+
+async def _fetch_part(prepared) -> bytes:
+	headers = {k: v for k, v in prepared.headers.items() if k.lower() != "content-length"}
+	async with get_session().request(prepared.method, prepared.url, data=prepared.body, headers=headers) as resp:
+		resp.raise_for_status()
+		body = await resp.text()
+	return _decode_audio(body)
+
+
+async def synthesize_speech(text: str, lang: Optional[str] = None) -> bytes:
+	"""
+	Async synthesize_speech: same cache. gTTS parts are fetched concurrently on the shared pool;
+	other engines are awaited via their Future.
+	"""
+	if not text:
+		text = "I'm here."
+	language = lang or config.TTS_LANGUAGE
+	engine = await asyncio.to_thread(engine_for, language)
+	key = tts.audio_key(text, language, engine)
+	mp3 = tts._cache.get(key)
+	if mp3 is None:
+		if isinstance(engine, GTTSEngine):
+			prepared = prepare_requests(text, language)
+			parts = await asyncio.gather(*(_fetch_part(pr) for pr in prepared))
+			mp3 = b"".join(parts)
+		else:
+			mp3 = await asyncio.wrap_future(engine.submit(text, language))
+		tts._cache.put(key, mp3)
+	return mp3
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from backend.services import weather
+from backend.services.weather import FRESH, STALE
+from backend.services.aio.http import get_session, query
+from backend.utils import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Caches are shared with the sync service; only the in-flight coalescing is per event loop.
+_geocode_flight = AsyncSingleFlight()
+_forecast_flight = AsyncSingleFlight()
+
+
+async def _fetch_geocode(city: str, key: str) -> Optional[Tuple[float, float, str]]:
+	async with get_session().get(weather.GEOCODE_URL, params=query(weather._geocode_params(city))) as resp:
+		resp.raise_for_status()
+		data = await resp.json(content_type=None)
+	geo = weather._parse_geocode(city, data)
+	if geo:
+		await asyncio.to_thread(weather.cache.put_geocode, key, geo)
+	return geo
+
+
+async def _fetch_forecast(key: Tuple[float, float]) -> Dict[str, Any]:
+	async with get_session().get(weather.WEATHER_URL, params=query(weather._forecast_params(*key))) as resp:
+		resp.raise_for_status()
+		data = await resp.json(content_type=None)
+	weather.cache.put_forecast(key, data)
+	return data
+
+
+def _log_refresh_error(task: asyncio.Future) -> None:
+	if not task.cancelled() and task.exception() is not None:
+		logger.warning("Background weather refresh failed: %s", task.exception())
+
+
+async def geocode_city(city: str) -> Optional[Tuple[float, float, str]]:
+	key = weather.cache.city_key(city)
+	geo = weather.cache.get_geocode(key)
+	if geo is not None:
+		return geo
+	return await _geocode_flight.do(key, lambda: _fetch_geocode(city, key))
+
+
+async def get_forecast(lat: float, lon: float) -> Dict[str, Any]:
+	key = weather.cache.coord_key(lat, lon)
+	data, state = weather.cache.get_forecast(key)
+	if state == FRESH:
+		return data
+	if state == STALE:
+		if not _forecast_flight.in_flight(key):
+			refresh = asyncio.ensure_future(_forecast_flight.do(key, lambda: _fetch_forecast(key)))
+			refresh.add_done_callback(_log_refresh_error)
+		return data
+	return await _forecast_flight.do(key, lambda: _fetch_forecast(key))
+
+
+async def get_current_weather_summary(city: str) -> str:
+	geo = await geocode_city(city)
+	if not geo:
+		return f"I couldn't find weather for {city}."
+	lat, lon, canonical = geo
+	return weather._format_summary(canonical, await get_forecast(lat, lon))
@@ -0,0 +1,161 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def cache_key(text: str, lang: str) -> str:
+	"""Content address for a synthesized clip: sha256 over (lang, text)."""
+	return hashlib.sha256(f"{lang}\0{text}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+	"""
+	Two-tier cache of synthesized audio keyed by (text, lang).
+	Tier 1 is an in-memory LRU bounded by total bytes; tier 2 is a directory of
+	<sha256>.mp3 files bounded by total size, evicting the least recently used file.
+	A disk limit of 0 disables the disk tier. The disk index is built by open(), or on first use;
+	a clip missing from it is still looked for on disk, since other processes may share the directory.
+	"""
+
+	def __init__(self, memory_bytes: int, disk_dir: Optional[str] = None, disk_bytes: int = 0, suffix: str = ".mp3"):
+		self.memory_bytes = memory_bytes
+		self.disk_dir = disk_dir if disk_bytes > 0 else None
+		self.disk_bytes = disk_bytes
+		self.suffix = suffix
+		self._lock = threading.Lock()
+		self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+		self._mem_size = 0
+		self._disk: "OrderedDict[str, int]" = OrderedDict()
+		self._disk_size = 0
+		self.hits = 0
+		self.disk_hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.disk_evictions = 0
+		self._opened = False
+
+	def open(self) -> None:
+		"""Create the disk directory and index the clips already in it; later calls do nothing."""
+		if self._opened:
+			return
+		with self._lock:
+			if self._opened:
+				return
+			if self.disk_dir:
+				os.makedirs(self.disk_dir, exist_ok=True)
+				self._load_disk_index()
+			self._opened = True
+
+	def _load_disk_index(self) -> None:
+		entries = []
+		for entry in os.scandir(self.disk_dir):
+			if entry.is_file() and entry.name.endswith(self.suffix):
+				st = entry.stat()
+				entries.append((st.st_mtime, entry.name[:-len(self.suffix)], st.st_size))
+		for _, key, size in sorted(entries):
+			self._disk[key] = size
+			self._disk_size += size
+		self._evict_disk()
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.disk_dir, key + self.suffix)
+
+	def get(self, key: str) -> Optional[bytes]:
+		self.open()
+		with self._lock:
+			data = self._mem.get(key)
+			if data is not None:
+				self._mem.move_to_end(key)
+				self.hits += 1
+				return data
+		if self.disk_dir is not None:
+			# Not only indexed clips: another process sharing disk_dir may have written this one since.
+			try:
+				with open(self._path(key), "rb") as f:
+					data = f.read()
+				os.utime(self._path(key))
+			except OSError:
+				data = None
+			with self._lock:
+				if data is None:
+					self._drop_disk_entry(key)
+				else:
+					if key in self._disk:
+						self._disk.move_to_end(key)
+					else:
+						self._disk[key] = len(data)
+						self._disk_size += len(data)
+						self._evict_disk()
+					self.disk_hits += 1
+					self._put_mem(key, data)
+					return data
+		with self._lock:
+			self.misses += 1
+		return None
+
+	def put(self, key: str, data: bytes) -> None:
+		self.open()
+		with self._lock:
+			self._put_mem(key, data)
+		if self.disk_dir is None or len(data) > self.disk_bytes:
+			return
+		path = self._path(key)
+		tmp_path = f"{path}.{threading.get_ident()}.tmp"
+		try:
+			with open(tmp_path, "wb") as f:
+				f.write(data)
+			os.replace(tmp_path, path)
+		except OSError:
+			try:
+				os.remove(tmp_path)
+			except OSError:
+				pass
+			return
+		with self._lock:
+			self._disk_size -= self._disk.pop(key, 0)
+			self._disk[key] = len(data)
+			self._disk_size += len(data)
+			self._evict_disk()
+
+	def _put_mem(self, key: str, data: bytes) -> None:
+		if len(data) > self.memory_bytes:
+			return
+		old = self._mem.pop(key, None)
+		if old is not None:
+			self._mem_size -= len(old)
+		self._mem[key] = data
+		self._mem_size += len(data)
+		while self._mem_size > self.memory_bytes:
+			_, evicted = self._mem.popitem(last=False)
+			self._mem_size -= len(evicted)
+			self.evictions += 1
+
+	def _drop_disk_entry(self, key: str) -> None:
+		self._disk_size -= self._disk.pop(key, 0)
+
+	def _evict_disk(self) -> None:
+		while self._disk_size > self.disk_bytes and self._disk:
+			key, size = self._disk.popitem(last=False)
+			self._disk_size -= size
+			self.disk_evictions += 1
+			try:
+				os.remove(self._path(key))
+			except OSError:
+				pass
+
+	def stats(self) -> Dict[str, int]:
+		self.open()
+		with self._lock:
+			return {
+				"hits": self.hits,
+				"disk_hits": self.disk_hits,
+				"misses": self.misses,
+				"evictions": self.evictions,
+				"disk_evictions": self.disk_evictions,
+				"memory_entries": len(self._mem),
+				"memory_bytes": self._mem_size,
+				"disk_entries": len(self._disk),
+				"disk_bytes": self._disk_size,
+			}
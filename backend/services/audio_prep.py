@@ -0,0 +1,99 @@
+"""
+Pre-STT audio conditioning on NumPy arrays: downmix to mono, resample to PREP_SAMPLE_RATE,
+trim leading/trailing silence by frame energy and normalize peak gain.
+
+The PCM buffer is read through a zero-copy np.frombuffer view; the only copies are the
+float32 working array and the int16 result handed to the recognizer.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from backend import config
+from backend.services.vad import frame_energy
+
+_INT_DTYPES = {1: np.uint8, 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+_FULL_SCALE = {1: 128.0, 2: 32768.0, 3: 8388608.0, 4: 2147483648.0}
+
+
+def pcm_to_float(frames: bytes, sample_width: int, channels: int) -> np.ndarray:
+	"""Little-endian PCM bytes to a float32 mono array in [-1, 1]."""
+	usable = len(frames) - len(frames) % (sample_width * channels)
+	if sample_width == 3:
+		raw = np.frombuffer(frames, dtype=np.uint8, count=usable).reshape(-1, 3)
+		samples = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+		samples = np.where(samples & 0x800000, samples - 0x1000000, samples)
+	else:
+		samples = np.frombuffer(frames, dtype=_INT_DTYPES[sample_width], count=usable // sample_width)
+	if sample_width == 1:
+		# 8-bit WAV is unsigned
+		samples = samples.astype(np.int16) - 128
+	if channels > 1:
+		out = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+	else:
+		out = samples.astype(np.float32)
+	out /= _FULL_SCALE[sample_width]
+	return out
+
+
+def resample(samples: np.ndarray, rate: int, target: int) -> np.ndarray:
+	"""
+	Band-limited resampling through the real FFT: truncating the spectrum is an ideal
+	low-pass at the new Nyquist frequency, so downsampling does not alias.
+	"""
+	if rate == target or not samples.size:
+		return samples
+	n = samples.size
+	m = max(1, int(round(n * target / rate)))
+	spectrum = np.fft.rfft(samples)
+	keep = m // 2 + 1
+	if keep < spectrum.size:
+		spectrum = spectrum[:keep]
+	return (np.fft.irfft(spectrum, m) * (m / n)).astype(np.float32)
+
+
+def trim_silence(samples: np.ndarray, rate: int, threshold: float, frame_ms: int, pad_ms: int) -> np.ndarray:
+	"""Drop frames before the first and after the last frame whose RMS exceeds threshold."""
+	frame = max(1, rate * frame_ms // 1000)
+	n = samples.size // frame
+	if not n:
+		return samples
+	voiced = np.flatnonzero(frame_energy(samples[:n * frame].reshape(n, frame), full_scale=1.0) > threshold)
+	if not voiced.size:
+		return samples
+	pad = rate * pad_ms // 1000
+	start = max(0, voiced[0] * frame - pad)
+	end = min(samples.size, (voiced[-1] + 1) * frame + pad)
+	return samples[start:end]
+
+
+def normalize_peak(samples: np.ndarray, peak: float, max_gain: float) -> np.ndarray:
+	current = float(np.max(np.abs(samples))) if samples.size else 0.0
+	if current <= 0:
+		return samples
+	gain = min(peak / current, max_gain)
+	return samples * np.float32(gain)
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+	"""Float samples in [-1, 1] to int16 little-endian bytes, clipping in place."""
+	np.clip(samples, -1.0, 32767 / 32768, out=samples)
+	return (samples * 32768.0).astype("<i2").tobytes()
+
+
+def mixdown_pcm(frames: bytes, sample_width: int, channels: int) -> bytes:
+	"""Interleaved PCM of any width to int16 mono (the channel average), without further conditioning."""
+	return to_pcm16(pcm_to_float(frames, sample_width, channels))
+
+
+def preprocess_pcm(frames: bytes, sample_rate: int, sample_width: int, channels: int) -> Tuple[bytes, int]:
+	"""
+	Condition raw PCM for recognition. Returns (int16 little-endian mono bytes, sample rate).
+	Audio below PREP_SAMPLE_RATE is kept at its own rate; upsampling adds no information.
+	"""
+	samples = pcm_to_float(frames, sample_width, channels)
+	target = min(sample_rate, config.PREP_SAMPLE_RATE)
+	samples = resample(samples, sample_rate, target)
+	samples = trim_silence(samples, target, config.VAD_ENERGY_THRESHOLD, config.VAD_FRAME_MS, config.PREP_TRIM_PAD_MS)
+	samples = normalize_peak(samples, config.PREP_PEAK, config.PREP_MAX_GAIN)
+	return to_pcm16(samples), target
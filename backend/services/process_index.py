@@ -0,0 +1,152 @@
+"""
+Background index of running processes by name, so closing an app is a dictionary lookup
+instead of a psutil.process_iter walk over every process on the request thread.
+
+A refresh diffs psutil.pids() against the known set and only asks the OS for the names of new
+PIDs, or of known PIDs whose create time changed (reused by another process); vanished PIDs are
+dropped. Each app's target names are compiled into one matcher, applied once per distinct process
+name. A daemon thread refreshes every PROCESS_INDEX_INTERVAL seconds, and a lookup that finds
+nothing refreshes once more, so an app opened a moment ago is found too.
+"""
+import re
+import threading
+import logging
+from typing import Dict, List, Optional, Pattern, Sequence, Set
+
+from backend.utils import lazy_import
+
+psutil = lazy_import("psutil")
+
+logger = logging.getLogger(__name__)
+
+
+def compile_matcher(targets: Sequence[str]) -> Optional[Pattern]:
+	"""Case-insensitive substring match against any of targets (one regex for the whole list)."""
+	if not targets:
+		return None
+	return re.compile("|".join(re.escape(t.lower()) for t in targets))
+
+
+class ProcessIndex:
+	def __init__(self, process_names: Dict[str, Sequence[str]]):
+		self._matchers = {app: m for app, m in ((app, compile_matcher(t)) for app, t in process_names.items()) if m}
+		self._procs: Dict[int, "psutil.Process"] = {}
+		self._pid_name: Dict[int, str] = {}
+		self._by_name: Dict[str, Set[int]] = {}
+		self._app_names: Dict[str, Set[str]] = {app: set() for app in self._matchers}
+		self._lock = threading.Lock()
+		self._refresh_lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	def _add(self, proc: "psutil.Process", name: str) -> None:
+		pids = self._by_name.get(name)
+		if pids is None:
+			pids = self._by_name[name] = set()
+			for app, matcher in self._matchers.items():
+				if matcher.search(name):
+					self._app_names[app].add(name)
+		pids.add(proc.pid)
+		self._procs[proc.pid] = proc
+		self._pid_name[proc.pid] = name
+
+	def _remove(self, pid: int) -> None:
+		self._procs.pop(pid, None)
+		name = self._pid_name.pop(pid, None)
+		pids = self._by_name.get(name)
+		if pids is None:
+			return
+		pids.discard(pid)
+		if not pids:
+			del self._by_name[name]
+			for names in self._app_names.values():
+				names.discard(name)
+
+	def refresh(self) -> None:
+		"""Bring the index up to date with the OS, fetching names for new or reused PIDs only."""
+		with self._refresh_lock:
+			current = set(psutil.pids())
+			with self._lock:
+				known = dict(self._procs)
+			# is_running() compares create times: a known PID that fails it was reused, so index it afresh.
+			reused = {pid for pid in current & known.keys() if not known[pid].is_running()}
+			added = []
+			for pid in (current - known.keys()) | reused:
+				try:
+					proc = psutil.Process(pid)
+					name = proc.name().lower()
+				except psutil.NoSuchProcess:
+					continue
+				except psutil.AccessDenied:
+					# Still indexed (nameless) so it is not queried again on every refresh.
+					name = ""
+				added.append((proc, name))
+			with self._lock:
+				for pid in (known.keys() - current) | reused:
+					self._remove(pid)
+				for proc, name in added:
+					self._add(proc, name)
+
+	def _lookup(self, app: str) -> List["psutil.Process"]:
+		with self._lock:
+			return [self._procs[pid] for name in self._app_names.get(app, ()) for pid in self._by_name[name]]
+
+	def processes_for(self, app: str) -> List["psutil.Process"]:
+		"""Running processes whose name matches app's PROCESS_NAMES entry."""
+		if app not in self._matchers:
+			return []
+		procs = self._lookup(app)
+		if not procs:
+			self.refresh()
+			procs = self._lookup(app)
+		alive = []
+		for proc in procs:
+			# is_running() also catches a PID reused by another process since it was indexed.
+			if proc.is_running():
+				alive.append(proc)
+			else:
+				with self._lock:
+					self._remove(proc.pid)
+		return alive
+
+	def start(self, interval: float) -> None:
+		"""Build and then refresh the index on a daemon thread; start-up does not wait for the first scan."""
+		if self._thread is not None:
+			return
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, args=(interval,), name="process-index", daemon=True)
+		self._thread.start()
+
+	def stop(self) -> None:
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def _run(self, interval: float) -> None:
+		while True:
+			try:
+				self.refresh()
+			except Exception:
+				logger.exception("Process index refresh failed")
+			if self._stop.wait(interval):
+				return
+
+
+def terminate_all(procs: Sequence["psutil.Process"], timeout: float) -> List["psutil.Process"]:
+	"""
+	Send every process SIGTERM (TerminateProcess on Windows) at once, then wait for all of them
+	together for up to timeout seconds. Returns the processes that were signalled.
+	"""
+	signalled = []
+	for proc in procs:
+		try:
+			proc.terminate()
+			signalled.append(proc)
+		except (psutil.NoSuchProcess, psutil.AccessDenied):
+			continue
+	if signalled and timeout > 0:
+		_, alive = psutil.wait_procs(signalled, timeout=timeout)
+		if alive:
+			logger.info("%d process(es) still running %.1fs after terminate", len(alive), timeout)
+	return signalled
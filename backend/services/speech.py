@@ -1,42 +1,181 @@
 import os
+import struct
 import contextlib
+import subprocess
+import threading
 import wave
-import speech_recognition as sr
-from typing import Optional
+from typing import BinaryIO, Optional, Tuple, Union
 
 from backend import config
+from backend.services.stt_engines import get_engine
+from backend.utils import lazy_import
 
-_recognizer = sr.Recognizer()
+# Imported on first use: text-only processes never load them (numpy comes with audio_prep).
+sr = lazy_import("speech_recognition")
+audio_prep = lazy_import("backend.services.audio_prep")
 
+NOT_WAV_ERROR = "Provided file is not a valid WAV file. Please upload 16-bit PCM WAV."
+NOT_AUDIO_ERROR = "Provided file is not valid WAV or FLAC audio. Please upload 16-bit PCM WAV or FLAC."
+TOO_LONG_ERROR = f"Audio must be at most {config.MAX_AUDIO_SECONDS:g} seconds long."
 
-def is_wav_file(file_path: str) -> bool:
+FLAC_MAGIC = b"fLaC"
+# Seconds the flac decoder may take for one upload.
+FLAC_DECODE_TIMEOUT = 30
+_READ_SIZE = 64 * 1024
+
+
+def is_wav_file(file_path: Union[str, BinaryIO]) -> bool:
 	try:
 		with contextlib.closing(wave.open(file_path, 'rb')) as wf:
 			# Just attempting to open verifies WAV format
 			return True
 	except wave.Error:
 		return False
-	except FileNotFoundError:
+	except (FileNotFoundError, EOFError):
 		return False
 
 
+def read_wav(stream: BinaryIO) -> "sr.AudioData":
+	"""
+	Validate a WAV header and decode its PCM frames in a single pass over an open stream
+	(upload buffer, spooled file, BytesIO). Multi-channel audio is averaged to 16-bit mono,
+	or conditioned by audio_prep when PREPROCESS_AUDIO is on.
+	Raises ValueError for anything that is not PCM WAV.
+	"""
+	try:
+		with contextlib.closing(wave.open(stream, 'rb')) as wf:
+			channels = wf.getnchannels()
+			width = wf.getsampwidth()
+			rate = wf.getframerate()
+			frames = wf.readframes(wf.getnframes())
+	except (wave.Error, EOFError) as exc:
+		raise ValueError(NOT_WAV_ERROR) from exc
+	return _audio_data(frames, rate, width, channels)
+
+
+def flac_stream_info(data: bytes) -> Tuple[int, int, int, int]:
+	"""
+	(sample rate, channels, sample width in bytes, total samples per channel) from the STREAMINFO
+	block; ValueError if not FLAC.
+	"""
+	# "fLaC", then the first metadata block, which must be STREAMINFO (type 0, 34 bytes).
+	if len(data) < 42 or data[:4] != FLAC_MAGIC or data[4] & 0x7F != 0:
+		raise ValueError(NOT_AUDIO_ERROR)
+	packed, = struct.unpack(">Q", data[18:26])
+	rate = packed >> 44
+	channels = (packed >> 41 & 0x7) + 1
+	bits = (packed >> 36 & 0x1F) + 1
+	total = packed & 0xFFFFFFFFF
+	if not rate or bits % 8:
+		raise ValueError(NOT_AUDIO_ERROR)
+	return rate, channels, bits // 8, total
+
+
+def _feed(pipe: BinaryIO, data: bytes) -> None:
+	try:
+		pipe.write(data)
+		pipe.close()
+	except OSError:
+		# The decoder exited (or was stopped) before reading everything.
+		pass
+
+
+def read_flac(data: bytes) -> "sr.AudioData":
+	"""
+	Decode a FLAC upload through pipes to the flac converter SpeechRecognition ships with (no
+	temporary files), then condition it like a WAV. The decoded size is bounded up front: a
+	stream whose STREAMINFO gives no length or more than MAX_AUDIO_SECONDS is rejected, and the
+	decoder is stopped if it produces more than STREAMINFO announced. Raises ValueError for
+	anything else.
+	"""
+	rate, channels, width, total = flac_stream_info(data)
+	if not total:
+		raise ValueError(NOT_AUDIO_ERROR)
+	if total > config.MAX_AUDIO_SECONDS * rate:
+		raise ValueError(TOO_LONG_ERROR)
+	limit = total * channels * width
+	cmd = [
+		sr.audio.get_flac_converter(), "--decode", "--stdout", "--totally-silent",
+		"--force-raw-format", "--endian=little", "--sign=signed", "-",
+	]
+	proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+	timed_out = threading.Event()
+
+	def stop() -> None:
+		timed_out.set()
+		proc.kill()
+	timer = threading.Timer(FLAC_DECODE_TIMEOUT, stop)
+	timer.start()
+	feeder = threading.Thread(target=_feed, args=(proc.stdin, data), name="flac-feed", daemon=True)
+	feeder.start()
+	out = bytearray()
+	try:
+		while len(out) <= limit:
+			chunk = proc.stdout.read(_READ_SIZE)
+			if not chunk:
+				break
+			out += chunk
+		if len(out) > limit:
+			proc.kill()
+		returncode = proc.wait()
+	finally:
+		timer.cancel()
+		proc.stdout.close()
+		feeder.join()
+	if timed_out.is_set() or len(out) > limit or returncode != 0 or not out:
+		raise ValueError(NOT_AUDIO_ERROR)
+	return _audio_data(bytes(out), rate, width, channels)
+
+
+def read_audio(stream: BinaryIO) -> "sr.AudioData":
+	"""read_wav or read_flac, chosen by the upload's leading bytes."""
+	head = stream.read(len(FLAC_MAGIC))
+	if head == FLAC_MAGIC:
+		return read_flac(head + stream.read())
+	stream.seek(-len(head), os.SEEK_CUR)
+	try:
+		return read_wav(stream)
+	except ValueError as exc:
+		raise ValueError(NOT_AUDIO_ERROR) from exc
+
+
+def _audio_data(frames: bytes, rate: int, width: int, channels: int) -> "sr.AudioData":
+	"""Mono AudioData: multi-channel audio averaged to 16-bit mono, or conditioned by audio_prep (PREPROCESS_AUDIO)."""
+	if config.PREPROCESS_AUDIO:
+		frames, rate = audio_prep.preprocess_pcm(frames, rate, width, channels)
+		return sr.AudioData(frames, rate, 2)
+	if channels != 1:
+		return sr.AudioData(audio_prep.mixdown_pcm(frames, width, channels), rate, 2)
+	return sr.AudioData(frames, rate, width)
+
+
+def pcm_audio(pcm: bytes, sample_rate: int) -> "sr.AudioData":
+	if config.PREPROCESS_AUDIO:
+		pcm, sample_rate = audio_prep.preprocess_pcm(pcm, sample_rate, 2, 1)
+	return sr.AudioData(pcm, sample_rate, 2)
+
+
+def transcribe_audio(audio: "sr.AudioData", language: Optional[str] = None) -> str:
+	"""Transcribe with the configured STT_ENGINE."""
+	return get_engine().transcribe(audio, language or config.STT_LANGUAGE)
+
+
+def transcribe_pcm(pcm: bytes, sample_rate: int, language: Optional[str] = None) -> str:
+	"""Transcribe raw little-endian 16-bit mono PCM (e.g. a VAD segment from a live stream)."""
+	return transcribe_audio(pcm_audio(pcm, sample_rate), language=language)
+
+
+def transcribe_wav_stream(stream: BinaryIO, language: Optional[str] = None) -> str:
+	"""Transcribe a WAV (or FLAC) upload straight from its in-memory (or spooled) stream."""
+	return transcribe_audio(read_audio(stream), language=language)
+
+
 def transcribe_wav(file_path: str, language: Optional[str] = None) -> str:
 	"""
-	Transcribe a WAV audio file using Google's free SpeechRecognition backend.
-	Requires internet access and accepts only PCM WAV/AIFF/FLAC supported by SpeechRecognition.
+	Transcribe a WAV audio file with the configured STT_ENGINE (Google's free endpoint by
+	default, which requires internet access). Accepts only PCM WAV.
 	"""
-	language = language or config.STT_LANGUAGE
 	if not os.path.exists(file_path):
 		raise FileNotFoundError(f"Audio file not found: {file_path}")
-	if not is_wav_file(file_path):
-		raise ValueError("Provided file is not a valid WAV file. Please upload 16-bit PCM WAV.")
-
-	with sr.AudioFile(file_path) as source:
-		audio = _recognizer.record(source)
-	try:
-		text = _recognizer.recognize_google(audio, language=language)
-		return text
-	except sr.UnknownValueError:
-		return ""
-	except sr.RequestError as exc:
-		raise RuntimeError(f"Speech recognition service error: {exc}") 
\ No newline at end of file
+	with open(file_path, 'rb') as f:
+		return transcribe_wav_stream(f, language=language) 
\ No newline at end of file
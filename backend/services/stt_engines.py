@@ -0,0 +1,143 @@
+"""
+Speech-to-text engines behind one interface; STT_ENGINE picks one per deployment.
+
+  google   SpeechRecognition's Google Web Speech endpoint (network, one request per clip)
+  whisper  OpenAI Whisper on this machine (pip install openai-whisper). Concurrent clips are
+           micro-batched: up to STT_BATCH_SIZE requests arriving within STT_BATCH_WAIT_MS are
+           padded to one mel batch and decoded in a single model call.
+
+New engines subclass STTEngine and are added with @register_engine.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Type
+
+from backend import config
+from backend.utils import MicroBatcher, lazy_import
+
+sr = lazy_import("speech_recognition")
+audio_prep = lazy_import("backend.services.audio_prep")
+if TYPE_CHECKING:
+	import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class STTEngine:
+	"""
+	transcribe(audio, language) blocks and returns the text ("" when nothing was recognized);
+	submit() returns a Future for it. Engines override at least one of the two.
+	"""
+
+	name = ""
+
+	def transcribe(self, audio: "sr.AudioData", language: str) -> str:
+		return self.submit(audio, language).result()
+
+	def submit(self, audio: "sr.AudioData", language: str) -> Future:
+		return _pool.submit(self.transcribe, audio, language)
+
+
+ENGINES: Dict[str, Type[STTEngine]] = {}
+_pool = ThreadPoolExecutor(max_workers=config.STT_WORKERS, thread_name_prefix="stt")
+_engine: Optional[STTEngine] = None
+_engine_lock = threading.Lock()
+
+
+def register_engine(cls: Type[STTEngine]) -> Type[STTEngine]:
+	ENGINES[cls.name] = cls
+	return cls
+
+
+def loaded_engine() -> Optional[STTEngine]:
+	"""The engine if get_engine() has created it already, else None; never blocks."""
+	return _engine
+
+
+def get_engine() -> STTEngine:
+	"""The configured engine, created (and its model loaded) once per process."""
+	global _engine
+	if _engine is None:
+		with _engine_lock:
+			if _engine is None:
+				name = config.STT_ENGINE.lower()
+				if name not in ENGINES:
+					raise ValueError(f"Unknown STT_ENGINE {config.STT_ENGINE!r}; choose one of {', '.join(sorted(ENGINES))}")
+				_engine = ENGINES[name]()
+				logger.info("STT engine: %s", name)
+	return _engine
+
+
+@register_engine
+class GoogleEngine(STTEngine):
+	name = "google"
+
+	def __init__(self):
+		self._recognizer = sr.Recognizer()
+
+	def transcribe(self, audio: "sr.AudioData", language: str) -> str:
+		try:
+			return self._recognizer.recognize_google(audio, language=language, endpoint=config.STT_ENDPOINT)
+		except sr.UnknownValueError:
+			return ""
+		except sr.RequestError as exc:
+			raise RuntimeError(f"Speech recognition service error: {exc}")
+
+
+def whisper_language(language: Optional[str]) -> Optional[str]:
+	"""BCP-47 tag (en-US) to a Whisper language code (en)."""
+	return language.split("-")[0].lower() if language else None
+
+
+@register_engine
+class WhisperEngine(STTEngine):
+	name = "whisper"
+	SAMPLE_RATE = 16000
+	# Same thresholds whisper.transcribe uses to call a window silent.
+	NO_SPEECH_PROB = 0.6
+	LOGPROB_FLOOR = -1.0
+
+	def __init__(self):
+		try:
+			import torch
+			import whisper
+		except ImportError as exc:
+			raise RuntimeError("STT_ENGINE=whisper needs the openai-whisper package (pip install openai-whisper)") from exc
+		self._torch = torch
+		self._whisper = whisper
+		self._model = whisper.load_model(config.WHISPER_MODEL, device=config.WHISPER_DEVICE or None)
+		self._fp16 = self._model.device.type != "cpu"
+		self._batcher = MicroBatcher(
+			self._transcribe_batch,
+			max_batch=config.STT_BATCH_SIZE,
+			max_wait=config.STT_BATCH_WAIT_MS / 1000,
+			workers=config.STT_WORKERS,
+			name="whisper",
+		)
+
+	def submit(self, audio: "sr.AudioData", language: str) -> Future:
+		samples = audio_prep.resample(audio_prep.pcm_to_float(audio.frame_data, audio.sample_width, 1), audio.sample_rate, self.SAMPLE_RATE)
+		return self._batcher.submit((samples, whisper_language(language)))
+
+	def _transcribe_batch(self, items: List[Tuple["np.ndarray", Optional[str]]]) -> List[str]:
+		whisper = self._whisper
+		texts = [""] * len(items)
+		by_language: Dict[Optional[str], List[int]] = {}
+		for i, (samples, language) in enumerate(items):
+			if samples.size > whisper.audio.N_SAMPLES:
+				# Longer than one 30 s window: let whisper.transcribe slide over it.
+				texts[i] = self._model.transcribe(samples, language=language, fp16=self._fp16)["text"].strip()
+			else:
+				by_language.setdefault(language, []).append(i)
+		for language, indices in by_language.items():
+			mel = self._torch.stack([
+				whisper.log_mel_spectrogram(whisper.pad_or_trim(items[i][0]), self._model.dims.n_mels, device=self._model.device)
+				for i in indices
+			])
+			options = whisper.DecodingOptions(language=language, fp16=self._fp16, without_timestamps=True)
+			for i, result in zip(indices, whisper.decode(self._model, mel, options)):
+				if result.no_speech_prob > self.NO_SPEECH_PROB and result.avg_logprob < self.LOGPROB_FLOOR:
+					continue
+				texts[i] = result.text.strip()
+		return texts
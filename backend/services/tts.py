@@ -1,23 +1,197 @@
 import base64
-from io import BytesIO
-from typing import Optional
-from gtts import gTTS
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
-from backend import config
+from backend import config, storage
+from backend.services.audio_cache import AudioCache, cache_key
+from backend.services.tts_engines import GTTSEngine, TTSEngine, engine_for
+
+logger = logging.getLogger(__name__)
+
+_cache = AudioCache(
+	memory_bytes=config.TTS_CACHE_MEMORY_BYTES,
+	disk_dir=config.TTS_CACHE_DIR,
+	disk_bytes=config.TTS_CACHE_DISK_BYTES,
+)
+
+
+def audio_key(text: str, language: str, engine: TTSEngine) -> str:
+	"""Cache key / audio id; gTTS keeps the plain (text, lang) key so existing caches stay valid."""
+	if isinstance(engine, GTTSEngine):
+		return cache_key(text, language)
+	return cache_key(text, f"{language}\0{engine.name}")
+
+
+def _stream_uncached(text: str, language: str, engine: Optional[TTSEngine] = None) -> Iterator[bytes]:
+	return (engine or engine_for(language)).stream(text, language)
 
 
 def synthesize_speech(text: str, lang: Optional[str] = None) -> bytes:
-	"""Generate MP3 audio bytes for the provided text using gTTS."""
+	"""Generate MP3 audio bytes for the provided text with the TTS engine, served from the audio cache when possible."""
+	if not text:
+		text = "I'm here."
+	language = lang or config.TTS_LANGUAGE
+	engine = engine_for(language)
+	key = audio_key(text, language, engine)
+	mp3 = _cache.get(key)
+	if mp3 is None:
+		mp3 = b"".join(_stream_uncached(text, language, engine))
+		_cache.put(key, mp3)
+	return mp3
+
+
+def warm_up(texts: Iterable[str], lang: Optional[str] = None) -> int:
+	"""Pre-synthesize fixed responses into the cache. Returns how many are now cached."""
+	language = lang or config.TTS_LANGUAGE
+	done = 0
+	for text in texts:
+		try:
+			synthesize_speech(text, lang=language)
+			done += 1
+		except Exception:
+			logger.warning("TTS warm-up failed for %r", text, exc_info=True)
+	return done
+
+
+def open_cache() -> None:
+	"""Index the on-disk audio cache now instead of on the first synthesis."""
+	_cache.open()
+
+
+def cache_stats() -> Dict[str, int]:
+	return _cache.stats()
+
+
+class _Synthesis:
+	"""An in-flight background synthesis whose MP3 parts can be read while it is still running."""
+
+	def __init__(self):
+		self.chunks = []
+		self.done = False
+		self.error: Optional[BaseException] = None
+		self._cond = threading.Condition()
+
+	def append(self, chunk: bytes) -> None:
+		with self._cond:
+			self.chunks.append(chunk)
+			self._cond.notify_all()
+
+	def finish(self, error: Optional[BaseException] = None) -> None:
+		with self._cond:
+			self.done = True
+			self.error = error
+			self._cond.notify_all()
+
+	def iter_chunks(self) -> Iterator[bytes]:
+		i = 0
+		while True:
+			with self._cond:
+				while i >= len(self.chunks) and not self.done:
+					self._cond.wait()
+				if i >= len(self.chunks):
+					if self.error is not None:
+						raise RuntimeError(f"Speech synthesis failed: {self.error}")
+					return
+				chunk = self.chunks[i]
+			i += 1
+			yield chunk
+
+	def result(self) -> bytes:
+		return b"".join(self.iter_chunks())
+
+
+_pool = ThreadPoolExecutor(max_workers=config.TTS_STREAM_WORKERS, thread_name_prefix="tts")
+_inflight: Dict[str, _Synthesis] = {}
+# audio id -> (text, lang) for recently issued ids, so an id evicted from the cache can be re-synthesized.
+_issued: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_ISSUED_MAX = 4096
+
+
+def _run_synthesis(key: str, text: str, language: str, job: _Synthesis) -> None:
+	try:
+		for chunk in _stream_uncached(text, language):
+			job.append(chunk)
+	except Exception as exc:
+		logger.exception("Background TTS failed for audio id %s", key)
+		job.finish(exc)
+	else:
+		_cache.put(key, b"".join(job.chunks))
+		job.finish()
+	finally:
+		with _jobs_lock:
+			_inflight.pop(key, None)
+
+
+def audio_id(text: str, lang: Optional[str] = None) -> str:
+	"""The id start_synthesis would return for (text, lang), without synthesizing or recording it."""
+	language = lang or config.TTS_LANGUAGE
+	return audio_key(text or "I'm here.", language, engine_for(language))
+
+
+def start_synthesis(text: str, lang: Optional[str] = None) -> str:
+	"""
+	Return an audio id for (text, lang) immediately, synthesizing in the background if it is
+	not cached yet. The id is the cache key, so it doubles as a strong ETag.
+	"""
 	if not text:
 		text = "I'm here."
 	language = lang or config.TTS_LANGUAGE
-	tts = gTTS(text=text, lang=language)
-	buf = BytesIO()
-	tts.write_to_fp(buf)
-	return buf.getvalue()
+	key = audio_key(text, language, engine_for(language))
+	with _jobs_lock:
+		new = key not in _issued
+		_issued[key] = (text, language)
+		_issued.move_to_end(key)
+		while len(_issued) > _ISSUED_MAX:
+			_issued.popitem(last=False)
+	if new and storage.shared_state():
+		try:
+			storage.save_audio_id(key, text, language)
+		except Exception:
+			logger.warning("Could not share audio id %s", key, exc_info=True)
+	with _jobs_lock:
+		if key in _inflight:
+			return key
+	if _cache.get(key) is not None:
+		return key
+	with _jobs_lock:
+		if key in _inflight:
+			return key
+		job = _inflight[key] = _Synthesis()
+	_pool.submit(_run_synthesis, key, text, language, job)
+	return key
+
+
+def stream_audio(audio_id: str) -> Optional[Iterator[bytes]]:
+	"""Return an iterator over the MP3 parts of an in-flight synthesis, or None if it is not running."""
+	with _jobs_lock:
+		job = _inflight.get(audio_id)
+	return job.iter_chunks() if job is not None else None
+
+
+def get_audio(audio_id: str) -> Optional[bytes]:
+	"""
+	Return the full MP3 for an audio id, waiting for an in-flight synthesis. An id issued by
+	another server process is found in the shared disk cache, or synthesized here from its
+	shared record (SHARED_STATE). None if unknown.
+	"""
+	with _jobs_lock:
+		job = _inflight.get(audio_id)
+		issued = _issued.get(audio_id)
+	if job is not None:
+		return job.result()
+	mp3 = _cache.get(audio_id)
+	if mp3 is None and issued is None and storage.shared_state():
+		issued = storage.load_audio_id(audio_id)
+	if mp3 is None and issued is not None:
+		mp3 = synthesize_speech(*issued)
+	return mp3
 
 
 def to_base64_audio_mp3(mp3_bytes: bytes) -> str:
 	"""Return a data URL (base64) for MP3 bytes suitable for HTML audio src."""
 	b64 = base64.b64encode(mp3_bytes).decode('ascii')
-	return f"data:audio/mp3;base64,{b64}" 
\ No newline at end of file
+	return f"data:audio/mp3;base64,{b64}"
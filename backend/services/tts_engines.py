@@ -0,0 +1,288 @@
+"""
+Text-to-speech engines behind one interface; TTS_ENGINE picks one per deployment. Every engine
+returns MP3 bytes, so the audio cache, /api/audio and to_base64_audio_mp3 are unchanged.
+
+  gtts   Google Translate TTS over the network (parts fetched concurrently)
+  piper  Piper neural voices on this machine (pip install piper-tts lameenc). Synthesis runs in
+         a pool of TTS_PROCESSES worker processes that each load the voices in PIPER_VOICES
+         once at start-up; the pool is warmed when the engine is created. Languages without a
+         configured voice fall back to gtts.
+
+New engines subclass TTSEngine and are added with @register_engine.
+"""
+import io
+import wave
+import logging
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Type
+from urllib.parse import urlsplit, urlunsplit
+
+from backend import config
+from backend.utils import lazy_import
+
+# gtts (with requests) and the process pool machinery are only imported by the engines using them.
+multiprocessing = lazy_import("multiprocessing")
+futures_process = lazy_import("concurrent.futures.process")
+if TYPE_CHECKING:
+	from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TTSEngine:
+	"""
+	stream(text, lang) yields MP3 chunks in playback order; submit() returns a Future of the
+	whole MP3. Engines override at least one of the two.
+	"""
+
+	name = ""
+
+	def supports(self, language: str) -> bool:
+		return True
+
+	def stream(self, text: str, language: str) -> Iterator[bytes]:
+		yield self.submit(text, language).result()
+
+	def submit(self, text: str, language: str) -> Future:
+		return _pool.submit(lambda: b"".join(self.stream(text, language)))
+
+
+ENGINES: Dict[str, Type[TTSEngine]] = {}
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tts-engine")
+_engines: Dict[str, TTSEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def register_engine(cls: Type[TTSEngine]) -> Type[TTSEngine]:
+	ENGINES[cls.name] = cls
+	return cls
+
+
+def _instance(name: str) -> TTSEngine:
+	engine = _engines.get(name)
+	if engine is None:
+		with _engines_lock:
+			engine = _engines.get(name)
+			if engine is None:
+				if name not in ENGINES:
+					raise ValueError(f"Unknown TTS_ENGINE {name!r}; choose one of {', '.join(sorted(ENGINES))}")
+				engine = _engines[name] = ENGINES[name]()
+				logger.info("TTS engine: %s", name)
+	return engine
+
+
+def get_engine() -> TTSEngine:
+	"""The configured engine, created once per process."""
+	return _instance(config.TTS_ENGINE.lower())
+
+
+def engine_for(language: str) -> TTSEngine:
+	"""The configured engine if it can speak language, else gtts."""
+	engine = get_engine()
+	return engine if engine.supports(language) else _instance(GTTSEngine.name)
+
+
+def retarget_url(url: str, endpoint: str) -> str:
+	"""Swap the scheme and host of a gTTS request URL for those of endpoint, keeping path and query."""
+	target = urlsplit(endpoint)
+	parts = urlsplit(url)
+	return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+
+
+@functools.lru_cache(maxsize=None)
+def _gtts_class() -> type:
+	from gtts import gTTS
+
+	class RetargetedGTTS(gTTS):
+		"""gTTS whose requests go to config.TTS_ENDPOINT when it is set (e.g. a local stub)."""
+
+		def _prepare_requests(self):
+			prepared = super()._prepare_requests()
+			if config.TTS_ENDPOINT:
+				for pr in prepared:
+					pr.url = retarget_url(pr.url, config.TTS_ENDPOINT)
+			return prepared
+
+	return RetargetedGTTS
+
+
+def _gtts(**kwargs: Any) -> Any:
+	"""A gTTS request object (gtts is imported on the first call)."""
+	return _gtts_class()(**kwargs)
+
+
+# gTTS splits long text into ~100-character parts and fetches them one after another;
+# with more than one worker the parts are fetched concurrently and stitched back in order.
+_part_pool = ThreadPoolExecutor(max_workers=max(config.TTS_PARALLEL_WORKERS, 1), thread_name_prefix="tts-part")
+
+
+# The two helpers below use gTTS internals (_tokenize, _prepare_requests), which is why
+# requirements.txt pins gTTS exactly; tests/test_tts_engines.py checks them against the
+# installed version.
+def _split_parts(text: str, language: str) -> List[str]:
+	return _gtts(text=text, lang=language)._tokenize(text)
+
+
+def prepare_requests(text: str, language: str) -> List[Any]:
+	"""One prepared requests.Request per part of text, already retargeted to TTS_ENDPOINT."""
+	return _gtts(text=text, lang=language)._prepare_requests()
+
+
+def _synthesize_part(part: str, language: str) -> bytes:
+	# The part is already pre-processed and short enough to be a single request.
+	tts = _gtts(text=part, lang=language, lang_check=False, pre_processor_funcs=[])
+	return b"".join(tts.stream())
+
+
+@register_engine
+class GTTSEngine(TTSEngine):
+	name = "gtts"
+
+	def stream(self, text: str, language: str) -> Iterator[bytes]:
+		"""Yield MP3 bytes part by part, in order, as gTTS fetches them."""
+		parts = _split_parts(text, language) if config.TTS_PARALLEL_WORKERS > 1 else []
+		if len(parts) <= 1:
+			yield from _gtts(text=text, lang=language).stream()
+			return
+		futures = [_part_pool.submit(_synthesize_part, part, language) for part in parts]
+		try:
+			for fut in futures:
+				yield fut.result()
+		finally:
+			for fut in futures:
+				fut.cancel()
+
+
+def encode_mp3(pcm: bytes, sample_rate: int, channels: int = 1) -> bytes:
+	"""16-bit PCM to MP3 with LAME at TTS_MP3_BITRATE kbit/s."""
+	import lameenc
+
+	encoder = lameenc.Encoder()
+	encoder.set_bit_rate(config.TTS_MP3_BITRATE)
+	encoder.set_in_sample_rate(sample_rate)
+	encoder.set_channels(channels)
+	encoder.set_quality(2)
+	return bytes(encoder.encode(pcm) + encoder.flush())
+
+
+def parse_voices(spec: str) -> Dict[str, str]:
+	"""'en=/voices/en_US.onnx,es=/voices/es_ES.onnx' -> {'en': ..., 'es': ...}"""
+	voices = {}
+	for item in filter(None, (s.strip() for s in spec.split(","))):
+		lang, _, path = item.partition("=")
+		if path:
+			voices[lang.strip().lower()] = path.strip()
+	return voices
+
+
+# Per worker process: language -> loaded PiperVoice.
+_worker_voices: Dict[str, Any] = {}
+
+
+def _piper_init(voices: Dict[str, str]) -> None:
+	from piper.voice import PiperVoice
+
+	for lang, path in voices.items():
+		_worker_voices[lang] = PiperVoice.load(path)
+
+
+def _piper_synthesize(text: str, voice_lang: str) -> bytes:
+	voice = _worker_voices[voice_lang]
+	buf = io.BytesIO()
+	with wave.open(buf, "wb") as wf:
+		voice.synthesize_wav(text, wf)
+	buf.seek(0)
+	with wave.open(buf, "rb") as wf:
+		return encode_mp3(wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels())
+
+
+@register_engine
+class PiperEngine(TTSEngine):
+	name = "piper"
+	WARM_TEXT = "Ready."
+
+	def __init__(self):
+		try:
+			import lameenc  # noqa: F401
+			import piper  # noqa: F401
+		except ImportError as exc:
+			raise RuntimeError("TTS_ENGINE=piper needs the piper-tts and lameenc packages (pip install piper-tts lameenc)") from exc
+		self.voices = parse_voices(config.PIPER_VOICES)
+		if not self.voices:
+			raise RuntimeError("TTS_ENGINE=piper needs PIPER_VOICES, e.g. en=/path/to/en_US-lessac-medium.onnx")
+		self._lock = threading.Lock()
+		self._pool = self._start_pool()
+
+	def _start_pool(self) -> "ProcessPoolExecutor":
+		# Spawned (not forked) workers: the server process already runs threads.
+		pool = futures_process.ProcessPoolExecutor(
+			max_workers=config.TTS_PROCESSES,
+			mp_context=multiprocessing.get_context("spawn"),
+			initializer=_piper_init,
+			initargs=(self.voices,),
+		)
+		self._warm(pool)
+		return pool
+
+	def _warm(self, pool: "ProcessPoolExecutor") -> None:
+		"""Start every worker and run one synthesis in each, so no request pays for model loading."""
+		lang = next(iter(self.voices))
+		wait([pool.submit(_piper_synthesize, self.WARM_TEXT, lang) for _ in range(config.TTS_PROCESSES)])
+
+	def _voice_lang(self, language: str) -> Optional[str]:
+		language = (language or "").lower()
+		if language in self.voices:
+			return language
+		primary = language.split("-")[0]
+		return primary if primary in self.voices else None
+
+	def supports(self, language: str) -> bool:
+		return self._voice_lang(language) is not None
+
+	def submit(self, text: str, language: str) -> Future:
+		"""
+		A worker dying (e.g. killed for memory) breaks the whole pool, whether it is noticed when
+		submitting or by a synthesis already in flight; either way the pool is replaced once and
+		the synthesis resubmitted once.
+		"""
+		result: Future = Future()
+		self._attempt(result, text, self._voice_lang(language), retry=True)
+		return result
+
+	def _attempt(self, result: Future, text: str, voice_lang: Optional[str], retry: bool) -> None:
+		pool = self._pool
+		try:
+			inner = pool.submit(_piper_synthesize, text, voice_lang)
+		except futures_process.BrokenProcessPool as exc:
+			self._retry_or_fail(result, pool, exc, text, voice_lang, retry)
+			return
+		except Exception as exc:
+			result.set_exception(exc)
+			return
+
+		def done(f: Future) -> None:
+			exc = f.exception()
+			if exc is None:
+				result.set_result(f.result())
+			elif isinstance(exc, futures_process.BrokenProcessPool):
+				# Called on the broken pool's management thread: restart elsewhere.
+				_pool.submit(self._retry_or_fail, result, pool, exc, text, voice_lang, retry)
+			else:
+				result.set_exception(exc)
+		inner.add_done_callback(done)
+
+	def _retry_or_fail(self, result: Future, pool: "ProcessPoolExecutor", exc: BaseException, text: str, voice_lang: Optional[str], retry: bool) -> None:
+		if not retry:
+			result.set_exception(exc)
+			return
+		try:
+			with self._lock:
+				if self._pool is pool:
+					logger.warning("Piper worker pool broke; restarting it")
+					self._pool = self._start_pool()
+		except Exception as restart_exc:
+			result.set_exception(restart_exc)
+			return
+		self._attempt(result, text, voice_lang, retry=False)
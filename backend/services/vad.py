@@ -0,0 +1,123 @@
+"""
+Energy-based voice activity detection over streamed 16-bit PCM.
+
+Incoming bytes are viewed (not copied) as int16 frames of VAD_FRAME_MS; per-frame RMS energy
+is computed for a whole chunk at once with NumPy, and a small state machine over the voiced
+flags cuts the stream into utterances: speech starts after VAD_MIN_SPEECH_MS of voiced frames
+(plus VAD_PREROLL_MS of lead-in) and ends after VAD_SILENCE_MS of silence.
+"""
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+
+from backend import config
+
+FULL_SCALE = 32768.0
+
+
+def frame_energy(frames: np.ndarray, full_scale: float = FULL_SCALE) -> np.ndarray:
+	"""RMS energy of each row of an (n, frame) sample array, as a fraction of full scale."""
+	squares = np.square(frames, dtype=np.float32)
+	return np.sqrt(squares.mean(axis=1)) / full_scale
+
+
+class SpeechSegmenter:
+	"""
+	feed(pcm_bytes) returns the utterances closed by that chunk (little-endian int16 mono
+	bytes); flush() returns whatever speech is still open when the stream ends.
+	"""
+
+	def __init__(
+		self,
+		sample_rate: int = 16000,
+		frame_ms: int = 30,
+		threshold: float = 0.02,
+		silence_ms: int = 500,
+		min_speech_ms: int = 150,
+		preroll_ms: int = 200,
+		max_segment_seconds: float = 15.0,
+	):
+		self.sample_rate = sample_rate
+		self.frame = max(1, sample_rate * frame_ms // 1000)
+		self.threshold = threshold
+		self.silence_frames = max(1, silence_ms // frame_ms)
+		self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+		self.max_frames = max(1, int(max_segment_seconds * 1000) // frame_ms)
+		self._preroll: "deque[np.ndarray]" = deque(maxlen=preroll_ms // frame_ms + self.min_speech_frames)
+		self._pending = np.empty(0, dtype="<i2")
+		self._odd_byte = b""
+		self._segment: List[np.ndarray] = []
+		self._in_speech = False
+		self._voiced_run = 0
+		self._silent_run = 0
+
+	@classmethod
+	def from_config(cls) -> "SpeechSegmenter":
+		return cls(
+			sample_rate=config.STREAM_SAMPLE_RATE,
+			frame_ms=config.VAD_FRAME_MS,
+			threshold=config.VAD_ENERGY_THRESHOLD,
+			silence_ms=config.VAD_SILENCE_MS,
+			min_speech_ms=config.VAD_MIN_SPEECH_MS,
+			preroll_ms=config.VAD_PREROLL_MS,
+			max_segment_seconds=config.VAD_MAX_SEGMENT_SECONDS,
+		)
+
+	@property
+	def in_speech(self) -> bool:
+		return self._in_speech
+
+	def feed(self, data: bytes) -> List[bytes]:
+		if self._odd_byte:
+			data = self._odd_byte + data
+		self._odd_byte = data[len(data) - len(data) % 2:]
+		pcm = np.frombuffer(data, dtype="<i2", count=len(data) // 2)
+		if self._pending.size:
+			pcm = np.concatenate((self._pending, pcm))
+		n = pcm.size // self.frame
+		self._pending = pcm[n * self.frame:].copy()
+		if not n:
+			return []
+		frames = pcm[:n * self.frame].reshape(n, self.frame)
+		voiced = frame_energy(frames) > self.threshold
+		closed = []
+		for frame, is_voiced in zip(frames, voiced.tolist()):
+			segment = self._step(frame, is_voiced)
+			if segment is not None:
+				closed.append(segment)
+		return closed
+
+	def _step(self, frame: np.ndarray, is_voiced: bool) -> Optional[bytes]:
+		if not self._in_speech:
+			self._preroll.append(frame)
+			self._voiced_run = self._voiced_run + 1 if is_voiced else 0
+			if self._voiced_run >= self.min_speech_frames:
+				self._in_speech = True
+				self._segment = list(self._preroll)
+				self._preroll.clear()
+				self._silent_run = 0
+			return None
+		self._segment.append(frame)
+		self._silent_run = 0 if is_voiced else self._silent_run + 1
+		if self._silent_run >= self.silence_frames or len(self._segment) >= self.max_frames:
+			return self._close()
+		return None
+
+	def _close(self) -> bytes:
+		segment = np.concatenate(self._segment).tobytes()
+		self._segment = []
+		self._in_speech = False
+		self._voiced_run = 0
+		self._silent_run = 0
+		return segment
+
+	def flush(self) -> Optional[bytes]:
+		"""End of stream: return the open utterance (if speech had started), else None."""
+		if not self._in_speech:
+			self._preroll.clear()
+			return None
+		if self._pending.size:
+			self._segment.append(self._pending)
+			self._pending = np.empty(0, dtype="<i2")
+		return self._close()
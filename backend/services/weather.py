@@ -1,38 +1,206 @@
-import requests
-from typing import Optional, Tuple
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
 
-GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
-WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+from backend import config
+from backend.utils import SingleFlight, once
 
+logger = logging.getLogger(__name__)
 
-def geocode_city(city: str) -> Optional[Tuple[float, float, str]]:
-	params = {"name": city, "count": 1}
-	resp = requests.get(GEOCODE_URL, params=params, timeout=10)
-	resp.raise_for_status()
-	data = resp.json()
+GEOCODE_URL = config.WEATHER_GEOCODE_URL
+WEATHER_URL = config.WEATHER_FORECAST_URL
+
+FRESH, STALE, MISS = "fresh", "stale", "miss"
+
+
+@once
+def _http():
+	"""
+	Keep-alive pool shared by all requests, so repeat queries skip the TCP/TLS handshake.
+	Created (and requests imported) by the first lookup that misses the caches.
+	"""
+	import requests
+	from requests.adapters import HTTPAdapter
+
+	session = requests.Session()
+	adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config.WEATHER_POOL_SIZE)
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+	return session
+
+
+def open_session() -> None:
+	"""Create the keep-alive pool now instead of on the first lookup that misses the caches."""
+	_http()
+
+
+class WeatherCache:
+	"""
+	Geocode results (persisted to a JSON file, never expire) and current-weather responses
+	keyed by rounded coordinates (fresh for ttl seconds, then served stale for up to stale
+	more seconds while a refresh runs). Forecasts are an LRU of at most max_forecasts entries;
+	expired ones are dropped when read and when new ones are stored.
+	"""
+
+	def __init__(self, geocode_path: Optional[str], ttl: float, stale: float, decimals: int, max_forecasts: int = 1024):
+		self.geocode_path = geocode_path
+		self.ttl = ttl
+		self.stale = stale
+		self.decimals = decimals
+		self.max_forecasts = max_forecasts
+		self._lock = threading.Lock()
+		self._geocode: Dict[str, Tuple[float, float, str]] = {}
+		self._forecast: "OrderedDict[Tuple[float, float], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+		if geocode_path and os.path.exists(geocode_path):
+			try:
+				with open(geocode_path, "r", encoding="utf-8") as f:
+					self._geocode = {k: tuple(v) for k, v in json.load(f).items()}
+			except (OSError, ValueError):
+				logger.warning("Ignoring unreadable geocode cache %s", geocode_path)
+
+	@staticmethod
+	def city_key(city: str) -> str:
+		return " ".join(city.lower().split())
+
+	def coord_key(self, lat: float, lon: float) -> Tuple[float, float]:
+		return (round(lat, self.decimals), round(lon, self.decimals))
+
+	def get_geocode(self, key: str) -> Optional[Tuple[float, float, str]]:
+		with self._lock:
+			return self._geocode.get(key)
+
+	def put_geocode(self, key: str, geo: Tuple[float, float, str]) -> None:
+		with self._lock:
+			self._geocode[key] = geo
+			snapshot = dict(self._geocode)
+		if not self.geocode_path:
+			return
+		tmp_path = f"{self.geocode_path}.{threading.get_ident()}.tmp"
+		try:
+			os.makedirs(os.path.dirname(self.geocode_path) or ".", exist_ok=True)
+			with open(tmp_path, "w", encoding="utf-8") as f:
+				json.dump(snapshot, f)
+			os.replace(tmp_path, self.geocode_path)
+		except OSError:
+			logger.warning("Could not persist geocode cache to %s", self.geocode_path, exc_info=True)
+
+	def get_forecast(self, key: Tuple[float, float]) -> Tuple[Optional[Dict[str, Any]], str]:
+		with self._lock:
+			entry = self._forecast.get(key)
+			if entry is None:
+				return None, MISS
+			age = time.monotonic() - entry[0]
+			if age >= self.ttl + self.stale:
+				del self._forecast[key]
+				return None, MISS
+			self._forecast.move_to_end(key)
+		return entry[1], FRESH if age < self.ttl else STALE
+
+	def put_forecast(self, key: Tuple[float, float], data: Dict[str, Any]) -> None:
+		now = time.monotonic()
+		with self._lock:
+			self._forecast[key] = (now, data)
+			self._forecast.move_to_end(key)
+			expired = [k for k, (stored, _) in self._forecast.items() if now - stored >= self.ttl + self.stale]
+			for k in expired:
+				del self._forecast[k]
+			while len(self._forecast) > self.max_forecasts:
+				self._forecast.popitem(last=False)
+
+
+cache = WeatherCache(
+	geocode_path=config.WEATHER_GEOCODE_CACHE_PATH,
+	ttl=config.WEATHER_FORECAST_TTL,
+	stale=config.WEATHER_FORECAST_STALE,
+	decimals=config.WEATHER_COORD_DECIMALS,
+	max_forecasts=config.WEATHER_FORECAST_MAX_ENTRIES,
+)
+_geocode_flight = SingleFlight()
+_forecast_flight = SingleFlight()
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="weather-refresh")
+
+
+def _geocode_params(city: str) -> Dict[str, Any]:
+	return {"name": city, "count": 1}
+
+
+def _parse_geocode(city: str, data: Dict[str, Any]) -> Optional[Tuple[float, float, str]]:
 	if not data.get("results"):
 		return None
 	res = data["results"][0]
 	return (res["latitude"], res["longitude"], res.get("name", city))
 
 
-def get_current_weather_summary(city: str) -> str:
-	geo = geocode_city(city)
-	if not geo:
-		return f"I couldn't find weather for {city}."
-	lat, lon, canonical = geo
-	params = {
+def _forecast_params(lat: float, lon: float) -> Dict[str, Any]:
+	return {
 		"latitude": lat,
 		"longitude": lon,
 		"current": ["temperature_2m", "relative_humidity_2m", "apparent_temperature"],
 	}
-	resp = requests.get(WEATHER_URL, params=params, timeout=10)
-	resp.raise_for_status()
-	data = resp.json()
+
+
+def _format_summary(canonical: str, data: Dict[str, Any]) -> str:
 	current = data.get("current") or {}
 	temp = current.get("temperature_2m")
 	hum = current.get("relative_humidity_2m")
 	apparent = current.get("apparent_temperature")
 	if temp is None:
 		return f"Weather data for {canonical} is currently unavailable."
-	return f"In {canonical}, it's {temp}°C (feels like {apparent}°C) with humidity {hum}%." 
\ No newline at end of file
+	return f"In {canonical}, it's {temp}°C (feels like {apparent}°C) with humidity {hum}%."
+
+
+def _fetch_geocode(city: str, key: str) -> Optional[Tuple[float, float, str]]:
+	resp = _http().get(GEOCODE_URL, params=_geocode_params(city), timeout=10)
+	resp.raise_for_status()
+	geo = _parse_geocode(city, resp.json())
+	if geo:
+		cache.put_geocode(key, geo)
+	return geo
+
+
+def _fetch_forecast(key: Tuple[float, float]) -> Dict[str, Any]:
+	resp = _http().get(WEATHER_URL, params=_forecast_params(*key), timeout=10)
+	resp.raise_for_status()
+	data = resp.json()
+	cache.put_forecast(key, data)
+	return data
+
+
+def _refresh_forecast(key: Tuple[float, float]) -> None:
+	try:
+		_forecast_flight.do(key, lambda: _fetch_forecast(key))
+	except Exception:
+		logger.warning("Background weather refresh failed for %s", key, exc_info=True)
+
+
+def geocode_city(city: str) -> Optional[Tuple[float, float, str]]:
+	key = cache.city_key(city)
+	geo = cache.get_geocode(key)
+	if geo is not None:
+		return geo
+	return _geocode_flight.do(key, lambda: _fetch_geocode(city, key))
+
+
+def get_forecast(lat: float, lon: float) -> Dict[str, Any]:
+	key = cache.coord_key(lat, lon)
+	data, state = cache.get_forecast(key)
+	if state == FRESH:
+		return data
+	if state == STALE:
+		if not _forecast_flight.in_flight(key):
+			_refresh_pool.submit(_refresh_forecast, key)
+		return data
+	return _forecast_flight.do(key, lambda: _fetch_forecast(key))
+
+
+def get_current_weather_summary(city: str) -> str:
+	geo = geocode_city(city)
+	if not geo:
+		return f"I couldn't find weather for {city}."
+	lat, lon, canonical = geo
+	return _format_summary(canonical, get_forecast(lat, lon))
@@ -0,0 +1,140 @@
+"""
+In-memory frontend assets: read once, served without touching the filesystem.
+
+The manifest is built from FRONTEND_DIR at start-up (init_app). Every file gets a content hash
+as its ETag, so revalidations are answered 304; text assets also get gzip and, when the brotli
+package is installed, brotli variants, chosen by Accept-Encoding. index.html is rewritten to
+load the other assets as "<name>?v=<hash>": a request carrying the current hash is cached by
+the browser for a year as immutable, anything else (index.html itself, a stale or missing
+hash) is revalidated with If-None-Match on every use. Unknown paths get index.html, as the UI
+is a single page. STATIC_RELOAD rebuilds the manifest when a file changes, for frontend work.
+"""
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend import config
+from backend.utils import once
+
+INDEX = "index.html"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Smaller than this, compression does not pay for its headers.
+MIN_COMPRESS_BYTES = 256
+
+_REF_RE = re.compile(r'(src|href)="([^":?#]+)"')
+
+
+class Asset:
+	def __init__(self, path: str, body: bytes, mimetype: str):
+		self.path = path
+		self.mimetype = mimetype
+		self.hash = hashlib.sha256(body).hexdigest()[:16]
+		# encoding ("identity", "br", "gzip") -> (body, etag)
+		self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (body, f'"{self.hash}"')}
+		if len(body) >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE):
+			for encoding, data in _compress(body):
+				if len(data) < len(body):
+					self.variants[encoding] = (data, f'"{self.hash}-{encoding}"')
+
+	def pick(self, accepted) -> Tuple[str, bytes, str]:
+		"""(encoding, body, etag) of the preferred variant the client accepts (a werkzeug Accept)."""
+		for encoding in ("br", "gzip"):
+			if encoding in self.variants and accepted.quality(encoding) > 0:
+				return (encoding, *self.variants[encoding])
+		return ("identity", *self.variants["identity"])
+
+
+def _compress(body: bytes) -> List[Tuple[str, bytes]]:
+	variants = [("gzip", gzip.compress(body, compresslevel=9, mtime=0))]
+	try:
+		import brotli
+	except ImportError:
+		return variants
+	variants.append(("br", brotli.compress(body, quality=11)))
+	return variants
+
+
+class StaticManifest:
+	def __init__(self, root: str):
+		self.root = root
+		self._lock = threading.Lock()
+		self._assets: Dict[str, Asset] = {}
+		self._mtimes: Dict[str, float] = {}
+		self.build()
+
+	def build(self) -> None:
+		assets, mtimes = {}, {}
+		for path, full in self._files():
+			with open(full, "rb") as f:
+				body = f.read()
+			mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+			assets[path] = Asset(path, body, mimetype)
+			mtimes[path] = os.path.getmtime(full)
+		index = assets.get(INDEX)
+		if index is not None:
+			text = index.variants["identity"][0].decode("utf-8")
+			assets[INDEX] = Asset(INDEX, _versioned(text, assets).encode("utf-8"), index.mimetype)
+		with self._lock:
+			self._assets, self._mtimes = assets, mtimes
+
+	def _files(self) -> Iterator[Tuple[str, str]]:
+		for dirpath, _, filenames in os.walk(self.root):
+			for name in filenames:
+				full = os.path.join(dirpath, name)
+				yield os.path.relpath(full, self.root).replace(os.sep, "/"), full
+
+	def _changed(self) -> bool:
+		current = {path: os.path.getmtime(full) for path, full in self._files()}
+		return current != self._mtimes
+
+	def get(self, path: str) -> Optional[Asset]:
+		if config.STATIC_RELOAD and self._changed():
+			self.build()
+		return self._assets.get(path)
+
+	def __len__(self) -> int:
+		return len(self._assets)
+
+
+def _versioned(html: str, assets: Dict[str, Asset]) -> str:
+	"""Point index.html's src/href references to known assets at their content-hashed URL."""
+	def repl(m: "re.Match") -> str:
+		asset = assets.get(m.group(2).lstrip("/"))
+		return f'{m.group(1)}="{m.group(2)}?v={asset.hash}"' if asset is not None else m.group(0)
+	return _REF_RE.sub(repl, html)
+
+
+@once
+def manifest() -> StaticManifest:
+	"""The frontend manifest, built on first use (init_app builds it at start-up)."""
+	return StaticManifest(config.FRONTEND_DIR)
+
+
+def respond(path: str, version: Optional[str], accepted, if_none_match) -> Tuple[int, bytes, Dict[str, str]]:
+	"""
+	(status, body, headers) for GET <path>: the asset, index.html for unknown paths, or 304 when
+	if_none_match holds the variant's ETag. accepted and if_none_match are the request's werkzeug
+	Accept-Encoding and If-None-Match values; version is its ?v= query value.
+	"""
+	assets = manifest()
+	asset = assets.get(path) or assets.get(INDEX)
+	if asset is None:
+		return 404, b"", {}
+	encoding, body, etag = asset.pick(accepted)
+	headers = {
+		"ETag": etag,
+		"Cache-Control": IMMUTABLE if version and version == asset.hash and asset.path != INDEX else REVALIDATE,
+		"Vary": "Accept-Encoding",
+	}
+	if if_none_match.contains_weak(etag.strip('"')):
+		return 304, b"", headers
+	headers["Content-Type"] = asset.mimetype + ("; charset=utf-8" if asset.mimetype.startswith("text/") else "")
+	if encoding != "identity":
+		headers["Content-Encoding"] = encoding
+	return 200, body, headers
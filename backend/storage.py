@@ -1,23 +1,178 @@
 import os
 import json
+import time
+import queue
+import bisect
+import logging
 import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Iterator, Optional, Tuple
 
 from backend import config
-from backend.utils import sanitize_filename
+from backend.utils import once, sanitize_filename
+
+logger = logging.getLogger(__name__)
 
 REMINDERS_MEM: List[Dict[str, Any]] = []
+# REMINDERS_MEM ordered by (when_ts, id): parallel key/row lists maintained with bisect.
+_MEM_KEYS: List[Tuple[int, int]] = []
+_MEM_ROWS: List[Dict[str, Any]] = []
 FILES_DIR = os.path.join(config.DATA_DIR, "files")
-os.makedirs(FILES_DIR, exist_ok=True)
 
 
-def _ensure_db():
+# Statements are module constants so sqlite3's per-connection statement cache reuses the prepared form.
+_INSERT_SQL = "INSERT INTO reminders (what, when_ts, created_ts) VALUES (?, ?, ?)"
+_SELECT_SQL = "SELECT id, what, when_ts, created_ts FROM reminders"
+_FETCH_SIZE = 500
+_SAVE_AUDIO_ID_SQL = "INSERT OR REPLACE INTO audio_ids (id, text, lang, created_ts) VALUES (?, ?, ?, ?)"
+# A finished job's record is final: a late write of its acknowledged state must not replace it.
+_SAVE_JOB_SQL = (
+	"INSERT INTO jobs (id, data, finished, updated_ts) VALUES (?, ?, ?, ?) "
+	"ON CONFLICT(id) DO UPDATE SET data = excluded.data, finished = excluded.finished, "
+	"updated_ts = excluded.updated_ts WHERE jobs.finished = 0"
+)
+# Shared records outlive any use of them: audio URLs (and claims) last a day, job results JOB_RESULT_TTL.
+AUDIO_ID_TTL = 24 * 3600
+_PRUNE_INTERVAL = 60.0
+
+
+def _connect() -> sqlite3.Connection:
+	conn = sqlite3.connect(config.SQLITE_DB_PATH, check_same_thread=False, cached_statements=128, timeout=30)
+	conn.execute("PRAGMA journal_mode=WAL")
+	conn.execute("PRAGMA synchronous=NORMAL")
+	return conn
+
+
+class _ConnectionPool:
+	"""Fixed-size pool of WAL-mode connections handed out one thread at a time."""
+
+	def __init__(self, size: int):
+		self._size = size
+		self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+		self._created = 0
+		self._lock = threading.Lock()
+
+	@contextmanager
+	def connection(self) -> Iterator[sqlite3.Connection]:
+		try:
+			conn = self._idle.get_nowait()
+		except queue.Empty:
+			with self._lock:
+				grow = self._created < self._size
+				if grow:
+					self._created += 1
+			if grow:
+				try:
+					init_storage()
+					conn = _connect()
+				except BaseException:
+					# The slot was never filled: give it back so a later call can try again.
+					with self._lock:
+						self._created -= 1
+					raise
+			else:
+				try:
+					conn = self._idle.get(timeout=config.SQLITE_POOL_TIMEOUT)
+				except queue.Empty:
+					raise sqlite3.OperationalError(
+						f"no pooled connection free within {config.SQLITE_POOL_TIMEOUT:g} s"
+					) from None
+		try:
+			yield conn
+		finally:
+			self._idle.put(conn)
+
+
+class _GroupCommitWriter:
+	"""
+	Single writer thread that drains queued writes and commits them in one transaction,
+	so N concurrent add_reminder calls cost one fsync instead of N. If the batch fails, its
+	writes are retried one transaction each, so only the failing ones report the error. If the
+	thread cannot open the database, everything queued fails and the next write starts it again.
+	"""
+
+	def __init__(self, max_batch: int):
+		self._max_batch = max_batch
+		self._queue: "queue.Queue[Tuple[str, Tuple[Any, ...], Future]]" = queue.Queue()
+		self._thread: Optional[threading.Thread] = None
+		self._lock = threading.Lock()
+
+	def submit(self, sql: str, row: Tuple[Any, ...]) -> int:
+		"""
+		Execute sql with row in the next commit; returns its lastrowid once committed. Raises
+		sqlite3.OperationalError if that takes over SQLITE_WRITE_TIMEOUT s (the write may still land).
+		"""
+		try:
+			return self.submit_nowait(sql, row).result(timeout=config.SQLITE_WRITE_TIMEOUT)
+		except FutureTimeoutError:
+			raise sqlite3.OperationalError(
+				f"write not committed within {config.SQLITE_WRITE_TIMEOUT:g} s"
+			) from None
+
+	def submit_nowait(self, sql: str, row: Tuple[Any, ...]) -> Future:
+		fut: Future = Future()
+		# Queued and started under one lock, so a writer that fails to start never strands a write.
+		with self._lock:
+			self._queue.put((sql, row, fut))
+			if self._thread is None:
+				self._thread = threading.Thread(target=self._run, name="reminder-writer", daemon=True)
+				self._thread.start()
+		return fut
+
+	def _run(self) -> None:
+		try:
+			init_storage()
+			conn = _connect()
+		except Exception as exc:
+			logger.exception("Reminder writer could not open the database")
+			with self._lock:
+				self._thread = None
+				while True:
+					try:
+						_, _, fut = self._queue.get_nowait()
+					except queue.Empty:
+						break
+					fut.set_exception(exc)
+			return
+		while True:
+			batch = [self._queue.get()]
+			while len(batch) < self._max_batch:
+				try:
+					batch.append(self._queue.get_nowait())
+				except queue.Empty:
+					break
+			try:
+				with conn:
+					ids = [conn.execute(sql, row).lastrowid for sql, row, _ in batch]
+			except Exception:
+				if len(batch) > 1:
+					logger.warning("Group commit of %d writes failed, retrying them one by one", len(batch), exc_info=True)
+				for sql, row, fut in batch:
+					try:
+						with conn:
+							row_id = conn.execute(sql, row).lastrowid
+					except Exception as exc:
+						fut.set_exception(exc)
+					else:
+						fut.set_result(row_id)
+				continue
+			for row_id, (_, _, fut) in zip(ids, batch):
+				fut.set_result(row_id)
+
+
+@once
+def init_storage() -> None:
+	"""
+	Create the database directory, schema and index. Runs once per process: from app init,
+	or before the first connection is opened if the app factory was bypassed.
+	"""
 	if not config.USE_SQLITE:
 		return
-	dir_path = os.path.dirname(config.SQLITE_DB_PATH)
-	os.makedirs(dir_path, exist_ok=True)
-	conn = sqlite3.connect(config.SQLITE_DB_PATH)
+	os.makedirs(os.path.dirname(config.SQLITE_DB_PATH), exist_ok=True)
+	conn = _connect()
 	cur = conn.cursor()
 	cur.execute(
 		"""
@@ -29,43 +184,222 @@ def _ensure_db():
 		)
 		"""
 	)
+	cur.execute("CREATE INDEX IF NOT EXISTS idx_reminders_when_ts ON reminders (when_ts, id)")
+	# Shared state of the server processes (SHARED_STATE).
+	cur.execute(
+		"""
+		CREATE TABLE IF NOT EXISTS audio_ids (
+			id TEXT PRIMARY KEY,
+			text TEXT NOT NULL,
+			lang TEXT NOT NULL,
+			created_ts INTEGER NOT NULL
+		)
+		"""
+	)
+	cur.execute("CREATE INDEX IF NOT EXISTS idx_audio_ids_created_ts ON audio_ids (created_ts)")
+	cur.execute(
+		"""
+		CREATE TABLE IF NOT EXISTS jobs (
+			id TEXT PRIMARY KEY,
+			data TEXT NOT NULL,
+			finished INTEGER NOT NULL,
+			updated_ts INTEGER NOT NULL
+		)
+		"""
+	)
+	cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated_ts ON jobs (updated_ts)")
+	cur.execute("CREATE TABLE IF NOT EXISTS claims (key TEXT PRIMARY KEY, created_ts INTEGER NOT NULL)")
+	cur.execute("CREATE INDEX IF NOT EXISTS idx_claims_created_ts ON claims (created_ts)")
 	conn.commit()
 	conn.close()
 
 
-_ensure_db()
+_pool = _ConnectionPool(config.SQLITE_POOL_SIZE)
+_writer = _GroupCommitWriter(config.SQLITE_WRITE_BATCH)
+
+
+_listeners: List[Callable[[Dict[str, Any]], Any]] = []
+
+
+def add_listener(fn: Callable[[Dict[str, Any]], Any]) -> None:
+	"""Call fn(reminder) after every add_reminder (e.g. the delivery scheduler)."""
+	_listeners.append(fn)
+
+
+def _notify(rem: Dict[str, Any]) -> None:
+	for fn in _listeners:
+		try:
+			fn(rem)
+		except Exception:
+			logger.warning("Reminder listener failed", exc_info=True)
 
 
 def add_reminder(what: str, when_ts: int) -> Dict[str, Any]:
 	created_ts = int(datetime.utcnow().timestamp())
 	if config.USE_SQLITE:
-		conn = sqlite3.connect(config.SQLITE_DB_PATH)
-		cur = conn.cursor()
-		cur.execute("INSERT INTO reminders (what, when_ts, created_ts) VALUES (?, ?, ?)", (what, when_ts, created_ts))
-		conn.commit()
-		rem_id = cur.lastrowid
-		conn.close()
-		return {"id": rem_id, "what": what, "when_ts": when_ts, "created_ts": created_ts}
+		rem_id = _writer.submit(_INSERT_SQL, (what, when_ts, created_ts))
+		rem = {"id": rem_id, "what": what, "when_ts": when_ts, "created_ts": created_ts}
 	else:
 		rem_id = (REMINDERS_MEM[-1]["id"] + 1) if REMINDERS_MEM else 1
 		rem = {"id": rem_id, "what": what, "when_ts": when_ts, "created_ts": created_ts}
 		REMINDERS_MEM.append(rem)
-		return rem
+		i = bisect.bisect_right(_MEM_KEYS, (when_ts, rem_id))
+		_MEM_KEYS.insert(i, (when_ts, rem_id))
+		_MEM_ROWS.insert(i, rem)
+	_notify(rem)
+	return rem
 
 
-def list_reminders() -> List[Dict[str, Any]]:
+def _select_sql(after: Optional[Tuple[int, int]], since: Optional[int], until: Optional[int], limit: Optional[int]) -> Tuple[str, List[Any]]:
+	clauses, params = [], []
+	if after is not None:
+		# Row-value comparison lets SQLite seek the (when_ts, id) index directly.
+		clauses.append("(when_ts, id) > (?, ?)")
+		params.extend(after)
+	if since is not None:
+		clauses.append("when_ts >= ?")
+		params.append(since)
+	if until is not None:
+		clauses.append("when_ts <= ?")
+		params.append(until)
+	sql = _SELECT_SQL
+	if clauses:
+		sql += " WHERE " + " AND ".join(clauses)
+	sql += " ORDER BY when_ts ASC, id ASC"
+	if limit is not None:
+		sql += " LIMIT ?"
+		params.append(limit)
+	return sql, params
+
+
+def _mem_range(after: Optional[Tuple[int, int]], since: Optional[int], until: Optional[int]) -> Tuple[int, int]:
+	lo = 0
+	if after is not None:
+		lo = bisect.bisect_right(_MEM_KEYS, after)
+	if since is not None:
+		lo = max(lo, bisect.bisect_left(_MEM_KEYS, (since, 0)))
+	hi = len(_MEM_KEYS)
+	if until is not None:
+		hi = bisect.bisect_right(_MEM_KEYS, (until, float("inf")))
+	return lo, max(lo, hi)
+
+
+def iter_reminders(
+	after: Optional[Tuple[int, int]] = None,
+	since: Optional[int] = None,
+	until: Optional[int] = None,
+	limit: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+	"""
+	Yield reminders ordered by (when_ts, id) without materializing the result.
+	after is a keyset cursor (when_ts, id) of the last row already seen; since/until bound
+	when_ts inclusively. SQLite rows are read in keyset pages of _FETCH_SIZE, and the pooled
+	connection is returned between pages, so a slow consumer does not hold it.
+	"""
 	if config.USE_SQLITE:
-		conn = sqlite3.connect(config.SQLITE_DB_PATH)
-		cur = conn.cursor()
-		cur.execute("SELECT id, what, when_ts, created_ts FROM reminders ORDER BY when_ts ASC")
-		rows = cur.fetchall()
-		conn.close()
-		return [
-			{"id": r[0], "what": r[1], "when_ts": r[2], "created_ts": r[3]}
-			for r in rows
-		]
+		remaining = limit
+		while remaining is None or remaining > 0:
+			page = _FETCH_SIZE if remaining is None else min(_FETCH_SIZE, remaining)
+			sql, params = _select_sql(after, since, until, page)
+			with _pool.connection() as conn:
+				rows = conn.execute(sql, params).fetchall()
+			for r in rows:
+				yield {"id": r[0], "what": r[1], "when_ts": r[2], "created_ts": r[3]}
+			if len(rows) < page:
+				return
+			after = (rows[-1][2], rows[-1][0])
+			if remaining is not None:
+				remaining -= len(rows)
 	else:
-		return sorted(REMINDERS_MEM, key=lambda r: r["when_ts"]) 
+		lo, hi = _mem_range(after, since, until)
+		if limit is not None:
+			hi = min(hi, lo + limit)
+		# By index: a slice would copy the range. Rows are only ever inserted, never removed.
+		for i in range(lo, hi):
+			yield _MEM_ROWS[i]
+
+
+def query_reminders(
+	after: Optional[Tuple[int, int]] = None,
+	since: Optional[int] = None,
+	until: Optional[int] = None,
+	limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+	"""One page of iter_reminders as a list."""
+	return list(iter_reminders(after=after, since=since, until=until, limit=limit))
+
+
+def list_reminders() -> List[Dict[str, Any]]:
+	return query_reminders()
+
+
+def reminders_added_after(after_id: int, limit: int = _FETCH_SIZE) -> List[Dict[str, Any]]:
+	"""Reminders with id > after_id in id order (those added since, by any process); SQLite only."""
+	with _pool.connection() as conn:
+		rows = conn.execute(_SELECT_SQL + " WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)).fetchall()
+	return [{"id": r[0], "what": r[1], "when_ts": r[2], "created_ts": r[3]} for r in rows]
+
+
+def last_reminder_id() -> int:
+	with _pool.connection() as conn:
+		return conn.execute("SELECT COALESCE(MAX(id), 0) FROM reminders").fetchone()[0]
+
+
+def shared_state() -> bool:
+	"""Whether audio ids, jobs and new reminders are shared between server processes (SHARED_STATE)."""
+	return config.SHARED_STATE and config.USE_SQLITE
+
+
+_next_prune = 0.0
+
+
+def _prune_shared() -> None:
+	"""Drop expired shared records, at most every _PRUNE_INTERVAL s, without waiting for the commit."""
+	global _next_prune
+	now = time.time()
+	if now < _next_prune:
+		return
+	_next_prune = now + _PRUNE_INTERVAL
+	_writer.submit_nowait("DELETE FROM audio_ids WHERE created_ts < ?", (int(now - AUDIO_ID_TTL),))
+	_writer.submit_nowait("DELETE FROM jobs WHERE updated_ts < ?", (int(now - config.JOB_RESULT_TTL),))
+	_writer.submit_nowait("DELETE FROM claims WHERE created_ts < ?", (int(now - AUDIO_ID_TTL),))
+
+
+def claim(key: str) -> bool:
+	"""
+	True for the first server process to claim key (within AUDIO_ID_TTL), False for the others.
+	Committed directly rather than through the writer, which cannot tell whether a row went in.
+	"""
+	_prune_shared()
+	with _pool.connection() as conn:
+		with conn:
+			cur = conn.execute("INSERT OR IGNORE INTO claims (key, created_ts) VALUES (?, ?)", (key, int(time.time())))
+	return cur.rowcount == 1
+
+
+def save_audio_id(audio_id: str, text: str, lang: str) -> None:
+	"""Record what an audio id says, so any server process can synthesize it."""
+	_prune_shared()
+	_writer.submit(_SAVE_AUDIO_ID_SQL, (audio_id, text, lang, int(time.time())))
+
+
+def load_audio_id(audio_id: str) -> Optional[Tuple[str, str]]:
+	"""(text, lang) of an audio id recorded by save_audio_id, or None."""
+	with _pool.connection() as conn:
+		row = conn.execute("SELECT text, lang FROM audio_ids WHERE id = ?", (audio_id,)).fetchone()
+	return (row[0], row[1]) if row else None
+
+
+def save_job(job_id: str, data: Dict[str, Any], finished: bool) -> None:
+	"""Record a job's public state; a finished record is never overwritten."""
+	_prune_shared()
+	_writer.submit(_SAVE_JOB_SQL, (job_id, json.dumps(data), int(finished), int(time.time())))
+
+
+def load_job(job_id: str) -> Optional[Dict[str, Any]]:
+	with _pool.connection() as conn:
+		row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+	return json.loads(row[0]) if row else None
 
 
 def save_text_file(content: str, filename: Optional[str] = None) -> str:
@@ -76,6 +410,7 @@ def save_text_file(content: str, filename: Optional[str] = None) -> str:
 	filename = sanitize_filename(filename)
 	if not filename.lower().endswith(".txt"):
 		filename += ".txt"
+	os.makedirs(FILES_DIR, exist_ok=True)
 	path = os.path.join(FILES_DIR, filename)
 	with open(path, "w", encoding="utf-8") as f:
 		f.write(content or "")
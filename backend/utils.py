@@ -1,6 +1,18 @@
 import re
+import sys
+import time
+import queue
+import types
+import tempfile
+import functools
+import importlib
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import IO, Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from backend import config
 
 
 def sanitize_filename(name: str) -> str:
@@ -10,6 +22,78 @@ def sanitize_filename(name: str) -> str:
 	return name or "untitled"
 
 
+class LazyModule(types.ModuleType):
+	"""Placeholder for a module that is imported on first attribute access."""
+
+	def __getattr__(self, attr: str) -> Any:
+		value = getattr(importlib.import_module(self.__name__), attr)
+		# Later lookups find the attribute directly and never reach __getattr__ again.
+		setattr(self, attr, value)
+		return value
+
+	def __repr__(self) -> str:
+		return f"<lazy module {self.__name__!r}>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+	"""
+	Module object for name that defers the import until an attribute is used, so heavy
+	dependencies cost nothing at start-up for requests that never touch them. Annotations that
+	refer to the module must be quoted.
+	"""
+	return sys.modules.get(name) or LazyModule(name)
+
+
+def once(fn: Callable[[], Any]) -> Callable[[], Any]:
+	"""Thread-safe run-once initializer: the first call runs fn, later calls return its result."""
+	lock = threading.Lock()
+	result: List[Any] = []
+
+	@functools.wraps(fn)
+	def wrapper() -> Any:
+		if not result:
+			with lock:
+				if not result:
+					result.append(fn())
+		return result[0]
+	return wrapper
+
+
+def import_modules(names: Sequence[str]) -> None:
+	"""Import modules now, skipping those that are not installed."""
+	for name in names:
+		try:
+			importlib.import_module(name)
+		except ImportError:
+			pass
+
+
+def preload(names: Sequence[str]) -> threading.Thread:
+	"""Import modules on a daemon thread, so the first request needing one finds it loaded."""
+	thread = threading.Thread(target=import_modules, args=(names,), name="preload", daemon=True)
+	thread.start()
+	return thread
+
+
+# Only the ASGI server uses the async helpers below.
+asyncio = lazy_import("asyncio")
+
+
+def spooled_upload_stream(
+	total_content_length: Optional[int],
+	content_type: Optional[str],
+	filename: Optional[str] = None,
+	content_length: Optional[int] = None,
+) -> IO[bytes]:
+	"""
+	Stream factory for multipart uploads (Werkzeug/Quart signature): the part stays in memory
+	until it exceeds UPLOAD_SPOOL_BYTES, then rolls over to an unnamed temp file, so the
+	client-supplied filename never reaches the filesystem.
+	"""
+	config.ensure_dirs()
+	return tempfile.SpooledTemporaryFile(max_size=config.UPLOAD_SPOOL_BYTES, dir=config.TMP_DIR)
+
+
 def parse_reminder_time(in_minutes: Optional[str], at_time: Optional[str], am_pm: Optional[str]) -> Optional[int]:
 	"""
 	Return a UTC timestamp (int) when the reminder should trigger.
@@ -39,4 +123,155 @@ def parse_reminder_time(in_minutes: Optional[str], at_time: Optional[str], am_pm
 			return int(sched.timestamp())
 		except Exception:
 			return None
-	return None 
\ No newline at end of file
+	return None 
+
+
+class StageTimer:
+	"""
+	Records (start, duration) per pipeline stage relative to a common origin, so stages
+	that run concurrently show up as overlapping intervals.
+	"""
+
+	def __init__(self):
+		self.origin = time.perf_counter()
+		self.stages: Dict[str, Tuple[float, float]] = {}
+
+	def now(self) -> float:
+		return time.perf_counter()
+
+	def mark(self, name: str, start: float, end: Optional[float] = None) -> None:
+		end = self.now() if end is None else end
+		self.stages[name] = (start - self.origin, end - start)
+
+	@contextmanager
+	def stage(self, name: str) -> Iterator[None]:
+		start = self.now()
+		try:
+			yield
+		finally:
+			self.mark(name, start)
+
+	def server_timing(self) -> str:
+		"""Format as a Server-Timing header value (durations and start offsets in ms)."""
+		return ", ".join(
+			f'{name};dur={dur * 1000:.2f};desc="start={start * 1000:.2f}ms"'
+			for name, (start, dur) in self.stages.items()
+		)
+
+
+class SingleFlight:
+	"""Coalesce concurrent calls for the same key into one execution; every caller gets its result."""
+
+	class _Call:
+		def __init__(self):
+			self.done = threading.Event()
+			self.result: Any = None
+			self.error: Optional[BaseException] = None
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._calls: Dict[Hashable, "SingleFlight._Call"] = {}
+
+	def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+		with self._lock:
+			call = self._calls.get(key)
+			leader = call is None
+			if leader:
+				call = self._calls[key] = SingleFlight._Call()
+		if not leader:
+			call.done.wait()
+			if call.error is not None:
+				raise call.error
+			return call.result
+		try:
+			call.result = fn()
+			return call.result
+		except BaseException as exc:
+			call.error = exc
+			raise
+		finally:
+			with self._lock:
+				self._calls.pop(key, None)
+			call.done.set()
+
+	def in_flight(self, key: Hashable) -> bool:
+		with self._lock:
+			return key in self._calls
+
+
+class MicroBatcher:
+	"""
+	Coalesce concurrent submissions into one call of run_batch(items) -> results (same order).
+	A batch closes when it holds max_batch items or max_wait seconds after its first item;
+	`workers` threads each collect and run batches, so one can fill while another computes.
+	"""
+
+	def __init__(
+		self,
+		run_batch: Callable[[List[Any]], Sequence[Any]],
+		max_batch: int = 8,
+		max_wait: float = 0.02,
+		workers: int = 1,
+		name: str = "batch",
+	):
+		self._run_batch = run_batch
+		self.max_batch = max(1, max_batch)
+		self.max_wait = max_wait
+		self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+		self.batches = 0
+		self.items = 0
+		for i in range(max(1, workers)):
+			threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True).start()
+
+	def submit(self, item: Any) -> Future:
+		future: Future = Future()
+		self._queue.put((item, future))
+		return future
+
+	def _collect(self) -> List[Tuple[Any, Future]]:
+		batch = [self._queue.get()]
+		deadline = time.monotonic() + self.max_wait
+		while len(batch) < self.max_batch:
+			timeout = deadline - time.monotonic()
+			try:
+				batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+			except queue.Empty:
+				break
+		return batch
+
+	def _worker(self) -> None:
+		while True:
+			batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+			if not batch:
+				continue
+			try:
+				results = list(self._run_batch([item for item, _ in batch]))
+				if len(results) != len(batch):
+					raise RuntimeError(f"batch of {len(batch)} returned {len(results)} results")
+			except BaseException as exc:
+				for _, future in batch:
+					future.set_exception(exc)
+				continue
+			self.batches += 1
+			self.items += len(batch)
+			for (_, future), result in zip(batch, results):
+				future.set_result(result)
+
+
+class AsyncSingleFlight:
+	"""asyncio counterpart of SingleFlight; must be used from a single event loop."""
+
+	def __init__(self):
+		self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+
+	async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+		task = self._tasks.get(key)
+		if task is None:
+			task = asyncio.ensure_future(fn())
+			self._tasks[key] = task
+			task.add_done_callback(lambda _t: self._tasks.pop(key, None))
+		# shield: one caller being cancelled must not cancel the fetch the others wait on
+		return await asyncio.shield(task)
+
+	def in_flight(self, key: Hashable) -> bool:
+		return key in self._tasks
@@ -16,13 +16,22 @@ let mediaStream = null;
 let audioContext = null;
 let analyser = null;
 let sourceNode = null;
-let processorNode = null;
+let captureNode = null;
 let rafId = null;
-let recordingBuffers = [];
-let inputSampleRate = 44100;
 let recordingActive = false;
 let spokenSinceStart = false;
 let silenceFrames = 0;
+// Ask the server for an audio URL instead of an inline data URL so playback can start while TTS streams.
+const AUDIO_MODE = 'url';
+// Capture runs in an AudioWorklet (capture-worklet.js) that downsamples to 16 kHz; a Worker
+// (flac-worker.js) FLAC-encodes its chunks, both off the main thread. While recording, the PCM is streamed over a WebSocket (served by the ASGI app)
+// so the server can recognize each utterance as soon as it ends; without one, the FLAC is uploaded on stop.
+let audioSocket = null;
+let streamedResults = 0;
+let resolveFlac = null;
+let flacWorker = null;
+// Longest wait for the encoder to hand over the recording before giving up on the upload.
+const FINISH_TIMEOUT_MS = 5000;
 
 function setState(text) { stateEl.textContent = text; }
 function setMicActive(active) { micBtn.classList.toggle('active', active); }
@@ -47,151 +56,148 @@ function drawVisualizer() {
 
 async function startRecording() {
 	if (!navigator.mediaDevices || !navigator.mediaDevices.getUserMedia) {
-		alert('getUserMedia not supported. Use the upload WAV option.');
+		alert('getUserMedia not supported. Use the upload audio option.');
 		return;
 	}
 	setState('Listening…');
 	setMicActive(true);
 	recordingActive = true;
-	recordingBuffers = [];
 	spokenSinceStart = false;
 	silenceFrames = 0;
+	streamedResults = 0;
+	audioSocket = openAudioStream();
 	mediaStream = await navigator.mediaDevices.getUserMedia({ audio: { echoCancellation: true, noiseSuppression: true } });
 	audioContext = new (window.AudioContext || window.webkitAudioContext)();
-	inputSampleRate = audioContext.sampleRate;
+	await audioContext.audioWorklet.addModule('capture-worklet.js');
 	sourceNode = audioContext.createMediaStreamSource(mediaStream);
 	analyser = audioContext.createAnalyser();
 	analyser.fftSize = 256;
 	sourceNode.connect(analyser);
-	processorNode = audioContext.createScriptProcessor(4096, 1, 1);
-	sourceNode.connect(processorNode);
-	processorNode.connect(audioContext.destination);
-	processorNode.onaudioprocess = (e) => {
-		const channelData = e.inputBuffer.getChannelData(0);
-		recordingBuffers.push(new Float32Array(channelData));
-		// Simple RMS to detect speech
-		let sum = 0;
-		for (let i = 0; i < channelData.length; i++) sum += channelData[i] * channelData[i];
-		const rms = Math.sqrt(sum / channelData.length);
-		if (rms > 0.02) { spokenSinceStart = true; silenceFrames = 0; }
-		else if (spokenSinceStart) { silenceFrames++; }
-		// Auto-stop if continuous off and we observed ~500ms of silence
-		if (!continuousToggle.checked && spokenSinceStart && silenceFrames > 4) {
-			stopRecording();
-		}
+	// No outputs: the node is a sink the graph still pulls, so nothing needs to reach the speakers.
+	captureNode = new AudioWorkletNode(audioContext, 'capture-processor', {
+		numberOfInputs: 1, numberOfOutputs: 0, channelCount: 1, channelCountMode: 'explicit',
+	});
+	captureNode.port.onmessage = (e) => {
+		if (e.data.type === 'chunk') onCaptureChunk(e.data);
 	};
+	// The worklet feeds the encoder directly, over a port of its own.
+	flacWorker = new Worker('flac-worker.js');
+	flacWorker.onmessage = (e) => {
+		if (e.data.type === 'flac' && resolveFlac) resolveFlac(e.data.data);
+	};
+	flacWorker.onerror = () => { if (resolveFlac) resolveFlac(null); };
+	const encoderChannel = new MessageChannel();
+	flacWorker.postMessage({ type: 'port', port: encoderChannel.port1 }, [encoderChannel.port1]);
+	captureNode.port.postMessage({ type: 'encoder', port: encoderChannel.port2 }, [encoderChannel.port2]);
+	sourceNode.connect(captureNode);
 	drawVisualizer();
 }
 
+// ~100 ms of 16 kHz PCM and its RMS level.
+function onCaptureChunk({ pcm, rms }) {
+	if (audioSocket && audioSocket.readyState === WebSocket.OPEN) audioSocket.send(pcm.buffer);
+	if (!recordingActive) return;
+	if (rms > 0.02) { spokenSinceStart = true; silenceFrames = 0; }
+	else if (spokenSinceStart) { silenceFrames++; }
+	// Auto-stop if continuous off and we observed ~500ms of silence
+	if (!continuousToggle.checked && spokenSinceStart && silenceFrames > 4) {
+		stopRecording();
+	}
+}
+
+// Flush the worklet: the last PCM chunk, then the whole recording as FLAC from the encoder
+// (null if it fails or takes longer than FINISH_TIMEOUT_MS).
+function finishCapture() {
+	if (!captureNode || !flacWorker) return Promise.resolve(null);
+	return new Promise(resolve => {
+		const timer = setTimeout(() => resolve(null), FINISH_TIMEOUT_MS);
+		resolveFlac = data => { clearTimeout(timer); resolve(data); };
+		captureNode.port.postMessage({ type: 'finish' });
+	});
+}
+
 async function stopRecording() {
 	if (!recordingActive) return;
 	recordingActive = false;
 	setState('Processing…');
 	setMicActive(false);
+	let flac = null;
 	try {
-		if (processorNode) processorNode.disconnect();
+		flac = await finishCapture();
+		if (captureNode) captureNode.disconnect();
 		if (sourceNode) sourceNode.disconnect();
 		if (analyser) analyser.disconnect();
 		if (mediaStream) mediaStream.getTracks().forEach(t => t.stop());
 		if (rafId) cancelAnimationFrame(rafId);
 		if (audioContext) await audioContext.close();
 	} finally {
-		processorNode = null; sourceNode = null; analyser = null; audioContext = null; mediaStream = null; rafId = null;
+		if (flacWorker) flacWorker.terminate();
+		captureNode = null; sourceNode = null; analyser = null; audioContext = null; mediaStream = null; rafId = null;
+		flacWorker = null; resolveFlac = null;
+	}
+	const ws = audioSocket;
+	audioSocket = null;
+	if (ws && ws.readyState === WebSocket.OPEN) {
+		await finishAudioStream(ws);
+		if (!streamedResults) setState('Ready');
+	} else {
+		if (ws) ws.close();
+		if (flac) await uploadRecording(new Blob([flac], { type: 'audio/flac' }));
+		else setState('Ready');
 	}
-	const wavBlob = buildWavFromFloat32(recordingBuffers, inputSampleRate, 16000);
-	await uploadWav(wavBlob);
 	// Auto-restart if continuous listening on (and no wake word gating)
 	if (continuousToggle.checked && !wakeToggle.checked) {
 		startRecording();
 	}
 }
 
-function mergeFloat32Arrays(buffers) {
-	let total = 0;
-	for (const b of buffers) total += b.length;
-	const out = new Float32Array(total);
-	let offset = 0;
-	for (const b of buffers) { out.set(b, offset); offset += b.length; }
-	return out;
-}
-
-function downsampleFloat32(buffer, inSampleRate, outSampleRate) {
-	if (outSampleRate === inSampleRate) return buffer;
-	const sampleRateRatio = inSampleRate / outSampleRate;
-	const newLength = Math.round(buffer.length / sampleRateRatio);
-	const result = new Float32Array(newLength);
-	let offsetResult = 0;
-	let offsetBuffer = 0;
-	while (offsetResult < result.length) {
-		const nextOffsetBuffer = Math.round((offsetResult + 1) * sampleRateRatio);
-		let accum = 0, count = 0;
-		for (let i = offsetBuffer; i < nextOffsetBuffer && i < buffer.length; i++) {
-			accum += buffer[i];
-			count++;
+function openAudioStream() {
+	if (!window.WebSocket) return null;
+	const proto = location.protocol === 'https:' ? 'wss:' : 'ws:';
+	const ws = new WebSocket(`${proto}//${location.host}/api/stream-audio?audio_mode=${AUDIO_MODE}`);
+	ws.binaryType = 'arraybuffer';
+	ws.addEventListener('message', e => {
+		const msg = JSON.parse(e.data);
+		if (msg.type === 'speech_end') setState('Transcribing…');
+		else if (msg.type === 'result') {
+			streamedResults++;
+			if (msg.error) { setState(recordingActive ? 'Listening…' : 'Ready'); return; }
+			handleVoiceResult(msg);
 		}
-		result[offsetResult] = accum / count;
-		offsetResult++;
-		offsetBuffer = nextOffsetBuffer;
-	}
-	return result;
-}
-
-function floatTo16BitPCM(float32Array) {
-	const out = new Int16Array(float32Array.length);
-	for (let i = 0; i < float32Array.length; i++) {
-		let s = Math.max(-1, Math.min(1, float32Array[i]));
-		out[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
-	}
-	return out;
-}
-
-function encodeWAV(pcm16, sampleRate) {
-	function writeString(dv, offset, str) { for (let i = 0; i < str.length; i++) dv.setUint8(offset + i, str.charCodeAt(i)); }
-	const bytesPerSample = 2; const blockAlign = 1 * bytesPerSample; const byteRate = sampleRate * blockAlign; const dataSize = pcm16.byteLength;
-	const buffer = new ArrayBuffer(44 + dataSize);
-	const dv = new DataView(buffer);
-	writeString(dv, 0, 'RIFF');
-	dv.setUint32(4, 36 + dataSize, true);
-	writeString(dv, 8, 'WAVE');
-	writeString(dv, 12, 'fmt ');
-	dv.setUint32(16, 16, true);
-	dv.setUint16(20, 1, true);
-	dv.setUint16(22, 1, true);
-	dv.setUint32(24, sampleRate, true);
-	dv.setUint32(28, byteRate, true);
-	dv.setUint16(32, blockAlign, true);
-	dv.setUint16(34, 16, true);
-	writeString(dv, 36, 'data');
-	dv.setUint32(40, dataSize, true);
-	new Uint8Array(buffer, 44).set(new Uint8Array(pcm16.buffer));
-	return buffer;
+	});
+	return ws;
 }
 
-function buildWavFromFloat32(buffers, inSampleRate, outSampleRate) {
-	const merged = mergeFloat32Arrays(buffers);
-	const down = downsampleFloat32(merged, inSampleRate, outSampleRate);
-	const pcm16 = floatTo16BitPCM(down);
-	const wav = encodeWAV(pcm16, outSampleRate);
-	return new Blob([new Uint8Array(wav)], { type: 'audio/wav' });
+function finishAudioStream(ws) {
+	return new Promise(resolve => {
+		ws.addEventListener('message', e => { if (JSON.parse(e.data).type === 'done') ws.close(); });
+		ws.addEventListener('close', resolve);
+		ws.send(JSON.stringify({ type: 'end' }));
+	});
 }
 
-async function uploadWav(blob) {
+async function uploadRecording(blob) {
 	setState('Transcribing…');
 	const form = new FormData();
-	form.append('file', blob, 'command.wav');
+	form.append('file', blob, 'command.flac');
+	form.append('audio_mode', AUDIO_MODE);
 	const res = await fetch('/api/upload-audio', { method: 'POST', body: form });
 	const data = await res.json();
 	if (!res.ok) { alert(data.error || 'Error'); setState('Ready'); return; }
+	handleVoiceResult(data);
+}
+
+function handleVoiceResult(data) {
 	// Always show what was transcribed
 	youSaid.textContent = data.transcription || '—';
 	if (wakeToggle.checked) {
 		// Gate by wake word: only forward when wake word is present
 		const ww = (wakeWordInput.value || 'hey nova').toLowerCase();
 		const said = (data.transcription || '').toLowerCase();
-		if (!said.includes(ww)) { setState('Ready'); return; }
+		if (!said.includes(ww)) { setState(recordingActive ? 'Listening…' : 'Ready'); return; }
 	}
 	displayResult(data);
-	if (continuousToggle.checked && wakeToggle.checked) {
+	if (continuousToggle.checked && wakeToggle.checked && !recordingActive) {
 		// After action, re-arm listening
 		startRecording();
 	}
@@ -217,7 +223,7 @@ applyLangBtn.addEventListener('click', async () => {
 async function sendText(text) {
 	setState('Thinking…');
 	assistantSays.textContent = '';
-	const res = await fetch('/api/command', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ text }) });
+	const res = await fetch('/api/command', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ text, audio_mode: AUDIO_MODE }) });
 	const data = await res.json();
 	if (!res.ok) { alert(data.error || 'Error'); setState('Ready'); return; }
 	displayResult(data);
@@ -226,8 +232,38 @@ async function sendText(text) {
 function displayResult(data) {
 	youSaid.textContent = data.transcription || '—';
 	assistantSays.textContent = data.response_text || '—';
-	if (data.audio_data_url) replyAudio.src = data.audio_data_url;
+	if (data.audio_url) replyAudio.src = data.audio_url;
+	else if (data.audio_data_url) replyAudio.src = data.audio_data_url;
 	setState('Ready');
+	if (data.job) awaitJob(data.job);
+}
+
+// Slow commands are acknowledged first; the result arrives as a pushed "job" event, or by long polling.
+const pendingJobs = new Set();
+const JOB_FINISHED = ['done', 'error', 'timeout'];
+
+function showJobResult(job) {
+	if (!pendingJobs.delete(job.id)) return;
+	if (job.response_text) assistantSays.textContent = job.response_text;
+	if (job.audio_url) replyAudio.src = job.audio_url;
+}
+
+async function awaitJob(ref) {
+	// Poll even with the event stream open: the event may have been pushed before this client
+	// subscribed, or the stream may drop. showJobResult shows whichever arrives first, once.
+	pendingJobs.add(ref.id);
+	while (pendingJobs.has(ref.id)) {
+		let job;
+		try {
+			const res = await fetch(`${ref.url}?wait=25`);
+			if (!res.ok) { pendingJobs.delete(ref.id); return; }
+			job = await res.json();
+		} catch (err) {
+			await new Promise(resolve => setTimeout(resolve, 2000));
+			continue;
+		}
+		if (JOB_FINISHED.includes(job.status)) showJobResult(job);
+	}
 }
 
 fileInput.addEventListener('change', async () => {
@@ -236,8 +272,21 @@ fileInput.addEventListener('change', async () => {
 	setState('Uploading…');
 	const form = new FormData();
 	form.append('file', file);
+	form.append('audio_mode', AUDIO_MODE);
 	const res = await fetch('/api/upload-audio', { method: 'POST', body: form });
 	const data = await res.json();
 	if (!res.ok) { alert(data.error || 'Error'); setState('Ready'); return; }
 	displayResult(data);
-}); 
\ No newline at end of file
+}); 
+
+// Due reminders and job results are pushed by the server; show and speak them as they arrive.
+let serverEvents = null;
+if (window.EventSource) {
+	serverEvents = new EventSource('/api/reminders/events');
+	serverEvents.addEventListener('reminder', e => {
+		const data = JSON.parse(e.data);
+		assistantSays.textContent = data.text;
+		if (data.audio_url) replyAudio.src = data.audio_url;
+	});
+	serverEvents.addEventListener('job', e => showJobResult(JSON.parse(e.data)));
+}
\ No newline at end of file
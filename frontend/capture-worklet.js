@@ -0,0 +1,82 @@
+// Microphone capture on the audio rendering thread: downsamples to 16 kHz mono and reports ~100 ms
+// chunks of 16-bit PCM with their RMS level. Each chunk goes to the main thread (for the live
+// WebSocket stream and silence detection) and to the FLAC encoder in flac-worker.js, whose
+// MessagePort the main thread hands over; nothing heavier than downsampling runs in process().
+//
+// Messages from the main thread: {type: 'encoder', port} and {type: 'finish'}. To the main thread:
+// {type: 'chunk', pcm: Int16Array, rms}; to the encoder: 'start', 'pcm' and 'finish' (flac-worker.js).
+
+const TARGET_RATE = 16000;
+const CHUNK_SAMPLES = 1600;
+
+class CaptureProcessor extends AudioWorkletProcessor {
+	constructor() {
+		super();
+		this.rate = Math.min(sampleRate, TARGET_RATE);
+		this.ratio = sampleRate / this.rate;
+		this.phase = 0;
+		this.acc = 0;
+		this.count = 0;
+		this.chunk = new Int16Array(CHUNK_SAMPLES);
+		this.chunkLength = 0;
+		this.squares = 0;
+		this.encoder = null;
+		// Chunks captured before the encoder's port arrives.
+		this.unencoded = [];
+		this.port.onmessage = e => {
+			if (e.data.type === 'encoder') {
+				this.encoder = e.data.port;
+				this.encoder.postMessage({ type: 'start', sampleRate: this.rate });
+				for (const pcm of this.unencoded) this.encode(pcm);
+				this.unencoded = [];
+			} else if (e.data.type === 'finish') this.finish();
+		};
+	}
+
+	process(inputs) {
+		const input = inputs[0] && inputs[0][0];
+		if (!input) return true;
+		for (let i = 0; i < input.length; i++) {
+			// Average the input samples that fall into each output sample (box filter).
+			this.acc += input[i];
+			this.count++;
+			this.phase += 1;
+			if (this.phase >= this.ratio) {
+				this.phase -= this.ratio;
+				this.push(this.acc / this.count);
+				this.acc = 0;
+				this.count = 0;
+			}
+		}
+		return true;
+	}
+
+	push(value) {
+		const s = Math.max(-1, Math.min(1, value));
+		const pcm = s < 0 ? s * 0x8000 : s * 0x7FFF;
+		this.chunk[this.chunkLength++] = pcm;
+		this.squares += s * s;
+		if (this.chunkLength === CHUNK_SAMPLES) this.flushChunk();
+	}
+
+	flushChunk() {
+		if (!this.chunkLength) return;
+		const pcm = this.chunk.slice(0, this.chunkLength);
+		if (this.encoder) this.encode(pcm.slice());
+		else this.unencoded.push(pcm.slice());
+		this.port.postMessage({ type: 'chunk', pcm, rms: Math.sqrt(this.squares / this.chunkLength) }, [pcm.buffer]);
+		this.chunkLength = 0;
+		this.squares = 0;
+	}
+
+	encode(pcm) {
+		this.encoder.postMessage({ type: 'pcm', pcm }, [pcm.buffer]);
+	}
+
+	finish() {
+		this.flushChunk();
+		if (this.encoder) this.encoder.postMessage({ type: 'finish' });
+	}
+}
+
+registerProcessor('capture-processor', CaptureProcessor);
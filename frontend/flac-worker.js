@@ -0,0 +1,247 @@
+// FLAC encoder for microphone recordings, in its own Worker so the audio rendering thread only
+// downsamples. capture-worklet.js feeds it 16 kHz mono PCM chunks over a MessagePort; it encodes
+// each FLAC_BLOCK samples as they arrive, so the file is ready to upload as soon as recording stops.
+//
+// Messages on the port from the worklet: {type: 'start', sampleRate}, {type: 'pcm', pcm: Int16Array}
+// and {type: 'finish'}. To the main thread: {type: 'flac', data: ArrayBuffer}.
+
+const FLAC_BLOCK = 4096;
+const MAX_RICE_PARAM = 14;
+const MAX_PARTITION_ORDER = 6;
+
+const CRC8 = new Uint8Array(256);
+const CRC16 = new Uint16Array(256);
+for (let i = 0; i < 256; i++) {
+	let c8 = i;
+	let c16 = i << 8;
+	for (let j = 0; j < 8; j++) {
+		c8 = c8 & 0x80 ? ((c8 << 1) ^ 0x07) & 0xFF : (c8 << 1) & 0xFF;
+		c16 = c16 & 0x8000 ? ((c16 << 1) ^ 0x8005) & 0xFFFF : (c16 << 1) & 0xFFFF;
+	}
+	CRC8[i] = c8;
+	CRC16[i] = c16;
+}
+
+class BitWriter {
+	constructor(size) {
+		this.bytes = new Uint8Array(size);
+		this.length = 0;
+		this.acc = 0;
+		this.bits = 0;
+	}
+
+	pushByte(b) {
+		if (this.length === this.bytes.length) {
+			const grown = new Uint8Array(this.bytes.length * 2);
+			grown.set(this.bytes);
+			this.bytes = grown;
+		}
+		this.bytes[this.length++] = b;
+	}
+
+	// value must fit in n <= 24 bits.
+	write(value, n) {
+		this.acc = (this.acc << n) | (value & ((1 << n) - 1));
+		this.bits += n;
+		while (this.bits >= 8) {
+			this.bits -= 8;
+			this.pushByte((this.acc >>> this.bits) & 0xFF);
+		}
+		this.acc &= (1 << this.bits) - 1;
+	}
+
+	writeUnary(zeros) {
+		for (; zeros >= 24; zeros -= 24) this.write(0, 24);
+		this.write(1, zeros + 1);
+	}
+
+	alignToByte() {
+		if (this.bits) this.write(0, 8 - this.bits);
+	}
+
+	view(start = 0) { return this.bytes.subarray(start, this.length); }
+}
+
+// FLAC fixed predictors of order 0..4 (residual = sample minus the polynomial prediction).
+function fixedResidual(x, order) {
+	const r = new Int32Array(x.length - order);
+	for (let i = order; i < x.length; i++) {
+		let p = 0;
+		if (order === 1) p = x[i - 1];
+		else if (order === 2) p = 2 * x[i - 1] - x[i - 2];
+		else if (order === 3) p = 3 * x[i - 1] - 3 * x[i - 2] + x[i - 3];
+		else if (order === 4) p = 4 * x[i - 1] - 6 * x[i - 2] + 4 * x[i - 3] - x[i - 4];
+		r[i - order] = x[i] - p;
+	}
+	return r;
+}
+
+function zigzag(r) {
+	const u = new Uint32Array(r.length);
+	for (let i = 0; i < r.length; i++) u[i] = r[i] >= 0 ? 2 * r[i] : -2 * r[i] - 1;
+	return u;
+}
+
+// Rice parameter for a partition of n values summing to sum, and the estimated bits it costs.
+function riceParam(sum, n) {
+	let k = 0;
+	while (k < MAX_RICE_PARAM && n * 2 ** (k + 1) < sum) k++;
+	return { k, bits: 4 + n * (k + 1) + Math.floor(sum / 2 ** k) };
+}
+
+// Cheapest partition order for residuals u of a block of blockSize samples after `order` warm-up samples.
+function planPartitions(u, blockSize, order) {
+	let best = null;
+	for (let po = 0; po <= MAX_PARTITION_ORDER; po++) {
+		const parts = 1 << po;
+		if (blockSize % parts || (blockSize >> po) <= order) break;
+		const plan = { order: po, params: [], bits: 6 };
+		let start = 0;
+		for (let p = 0; p < parts; p++) {
+			const end = (p + 1) * (blockSize >> po) - order;
+			let sum = 0;
+			for (let i = start; i < end; i++) sum += u[i];
+			const { k, bits } = riceParam(sum, end - start);
+			plan.params.push(k);
+			plan.bits += bits;
+			start = end;
+		}
+		if (!best || plan.bits < best.bits) best = plan;
+	}
+	return best;
+}
+
+class FlacEncoder {
+	constructor(sampleRate) {
+		this.sampleRate = sampleRate;
+		this.frames = new BitWriter(64 * 1024);
+		this.frameNumber = 0;
+		this.totalSamples = 0;
+	}
+
+	encodeFrame(x) {
+		const out = this.frames;
+		const start = out.length;
+		out.write(0xFFF8, 16);  // sync code, fixed block size
+		out.write(0x7, 4);  // block size: 16-bit (size - 1) at the end of the header
+		out.write(0x0, 4);  // sample rate: from STREAMINFO
+		out.write(0x0, 4);  // mono
+		out.write(0x4, 3);  // 16 bits per sample
+		out.write(0, 1);
+		this.writeFrameNumber(this.frameNumber++);
+		out.write(x.length - 1, 16);
+		let crc = 0;
+		for (const b of out.view(start)) crc = CRC8[crc ^ b];
+		out.write(crc, 8);
+		this.writeSubframe(x);
+		out.alignToByte();
+		crc = 0;
+		for (const b of out.view(start)) crc = ((crc << 8) & 0xFFFF) ^ CRC16[(crc >> 8) ^ b];
+		out.write(crc, 16);
+		this.totalSamples += x.length;
+	}
+
+	// Frame number in FLAC's UTF-8-like variable-length coding.
+	writeFrameNumber(n) {
+		if (n < 0x80) { this.frames.write(n, 8); return; }
+		let extra = 1;
+		while (n >= 2 ** (6 + 5 * extra)) extra++;
+		this.frames.write(((0xFF << (7 - extra)) & 0xFF) | (n >> (6 * extra)), 8);
+		for (let i = extra - 1; i >= 0; i--) this.frames.write(0x80 | ((n >> (6 * i)) & 0x3F), 8);
+	}
+
+	writeSubframe(x) {
+		const out = this.frames;
+		if (x.every(v => v === x[0])) {
+			out.write(0, 8);  // CONSTANT
+			out.write(x[0], 16);
+			return;
+		}
+		let best = null;
+		for (let order = 0; order <= 4 && order < x.length; order++) {
+			const u = zigzag(fixedResidual(x, order));
+			const plan = planPartitions(u, x.length, order);
+			if (!plan) continue;
+			const bits = plan.bits + 16 * order;
+			if (!best || bits < best.bits) best = { order, u, plan, bits };
+		}
+		if (!best || best.bits >= 16 * x.length) {
+			out.write(0x02, 8);  // VERBATIM
+			for (const v of x) out.write(v, 16);
+			return;
+		}
+		const { order, u, plan } = best;
+		out.write(0x10 | (order << 1), 8);  // FIXED, predictor order
+		for (let i = 0; i < order; i++) out.write(x[i], 16);
+		out.write(0, 2);  // Rice coding with 4-bit parameters
+		out.write(plan.order, 4);
+		let i = 0;
+		plan.params.forEach((k, p) => {
+			out.write(k, 4);
+			const end = (p + 1) * (x.length >> plan.order) - order;
+			for (; i < end; i++) {
+				out.writeUnary(Math.floor(u[i] / 2 ** k));
+				if (k) out.write(u[i] & ((1 << k) - 1), k);
+			}
+		});
+	}
+
+	// The complete file: marker, STREAMINFO (MD5 left as zero, meaning "not computed") and the frames.
+	finish() {
+		const head = new BitWriter(42);
+		for (const c of 'fLaC') head.write(c.charCodeAt(0), 8);
+		head.write(0x80, 8);  // last metadata block, type STREAMINFO
+		head.write(34, 24);
+		head.write(FLAC_BLOCK, 16);
+		head.write(FLAC_BLOCK, 16);
+		head.write(0, 24);
+		head.write(0, 24);
+		head.write(this.sampleRate, 20);
+		head.write(0, 3);  // channels - 1
+		head.write(15, 5);  // bits per sample - 1
+		head.write(Math.floor(this.totalSamples / 2 ** 32), 4);
+		head.write(Math.floor(this.totalSamples / 2 ** 16) & 0xFFFF, 16);
+		head.write(this.totalSamples & 0xFFFF, 16);
+		for (let i = 0; i < 16; i++) head.write(0, 8);
+		const file = new Uint8Array(head.length + this.frames.length);
+		file.set(head.view());
+		file.set(this.frames.view(), head.length);
+		return file.buffer;
+	}
+}
+
+let encoder = null;
+const block = new Int16Array(FLAC_BLOCK);
+let blockLength = 0;
+
+function onPcm(pcm) {
+	let i = 0;
+	while (i < pcm.length) {
+		const n = Math.min(FLAC_BLOCK - blockLength, pcm.length - i);
+		block.set(pcm.subarray(i, i + n), blockLength);
+		blockLength += n;
+		i += n;
+		if (blockLength === FLAC_BLOCK) {
+			encoder.encodeFrame(block);
+			blockLength = 0;
+		}
+	}
+}
+
+function onFinish() {
+	if (blockLength) encoder.encodeFrame(block.subarray(0, blockLength));
+	blockLength = 0;
+	const data = encoder.finish();
+	self.postMessage({ type: 'flac', data }, [data]);
+	encoder = new FlacEncoder(encoder.sampleRate);
+}
+
+self.onmessage = e => {
+	if (e.data.type !== 'port') return;
+	e.data.port.onmessage = m => {
+		const msg = m.data;
+		if (msg.type === 'start') { encoder = new FlacEncoder(msg.sampleRate); blockLength = 0; }
+		else if (msg.type === 'pcm') onPcm(msg.pcm);
+		else if (msg.type === 'finish') onFinish();
+	};
+};
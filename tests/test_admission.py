@@ -0,0 +1,106 @@
+"""Admission lanes: FIFO hand-off, shedding with Retry-After, and early shedding of audio bodies."""
+import asyncio
+import io
+import time
+import threading
+
+import pytest
+
+from backend import admission, config
+
+WAIT = 5
+
+
+def hold(lane):
+	"""Take lane's slot on a thread until the returned event is set."""
+	held, release = threading.Event(), threading.Event()
+
+	def run():
+		with lane.slot():
+			held.set()
+			release.wait(WAIT)
+	threading.Thread(target=run, daemon=True).start()
+	assert held.wait(WAIT)
+	return release
+
+
+def test_full_queue_is_shed_with_retry_after():
+	lane = admission.Lane("local", limit=1, queue=0, deadline=1)
+	release = hold(lane)
+	with pytest.raises(admission.Overloaded) as info:
+		with lane.slot():
+			pass
+	assert (info.value.lane, info.value.reason) == ("local", "queue_full")
+	assert info.value.retry_after >= 1
+	with pytest.raises(admission.Overloaded):
+		lane.check()
+	release.set()
+
+
+def test_waiter_past_its_deadline_is_shed():
+	lane = admission.Lane("network", limit=1, queue=1, deadline=0.05)
+	release = hold(lane)
+	with pytest.raises(admission.Overloaded) as info:
+		with lane.slot():
+			pass
+	assert info.value.reason == "deadline"
+	assert lane.queued == 0
+	release.set()
+
+
+def test_freed_slot_goes_to_the_first_waiter():
+	lane = admission.Lane("audio", limit=1, queue=2, deadline=WAIT)
+	release = hold(lane)
+	order = []
+
+	def wait(n):
+		with lane.slot():
+			order.append(n)
+	threads = []
+	for n in (1, 2):
+		threads.append(threading.Thread(target=wait, args=(n,)))
+		threads[-1].start()
+		while lane.queued < n:
+			time.sleep(0.001)
+	release.set()
+	for thread in threads:
+		thread.join(WAIT)
+	assert order == [1, 2]
+	assert lane.active == 0
+
+
+def test_async_waiter_gets_the_slot_of_a_thread():
+	lane = admission.Lane("local", limit=1, queue=1, deadline=WAIT)
+	release = hold(lane)
+
+	async def wait():
+		async with lane.slot_async():
+			return lane.active
+	loop = asyncio.new_event_loop()
+	try:
+		task = loop.create_task(wait())
+		loop.run_until_complete(asyncio.sleep(0.05))
+		assert lane.queued == 1
+		release.set()
+		assert loop.run_until_complete(task) == 1
+	finally:
+		loop.close()
+	assert lane.active == 0
+
+
+def test_upload_is_shed_before_its_body_is_decoded(monkeypatch):
+	from backend import app as server
+
+	lane = admission.Lane("audio", limit=1, queue=0, deadline=1)
+	monkeypatch.setattr(config, "ADMISSION_ENABLED", True)
+	monkeypatch.setitem(admission.lanes, "audio", lane)
+	monkeypatch.setattr(server, "read_audio", lambda stream: pytest.fail("decoded a shed upload"))
+	release = hold(lane)
+	try:
+		resp = server.app.test_client().post(
+			"/api/upload-audio", data={"file": (io.BytesIO(b"RIFF"), "a.wav")}, content_type="multipart/form-data",
+		)
+	finally:
+		release.set()
+	assert resp.status_code == 503
+	assert int(resp.headers["Retry-After"]) == resp.get_json()["retry_after"] >= 1
@@ -0,0 +1,82 @@
+"""Batch commands: validation, de-duplication and input-order execution and results."""
+import pytest
+
+from backend import admission, batch, config
+
+
+def test_parse_commands_applies_languages():
+	data = {"commands": ["  hi ", {"text": "hola", "tts_lang": "es"}, {}], "tts_lang": "fr"}
+	assert batch.parse_commands(data, "en") == [("hi", "fr"), ("hola", "es"), ("", "fr")]
+	assert batch.parse_commands({"commands": ["hi"]}, "en") == [("hi", "en")]
+
+
+@pytest.mark.parametrize("data", [
+	None,
+	[],
+	{"commands": []},
+	{"commands": "hi"},
+	{"commands": [1]},
+	{"commands": [{"text": 1}]},
+	{"commands": [{"text": "hi", "tts_lang": ["en"]}]},
+	{"commands": ["hi"], "tts_lang": 5},
+])
+def test_parse_commands_rejects_malformed_bodies(data):
+	with pytest.raises(ValueError):
+		batch.parse_commands(data, "en")
+
+
+def test_parse_commands_limits_the_batch(monkeypatch):
+	monkeypatch.setattr(config, "BATCH_MAX_COMMANDS", 2)
+	with pytest.raises(ValueError, match="at most 2"):
+		batch.parse_commands({"commands": ["a", "b", "c"]}, "en")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+	calls = {"interpret": [], "run": [], "tts": []}
+
+	def interpret(text):
+		calls["interpret"].append(text)
+		return {"intent": "greet", "entities": {"text": text}}
+
+	def run_intent(intent, entities, lang):
+		calls["run"].append(entities["text"])
+		if entities["text"] == "boom":
+			raise RuntimeError("boom")
+		return entities["text"].upper(), None
+
+	def start_synthesis(text, lang):
+		calls["tts"].append((text, lang))
+		return f"{text}-{lang}"
+	monkeypatch.setattr(batch, "interpret", interpret)
+	monkeypatch.setattr(batch.jobs, "run_intent", run_intent)
+	monkeypatch.setattr(batch.tts, "start_synthesis", start_synthesis)
+	return calls
+
+
+def test_run_batch_dedups_interpretation_and_synthesis(calls):
+	commands = [("hi", "en"), ("hi", "en"), ("hi", "fr"), ("bye", "en")]
+	results = list(batch.run_batch(commands, "url"))
+	assert calls["interpret"] == ["hi", "bye"]
+	assert calls["run"] == ["hi", "hi", "hi", "bye"]
+	assert calls["tts"] == [("HI", "en"), ("HI", "fr"), ("BYE", "en")]
+	assert [r["index"] for r in results] == [0, 1, 2, 3]
+	assert [r["audio_id"] for r in results] == ["HI-en", "HI-en", "HI-fr", "BYE-en"]
+
+
+def test_run_batch_keeps_order_around_failures(calls, monkeypatch):
+	monkeypatch.setattr(config, "ADMISSION_ENABLED", False)
+	results = list(batch.run_batch([("a", "en"), ("", "en"), ("boom", "en"), ("b", "en")], "none"))
+	assert [r.get("response_text") for r in results] == ["A", None, None, "B"]
+	assert results[1]["error"] == "text is required"
+	assert results[2]["error"] == "boom"
+	assert calls["run"] == ["a", "boom", "b"]
+
+
+def test_run_batch_reports_shed_commands(calls, monkeypatch):
+	def shed(lane, timer=None):
+		raise admission.Overloaded(lane, "queue_full", 3)
+	monkeypatch.setattr(batch.admission, "admit", shed)
+	result, = batch.run_batch([("a", "en")], "none")
+	assert result["retry_after"] == 3 and "busy" in result["error"]
+	assert calls["run"] == []
@@ -0,0 +1,101 @@
+"""JobQueue limits, timeouts and acknowledgements, with intents that block on events."""
+import time
+import threading
+
+import pytest
+
+from backend import jobs
+
+WAIT = 5
+
+
+class Work:
+	"""run() for JobQueue: each call blocks until its intent is released."""
+
+	def __init__(self):
+		self.gates = {}
+		self.started = []
+
+	def gate(self, intent):
+		return self.gates.setdefault(intent, threading.Event())
+
+	def __call__(self, intent, entities):
+		self.started.append(entities["n"])
+		self.gate(intent).wait(WAIT)
+		return f"{intent} {entities['n']}"
+
+
+def idle(q):
+	"""Wait until no job of q runs or waits."""
+	deadline = time.monotonic() + WAIT
+	while q.pending() and time.monotonic() < deadline:
+		time.sleep(0.01)
+	return not q.pending()
+
+
+@pytest.fixture
+def work():
+	w = Work()
+	yield w
+	for gate in w.gates.values():
+		gate.set()
+
+
+def test_limit_queues_jobs_in_order(work):
+	finished = []
+	q = jobs.JobQueue(work, workers=4, limits={"type_text": 1}, on_finish=finished.append)
+	first, second = (q.submit("type_text", {"n": n}) for n in (1, 2))
+	assert not first.wait(0.1)
+	assert (first.status, second.status) == ("running", "queued")
+	assert q.pending() == {"type_text": 2}
+	work.gate("type_text").set()
+	assert second.wait(WAIT)
+	assert work.started == [1, 2]
+	assert [j.response_text for j in finished] == ["type_text 1", "type_text 2"]
+	assert q.pending() == {}
+
+
+def test_timeout_finishes_the_job_once(work):
+	finished = []
+	q = jobs.JobQueue(work, workers=1, timeouts={"open_app": 0.05}, on_finish=finished.append)
+	job = q.submit("open_app", {"n": 1})
+	assert job.wait(WAIT)
+	assert (job.status, job.response_text) == ("timeout", jobs.TIMEOUT_RESPONSE)
+	work.gate("open_app").set()
+	# The late result neither overwrites the timeout nor reports the job again.
+	assert idle(q)
+	assert job.status == "timeout"
+	assert finished == [job]
+
+
+def test_queued_job_that_timed_out_is_never_started(work):
+	q = jobs.JobQueue(work, workers=2, limits={"save_as": 1}, timeouts={"save_as": 0.05})
+	first, second = (q.submit("save_as", {"n": n}) for n in (1, 2))
+	assert second.wait(WAIT) and second.status == "timeout"
+	work.gate("save_as").set()
+	assert idle(q)
+	assert work.started == [1]
+
+
+def test_ack_is_refused_once_finished(work):
+	q = jobs.JobQueue(work, workers=1)
+	job = q.submit("open_app", {"n": 1})
+	assert job.claim_ack()
+	work.gate("open_app").set()
+	assert job.wait(WAIT)
+	assert job.acked and not job.claim_ack()
+	assert not job.start()
+
+
+def test_run_intent_answers_fast_jobs_and_acknowledges_slow_ones(work, monkeypatch):
+	q = jobs.JobQueue(work, workers=2)
+	monkeypatch.setattr(jobs, "job_queue", q)
+	monkeypatch.setattr(jobs, "JOB_INTENTS", frozenset({"open_app"}))
+	monkeypatch.setattr(jobs.config, "JOB_ACK_WAIT_MS", 50)
+	monkeypatch.setattr(jobs, "share", lambda job: None)
+	text, job = jobs.run_intent("open_app", {"app": "notepad", "n": 1})
+	assert job is not None and job.acked and text == job.ack_text
+	work.gate("open_app").set()
+	assert job.wait(WAIT) and job.status == "done"
+	text, job = jobs.run_intent("open_app", {"app": "notepad", "n": 2})
+	assert (text, job) == ("open_app 2", None)
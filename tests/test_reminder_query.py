@@ -0,0 +1,22 @@
+"""/api/reminders query parsing: malformed and out-of-range filters."""
+import pytest
+
+from backend.app import MAX_TIMESTAMP, parse_reminder_query
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "nan", "soon"])
+def test_due_within_rejects_non_numbers(value):
+	with pytest.raises(ValueError):
+		parse_reminder_query({"due_within": value})
+
+
+def test_due_within_is_clamped():
+	query = parse_reminder_query({"due_within": "1e308"})
+	assert query["until"] == MAX_TIMESTAMP
+	query = parse_reminder_query({"due_within": "-5"})
+	assert query["until"] == query["since"]
+
+
+def test_time_bounds_are_clamped():
+	query = parse_reminder_query({"from": "-1", "to": "9" * 30, "cursor": "9" * 30 + ":7"})
+	assert query == {"since": 0, "until": MAX_TIMESTAMP, "after": (MAX_TIMESTAMP, 7)}
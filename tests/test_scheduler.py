@@ -0,0 +1,83 @@
+"""ReminderScheduler windowed loading, driven with explicit clock values instead of its thread."""
+import pytest
+
+from backend import config
+from backend.scheduler import ReminderScheduler
+
+
+class Table:
+	"""Stored reminders, read the way storage.iter_reminders answers load_window."""
+
+	def __init__(self, *when):
+		self.rows = [{"id": i, "when_ts": ts, "what": f"r{i}"} for i, ts in enumerate(when, 1)]
+		self.reads = []
+		self.fail_after = None
+
+	def load(self, since, until):
+		self.reads.append((since, until))
+		for n, row in enumerate(r for r in self.rows if since < r["when_ts"] <= until):
+			if self.fail_after is not None and n >= self.fail_after:
+				raise OSError("database is locked")
+			yield row
+
+
+@pytest.fixture(autouse=True)
+def no_catchup(monkeypatch):
+	monkeypatch.setattr(config, "REMINDER_CATCHUP_SECONDS", 0)
+
+
+def scheduler(table, fired, **kwargs):
+	return ReminderScheduler(on_fire=fired.append, load_window=table.load, window=100, clock=lambda: 0, **kwargs)
+
+
+def test_windows_read_only_the_newly_covered_range():
+	table, fired = Table(50, 150, 250), []
+	s = scheduler(table, fired)
+	assert s.load_next_window(0) == 1
+	assert s.load_next_window(0) == 0
+	assert s.load_next_window(120) == 1
+	assert table.reads == [(-1, 100), (100, 220)]
+	assert s.run_due(200) == 2
+	assert [r["id"] for r in fired] == [1, 2]
+
+
+def test_reminders_beyond_the_window_wait_for_its_load():
+	table, fired = Table(), []
+	s = scheduler(table, fired)
+	s.load_next_window(0)
+	assert s.schedule({"id": 7, "when_ts": 90})
+	assert not s.schedule({"id": 8, "when_ts": 190})
+	table.rows.append({"id": 8, "when_ts": 190})
+	s.load_next_window(150)
+	assert s.run_due(250) == 2
+
+
+def test_failed_read_rolls_back_and_is_retried_without_duplicates():
+	table, fired = Table(10, 20, 30), []
+	s = scheduler(table, fired)
+	table.fail_after = 2
+	with pytest.raises(OSError):
+		s.load_next_window(0)
+	assert s._loaded_until is None
+	table.fail_after = None
+	assert s.load_next_window(0) == 1
+	assert s.run_due(100) == 3
+	assert sorted(r["id"] for r in fired) == [1, 2, 3]
+
+
+def test_reminder_loaded_and_scheduled_fires_once():
+	table, fired = Table(40), []
+	s = scheduler(table, fired)
+	s.load_next_window(0)
+	assert s.schedule(dict(table.rows[0]))
+	assert s.run_due(100) == 1
+
+
+def test_prepare_runs_lead_seconds_early_and_merges_into_the_fired_reminder():
+	table, fired = Table(60), []
+	s = scheduler(table, fired, on_prepare=lambda r: {"audio_id": f"a{r['id']}"}, lead=30)
+	s.load_next_window(0)
+	assert s.run_due(40) == 0
+	assert s.next_due() == 60
+	assert s.run_due(60) == 1
+	assert fired[0]["audio_id"] == "a1"
@@ -0,0 +1,83 @@
+"""The pre-fork supervisor, with stand-in workers that only report over the ready pipe."""
+import os
+import time
+import signal
+import socket
+import argparse
+
+import pytest
+
+from backend import serve
+
+WAIT = 10
+
+
+def fake_worker(args, fd, ready_fd):
+	"""Ready at once; SIGUSR1 makes it stop accepting and exit, as a recycled worker does."""
+	if args.crash:
+		raise SystemExit(3)
+	signal.signal(signal.SIGTERM, serve._exit_now)
+	signal.signal(signal.SIGUSR1, lambda signum, frame: os.write(ready_fd, serve._MESSAGE.pack(-os.getpid())) and os._exit(0))
+	os.write(ready_fd, serve._MESSAGE.pack(os.getpid()))
+	while True:
+		time.sleep(1)
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+	monkeypatch.setattr(serve, "run_worker", fake_worker)
+	monkeypatch.setattr(serve.config, "WORKER_GRACEFUL_TIMEOUT", 1)
+	sock = socket.create_server(("127.0.0.1", 0))
+	sups = []
+
+	def make(workers=3, crash=False):
+		sups.append(serve.Supervisor(sock, argparse.Namespace(workers=workers, crash=crash)))
+		return sups[-1]
+	yield make
+	for sup in sups:
+		sup._shutdown()
+
+
+def step_until(sup, condition):
+	deadline = time.monotonic() + WAIT
+	while not condition():
+		assert time.monotonic() < deadline, "supervisor did not get there in time"
+		sup.step(0.05)
+
+
+def test_first_worker_boots_alone_then_the_rest_follow(supervisor):
+	sup = supervisor()
+	sup.step(0)
+	assert len(sup.workers) == 1 and not sup.booted
+	step_until(sup, lambda: len(sup.ready) == 3)
+	assert set(sup.workers) == sup.ready
+
+
+def test_recycled_worker_is_replaced_while_it_drains(supervisor):
+	sup = supervisor()
+	step_until(sup, lambda: len(sup.ready) == 3)
+	old = next(iter(sup.workers))
+	os.kill(old, signal.SIGUSR1)
+	step_until(sup, lambda: old not in sup.ready and len(sup.ready) == 3)
+	assert old not in sup.workers and not sup.retiring
+
+
+def test_worker_that_dies_before_ready_is_respawned_after_a_backoff(supervisor):
+	sup = supervisor(crash=True)
+	first = sup.spawn()
+	step_until(sup, lambda: first not in sup.workers)
+	assert sup._respawn_at > time.monotonic()
+	sup.step(0)
+	assert not sup.workers and not sup.booted
+
+
+def test_shutdown_stops_every_worker(supervisor):
+	sup = supervisor()
+	step_until(sup, lambda: len(sup.ready) == 3)
+	pids = set(sup.workers)
+	sup.stopping = True
+	sup._shutdown()
+	assert not sup.workers and not sup.retiring
+	for pid in pids:
+		with pytest.raises(ProcessLookupError):
+			os.kill(pid, 0)
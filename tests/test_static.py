@@ -0,0 +1,79 @@
+"""Static manifest: encoding negotiation, cache headers and 304 revalidation."""
+import sys
+import types
+
+import pytest
+from werkzeug.http import parse_accept_header, parse_etags
+
+from backend import static
+
+SCRIPT = b"function greet(name) { return 'hello ' + name; }\n" * 20
+
+
+@pytest.fixture
+def build(monkeypatch, tmp_path):
+	(tmp_path / "index.html").write_text('<script src="app.js"></script>')
+	(tmp_path / "app.js").write_bytes(SCRIPT)
+
+	def build_manifest():
+		manifest = static.StaticManifest(str(tmp_path))
+		monkeypatch.setattr(static, "manifest", lambda: manifest)
+		return manifest
+	return build_manifest
+
+
+@pytest.fixture
+def fake_brotli(monkeypatch):
+	module = types.ModuleType("brotli")
+	module.compress = lambda body, quality=11: b"br:" + body[:32]
+	monkeypatch.setitem(sys.modules, "brotli", module)
+	return module
+
+
+def get(path, accept_encoding="", if_none_match="", version=None):
+	return static.respond(path, version, parse_accept_header(accept_encoding), parse_etags(if_none_match))
+
+
+def test_without_brotli_gzip_is_negotiated(build, monkeypatch):
+	monkeypatch.setitem(sys.modules, "brotli", None)
+	asset = build().get("app.js")
+	assert set(asset.variants) == {"identity", "gzip"}
+	status, body, headers = get("app.js", "gzip, br")
+	assert status == 200
+	assert headers["Content-Encoding"] == "gzip"
+	assert headers["Vary"] == "Accept-Encoding"
+	assert body == asset.variants["gzip"][0]
+
+
+def test_with_brotli_br_is_preferred(build, fake_brotli):
+	asset = build().get("app.js")
+	assert set(asset.variants) == {"identity", "gzip", "br"}
+	status, body, headers = get("app.js", "gzip, br")
+	assert (status, headers["Content-Encoding"], headers["ETag"]) == (200, "br", f'"{asset.hash}-br"')
+	assert body == fake_brotli.compress(SCRIPT)
+	status, _, headers = get("app.js", "gzip, br;q=0")
+	assert headers["Content-Encoding"] == "gzip"
+	status, body, headers = get("app.js")
+	assert "Content-Encoding" not in headers
+	assert body == SCRIPT
+
+
+def test_matching_etag_is_304_per_variant(build, fake_brotli):
+	build()
+	_, _, headers = get("app.js", "br")
+	status, body, revalidated = get("app.js", "br", headers["ETag"])
+	assert (status, body) == (304, b"")
+	assert revalidated["ETag"] == headers["ETag"]
+	assert revalidated["Vary"] == "Accept-Encoding"
+	# The brotli ETag does not validate the gzip variant.
+	status, _, _ = get("app.js", "gzip", headers["ETag"])
+	assert status == 200
+
+
+def test_versioned_urls_are_immutable(build):
+	asset = build().get("app.js")
+	assert get("app.js", version=asset.hash)[2]["Cache-Control"] == static.IMMUTABLE
+	assert get("app.js", version="stale")[2]["Cache-Control"] == static.REVALIDATE
+	status, body, headers = get("index.html", version=asset.hash)
+	assert headers["Cache-Control"] == static.REVALIDATE
+	assert f'src="app.js?v={asset.hash}"'.encode() in body
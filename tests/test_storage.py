@@ -0,0 +1,97 @@
+"""The group-commit writer and the connection pool, against a throwaway SQLite file."""
+import sqlite3
+
+import pytest
+
+from backend import config, storage
+
+INSERT = "INSERT INTO t (v) VALUES (?)"
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+	path = str(tmp_path / "test.db")
+	conn = sqlite3.connect(path)
+	conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT NOT NULL)")
+	conn.commit()
+	conn.close()
+	monkeypatch.setattr(config, "SQLITE_DB_PATH", path)
+	monkeypatch.setattr(storage, "init_storage", lambda: None)
+	return path
+
+
+def rows(path):
+	with sqlite3.connect(path) as conn:
+		return [v for v, in conn.execute("SELECT v FROM t ORDER BY id")]
+
+
+def test_writer_commits_and_returns_row_ids(db):
+	writer = storage._GroupCommitWriter(max_batch=8)
+	assert [writer.submit(INSERT, (v,)) for v in "abc"] == [1, 2, 3]
+	assert rows(db) == ["a", "b", "c"]
+
+
+def test_bad_row_fails_alone(db):
+	writer = storage._GroupCommitWriter(max_batch=8)
+	# Queued before the thread starts, so all four land in one batch.
+	futures = []
+	for v in ("a", None, "c"):
+		fut = storage.Future()
+		writer._queue.put((INSERT, (v,), fut))
+		futures.append(fut)
+	futures.append(writer.submit_nowait(INSERT, ("d",)))
+	with pytest.raises(sqlite3.IntegrityError):
+		futures[1].result(timeout=5)
+	assert [f.result(timeout=5) for f in futures if f is not futures[1]]
+	assert rows(db) == ["a", "c", "d"]
+
+
+def test_writer_that_cannot_open_fails_writes_and_restarts(db, monkeypatch):
+	real_connect = storage._connect
+
+	def broken():
+		raise sqlite3.OperationalError("disk gone")
+	monkeypatch.setattr(storage, "_connect", broken)
+	writer = storage._GroupCommitWriter(max_batch=8)
+	with pytest.raises(sqlite3.OperationalError, match="disk gone"):
+		writer.submit(INSERT, ("a",))
+	monkeypatch.setattr(storage, "_connect", real_connect)
+	assert writer.submit(INSERT, ("b",)) == 1
+	assert rows(db) == ["b"]
+
+
+def test_submit_times_out_instead_of_hanging(db, monkeypatch):
+	monkeypatch.setattr(config, "SQLITE_WRITE_TIMEOUT", 0.05)
+	writer = storage._GroupCommitWriter(max_batch=8)
+	# A thread that never drains the queue.
+	writer._thread = object()
+	with pytest.raises(sqlite3.OperationalError, match="not committed"):
+		writer.submit(INSERT, ("a",))
+
+
+def test_pool_recovers_the_slot_of_a_failed_connect(db, monkeypatch):
+	real_connect = storage._connect
+	calls = []
+
+	def flaky():
+		calls.append(1)
+		if len(calls) == 1:
+			raise sqlite3.OperationalError("busy")
+		return real_connect()
+	monkeypatch.setattr(storage, "_connect", flaky)
+	pool = storage._ConnectionPool(size=1)
+	with pytest.raises(sqlite3.OperationalError, match="busy"):
+		with pool.connection():
+			pass
+	with pool.connection() as conn:
+		assert conn.execute("SELECT 1").fetchone() == (1,)
+
+
+def test_only_the_first_claim_wins(db, monkeypatch):
+	with sqlite3.connect(db) as conn:
+		conn.execute("CREATE TABLE claims (key TEXT PRIMARY KEY, created_ts INTEGER NOT NULL)")
+	monkeypatch.setattr(storage, "_pool", storage._ConnectionPool(size=2))
+	monkeypatch.setattr(storage, "_prune_shared", lambda: None)
+	assert storage.claim("prepare:1")
+	assert not storage.claim("prepare:1")
+	assert storage.claim("prepare:2")
@@ -0,0 +1,50 @@
+"""/api/stream-audio gives up on a request that never closes an utterance."""
+import asyncio
+import itertools
+import time
+
+import pytest
+
+from backend import config
+from backend.app import app
+
+SILENCE = b"\0" * 64000
+
+
+@pytest.fixture
+def client():
+	return app.test_client()
+
+
+def test_too_much_silence_is_413(client, monkeypatch):
+	monkeypatch.setattr(config, "STREAM_LISTEN_SECONDS", 1)
+	resp = client.post("/api/stream-audio", data=SILENCE, content_type="application/octet-stream")
+	assert resp.status_code == 413
+
+
+def test_listen_deadline_is_408(client, monkeypatch):
+	clock = itertools.count(step=10)
+	monkeypatch.setattr(time, "monotonic", lambda: next(clock))
+	resp = client.post("/api/stream-audio", data=SILENCE, content_type="application/octet-stream")
+	assert resp.status_code == 408
+
+
+def test_asgi_too_much_silence_is_413(monkeypatch):
+	asgi = pytest.importorskip("backend.asgi")
+	monkeypatch.setattr(config, "STREAM_LISTEN_SECONDS", 1)
+
+	async def post():
+		resp = await asgi.app.test_client().post("/api/stream-audio", data=SILENCE)
+		return resp.status_code
+	assert asyncio.run(post()) == 413
+
+
+def test_asgi_listen_deadline_is_408(monkeypatch):
+	asgi = pytest.importorskip("backend.asgi")
+	monkeypatch.setattr(config, "STREAM_LISTEN_SECONDS", 0)
+	monkeypatch.setattr(asgi, "stream_max_bytes", lambda: len(SILENCE))
+
+	async def post():
+		resp = await asgi.app.test_client().post("/api/stream-audio", data=SILENCE)
+		return resp.status_code
+	assert asyncio.run(post()) == 408
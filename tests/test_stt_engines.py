@@ -0,0 +1,100 @@
+"""WhisperEngine batching, with stand-ins for the optional torch and whisper packages."""
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from backend.services import stt_engines
+
+N_SAMPLES = 30 * 16000
+
+
+class FakeModel:
+	device = types.SimpleNamespace(type="cpu")
+	dims = types.SimpleNamespace(n_mels=80)
+
+	def __init__(self):
+		self.transcribed = []
+
+	def transcribe(self, samples, language=None, fp16=False):
+		self.transcribed.append((samples.size, language))
+		return {"text": f" long {language} "}
+
+
+@pytest.fixture
+def engine(monkeypatch):
+	decoded = []
+	model = FakeModel()
+
+	def decode(model_, mel, options):
+		decoded.append((options.language, [m["id"] for m in mel]))
+		return [
+			types.SimpleNamespace(
+				text=f" {options.language}:{m['id']} ",
+				no_speech_prob=0.9 if m["silent"] else 0.01,
+				avg_logprob=-2.0 if m["silent"] else -0.2,
+			)
+			for m in mel
+		]
+
+	whisper = types.ModuleType("whisper")
+	whisper.audio = types.SimpleNamespace(N_SAMPLES=N_SAMPLES)
+	whisper.load_model = lambda name, device=None: model
+	whisper.pad_or_trim = lambda samples: samples
+	# The mel "spectrogram" carries the clip's id (its first sample, as int16) and silence flag through to decode.
+	whisper.log_mel_spectrogram = lambda samples, n_mels, device=None: {"id": round(samples[0] * 32768), "silent": samples[1] == 0}
+	whisper.DecodingOptions = lambda **kwargs: types.SimpleNamespace(**kwargs)
+	whisper.decode = decode
+	torch = types.ModuleType("torch")
+	torch.stack = list
+	monkeypatch.setitem(sys.modules, "whisper", whisper)
+	monkeypatch.setitem(sys.modules, "torch", torch)
+
+	eng = stt_engines.WhisperEngine()
+	eng.decoded = decoded
+	eng.model = model
+	return eng
+
+
+def clip(clip_id: int, silent: bool = False, size: int = 1600) -> np.ndarray:
+	samples = np.full(size, 0.5, dtype=np.float32)
+	samples[0] = clip_id / 32768
+	if silent:
+		samples[1] = 0
+	return samples
+
+
+def test_batch_decodes_once_per_language_in_order(engine):
+	items = [(clip(0), "en"), (clip(1), "de"), (clip(2), "en"), (clip(3), None)]
+	assert engine._transcribe_batch(items) == ["en:0", "de:1", "en:2", "None:3"]
+	assert engine.decoded == [("en", [0, 2]), ("de", [1]), (None, [3])]
+
+
+def test_long_clip_goes_through_transcribe(engine):
+	items = [(clip(0), "en"), (clip(1, size=N_SAMPLES + 1), "en")]
+	assert engine._transcribe_batch(items) == ["en:0", "long en"]
+	assert engine.decoded == [("en", [0])]
+	assert engine.model.transcribed == [(N_SAMPLES + 1, "en")]
+
+
+def test_silent_clip_is_empty(engine):
+	items = [(clip(0, silent=True), "en"), (clip(1), "en")]
+	assert engine._transcribe_batch(items) == ["", "en:1"]
+
+
+def test_whisper_language():
+	assert stt_engines.whisper_language("en-US") == "en"
+	assert stt_engines.whisper_language(None) is None
+
+
+def test_submit_resolves_each_clip(engine):
+	import speech_recognition as sr
+
+	def audio(clip_id: int) -> "sr.AudioData":
+		pcm = np.full(1600, 1000, dtype="<i2")
+		pcm[0] = clip_id
+		return sr.AudioData(pcm.tobytes(), 16000, 2)
+
+	futures = [engine.submit(audio(i), "en-US") for i in (3, 4)]
+	assert [f.result(timeout=5) for f in futures] == ["en:3", "en:4"]
@@ -0,0 +1,37 @@
+"""GTTSEngine splitting and parallel fetching, against the installed gTTS (no network)."""
+import re
+
+from backend import config
+from backend.services import tts_engines
+
+TEXT = (
+	"Your reminder is due: call the dentist about moving Thursday's appointment to next week. "
+	"Then pick up the dry cleaning, water the plants on the balcony and answer the email from the landlord, "
+	"who is still waiting for the signed copy of the lease."
+)
+
+
+def words(text):
+	return re.findall(r"[\w']+", text)
+
+
+def test_split_parts_cover_the_text_in_short_parts():
+	parts = tts_engines._split_parts(TEXT, "en")
+	assert len(parts) > 1
+	assert all(0 < len(part) <= 100 for part in parts)
+	assert words(" ".join(parts)) == words(TEXT)
+
+
+def test_prepared_requests_match_parts_and_retarget(monkeypatch):
+	monkeypatch.setattr(config, "TTS_ENDPOINT", "http://127.0.0.1:9/")
+	prepared = tts_engines.prepare_requests(TEXT, "en")
+	assert len(prepared) == len(tts_engines._split_parts(TEXT, "en"))
+	assert all(pr.url.startswith("http://127.0.0.1:9/") for pr in prepared)
+	assert all(pr.method == "POST" and pr.body for pr in prepared)
+
+
+def test_parallel_stream_yields_parts_in_order(monkeypatch):
+	monkeypatch.setattr(config, "TTS_PARALLEL_WORKERS", 4)
+	monkeypatch.setattr(tts_engines, "_synthesize_part", lambda part, language: part.encode())
+	chunks = list(tts_engines.GTTSEngine().stream(TEXT, "en"))
+	assert chunks == [part.encode() for part in tts_engines._split_parts(TEXT, "en")]